@@ -4,8 +4,17 @@ from abc import ABC, abstractmethod
 from typing import Any, Optional
 
 
+from waad.utils.bitmaps import Interner
+
+
 class Asset(ABC):
-    """This class defines a `Asset` and is abstract."""
+    """This class defines a `Asset` and is abstract.
+
+    Assets are immutable: their attributes are stored in `__slots__`, without a `__dict__`, and their hash is computed once at creation. When
+    unpickled, assets are built again so that their hash is the one of the current process.
+    """
+
+    __slots__ = ('_hash',)
 
     @abstractmethod
     def to_tuple(self):
@@ -15,9 +24,15 @@ class Asset(ABC):
     def __eq__(self, obj: Any):
         pass
 
-    @abstractmethod
     def __hash__(self):
-        pass
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), self.to_tuple())
+
+    def __setstate__(self, state: Any):
+        """Restore an asset pickled with its attributes, before assets were rebuilt when unpickled."""
+        self.__init__(**(state[1] if isinstance(state, tuple) else state))
 
     @abstractmethod
     def __repr__(self):
@@ -27,18 +42,20 @@ class Asset(ABC):
 class Machine(Asset):
     """This class defines a `Machine` object as a tuple (name, domain), child of `Asset`."""
 
+    __slots__ = ('name', 'domain')
+
     def __init__(self, name: Optional[str] = None, domain: Optional[str] = None):
         self.name = name
         self.domain = domain
+        self._hash = hash((name, domain))
 
     def to_tuple(self):
         return (self.name, self.domain)
 
     def __eq__(self, obj: Any):
-        return isinstance(obj, Machine) and obj.name == self.name and obj.domain == self.domain
+        return obj is self or (isinstance(obj, Machine) and obj._hash == self._hash and obj.name == self.name and obj.domain == self.domain)
 
-    def __hash__(self):
-        return hash((self.name, self.domain))
+    __hash__ = Asset.__hash__
 
     def __repr__(self):
         return f"{self.name} - {self.domain}"
@@ -47,19 +64,23 @@ class Machine(Asset):
 class Account(Asset):
     """This class defines an `Account` object as a tuple (name, domain, sid), child of `Asset`."""
 
+    __slots__ = ('name', 'domain', 'sid')
+
     def __init__(self, name: Optional[str] = None, domain: Optional[str] = None, sid: Optional[str] = None):
         self.name = name
         self.domain = domain
         self.sid = sid
+        self._hash = hash((name, domain, sid))
 
     def to_tuple(self):
         return (self.name, self.domain, self.sid)
 
     def __eq__(self, obj: Any):
-        return isinstance(obj, Account) and obj.name == self.name and obj.domain == self.domain and obj.sid == self.sid
+        return obj is self or (
+            isinstance(obj, Account) and obj._hash == self._hash and obj.name == self.name and obj.domain == self.domain and obj.sid == self.sid
+        )
 
-    def __hash__(self):
-        return hash((self.name, self.domain, self.sid))
+    __hash__ = Asset.__hash__
 
     def __repr__(self):
         if self.sid is not None:
@@ -70,17 +91,44 @@ class Account(Asset):
 class IP(Asset):
     """This class defines an `IP` object as a child of `Asset`."""
 
+    __slots__ = ('address',)
+
     def __init__(self, address: str):
         self.address = address
+        self._hash = hash(address)
 
     def to_tuple(self):
         return (self.address,)
 
     def __eq__(self, obj: Any):
-        return isinstance(obj, IP) and obj.address == self.address
+        return obj is self or (isinstance(obj, IP) and obj._hash == self._hash and obj.address == self.address)
 
-    def __hash__(self):
-        return hash(self.address)
+    __hash__ = Asset.__hash__
 
     def __repr__(self):
         return self.address
+
+
+class AssetPool(Interner):
+    """This class interns assets: equal assets are replaced by a single canonical instance, which is given a dense integer id, the first asset
+    interned getting the id 0, the next new one 1, etc.
+
+    Structures holding many assets can then key on their ids, see `InternedSet`, and dicts and sets of canonical assets compare them by identity.
+    Values that are not assets, such as `None` given by a rule for rows without asset, are left as is.
+
+    A pool only grows, keeping its assets alive. In a long-lived process running independent analyses, such as a notebook going through several
+    datasets, call `clear` between two analyses, once the results of the previous one, whose `InternedSet` refer to the ids of the pool, are no
+    longer used: these sets raise a `ValueError` when used after the pool is cleared.
+    """
+
+    def get_canonical(self, asset: Any) -> Any:
+        if not isinstance(asset, Asset):
+            return asset
+        return self.items[self.intern(asset)]
+
+    def get_id(self, asset: Asset) -> int:
+        return self.intern(asset)
+
+
+# Pool of the assets built by `ComputeIndicators`, shared by all its runs in the process
+ASSET_POOL = AssetPool(reference='waad.utils.asset:ASSET_POOL')
@@ -0,0 +1,310 @@
+"""This module implements compact sets of items, interned into integer ids stored in compressed bitmaps."""
+
+
+from collections.abc import Set
+import importlib
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+
+ARRAY_CONTAINER_MAX_SIZE = 4096
+BITSET_WORDS = 1024
+
+
+class Interner:
+    """This class interns items into dense integer ids, the first item interned getting the id 0, the next new one 1, etc.
+
+    Attributes:
+        ids (Dict[Any, int]): Id of each item.
+        items (List[Any]): Item of each id.
+        reference (Optional[str]): `'module:name'` of the interner when it is a module-level one, shared by all objects of a process. Sets
+            pickled with such an interner do not carry it but their items, interned again on unpickling in the interner of the same name of
+            the unpickling process.
+        generation (int): Number of times the interner was cleared, so that sets built before can tell that their ids are stale.
+    """
+
+    def __init__(self, reference: Optional[str] = None):
+        self.ids: Dict[Any, int] = {}
+        self.items: List[Any] = []
+        self.reference = reference
+        self.generation = 0
+
+    @staticmethod
+    def from_reference(reference: str) -> 'Interner':
+        module, name = reference.split(':')
+        return getattr(importlib.import_module(module), name)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def intern(self, item: Any) -> int:
+        id = self.ids.get(item)
+        if id is None:
+            id = self.ids[item] = len(self.items)
+            self.items.append(item)
+        return id
+
+    def intern_many(self, items: Iterable[Any]) -> np.ndarray:
+        """Intern many items at once, each distinct item being looked up only once. Missing values (`None`, NaN) are interned as well."""
+        items = pd.Series(list(items) if not isinstance(items, (pd.Series, np.ndarray)) else items, dtype=object)
+        codes, uniques = pd.factorize(items, sort=False)
+        ids = np.fromiter((self.intern(item) for item in uniques), dtype=np.int64, count=len(uniques))
+        missing = np.flatnonzero(codes < 0)
+        if missing.size > 0:
+            # The code -1 of missing values picks the id appended last
+            ids = np.append(ids, self.intern(items.iloc[missing[0]]))
+        return ids[codes]
+
+    def decode(self, ids: Iterable[int]) -> List[Any]:
+        return [self.items[id] for id in ids]
+
+    def clear(self):
+        """Forget all interned items. Ids given before do not refer to these items anymore, and `InternedSet` holding them raise when used."""
+        self.ids = {}
+        self.items = []
+        self.generation += 1
+
+
+class Bitmap:
+    """This class implements a roaring-style compressed bitmap of non-negative integers below 2 ** 32.
+
+    Integers are partitioned by their 16 high bits into containers of their 16 low bits. A container is a sorted array of `uint16` while it holds
+    at most 4096 integers, else a bitset of 65536 bits, so that both sparse and dense sets are compact. Unions, differences and intersections are
+    computed container by container with numpy.
+
+    Attributes:
+        containers (Dict[int, np.ndarray]): Container of each 16 high bits, a `uint16` array or a `uint64` bitset of 1024 words.
+    """
+
+    def __init__(self, containers: Optional[Dict[int, np.ndarray]] = None):
+        self.containers = containers if containers is not None else {}
+
+    @staticmethod
+    def from_ids(ids: Iterable[int]) -> 'Bitmap':
+        if isinstance(ids, np.ndarray) and ids.size == 0:
+            return Bitmap()
+        ids = np.unique(np.asarray(ids if isinstance(ids, np.ndarray) else list(ids), dtype=np.int64))
+        if ids.size > 0 and (ids[0] < 0 or ids[-1] >= 1 << 32):
+            raise ValueError("Bitmaps only hold integers between 0 and 2 ** 32 - 1")
+        highs = ids >> 16
+        bounds = np.flatnonzero(np.diff(highs)) + 1
+        containers = {}
+        for part in np.split(ids, bounds) if ids.size > 0 else []:
+            containers[int(part[0] >> 16)] = Bitmap.optimize((part & 0xFFFF).astype(np.uint16))
+        return Bitmap(containers)
+
+    @staticmethod
+    def is_bitset(container: np.ndarray) -> bool:
+        return container.dtype == np.uint64
+
+    @staticmethod
+    def to_bitset(container: np.ndarray) -> np.ndarray:
+        if Bitmap.is_bitset(container):
+            return container
+        bits = np.zeros(BITSET_WORDS * 64, dtype=bool)
+        bits[container] = True
+        return np.packbits(bits, bitorder='little').view(np.uint64)
+
+    @staticmethod
+    def to_array(container: np.ndarray) -> np.ndarray:
+        if not Bitmap.is_bitset(container):
+            return container
+        return np.flatnonzero(np.unpackbits(container.view(np.uint8), bitorder='little')).astype(np.uint16)
+
+    @staticmethod
+    def get_cardinality(container: np.ndarray) -> int:
+        if Bitmap.is_bitset(container):
+            return int(np.unpackbits(container.view(np.uint8)).sum(dtype=np.int64))
+        return container.size
+
+    @staticmethod
+    def optimize(container: np.ndarray) -> Optional[np.ndarray]:
+        """Get the most compact form of `container`, `None` if it is empty."""
+        cardinality = Bitmap.get_cardinality(container)
+        if cardinality == 0:
+            return None
+        if Bitmap.is_bitset(container) and cardinality <= ARRAY_CONTAINER_MAX_SIZE:
+            return Bitmap.to_array(container)
+        if not Bitmap.is_bitset(container) and cardinality > ARRAY_CONTAINER_MAX_SIZE:
+            return Bitmap.to_bitset(container)
+        return container
+
+    @staticmethod
+    def contains_many(bitset: np.ndarray, lows: np.ndarray) -> np.ndarray:
+        """Get the mask of the `lows` of an array container that are in `bitset`, without expanding it."""
+        lows = lows.astype(np.uint64)
+        return ((bitset[lows >> np.uint64(6)] >> (lows & np.uint64(63))) & np.uint64(1)).astype(bool)
+
+    @staticmethod
+    def union_containers(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        if not Bitmap.is_bitset(a) and not Bitmap.is_bitset(b):
+            return Bitmap.optimize(np.union1d(a, b))
+        if Bitmap.is_bitset(a) and Bitmap.is_bitset(b):
+            return a | b
+        bitset, lows = (a.copy(), b.astype(np.uint64)) if Bitmap.is_bitset(a) else (b.copy(), a.astype(np.uint64))
+        np.bitwise_or.at(bitset, lows >> np.uint64(6), np.uint64(1) << (lows & np.uint64(63)))
+        return bitset
+
+    @staticmethod
+    def difference_containers(a: np.ndarray, b: np.ndarray) -> Optional[np.ndarray]:
+        if not Bitmap.is_bitset(a):
+            if Bitmap.is_bitset(b):
+                return Bitmap.optimize(a[~Bitmap.contains_many(b, a)])
+            return Bitmap.optimize(np.setdiff1d(a, b, assume_unique=True))
+        return Bitmap.optimize(a & ~Bitmap.to_bitset(b))
+
+    @staticmethod
+    def intersection_containers(a: np.ndarray, b: np.ndarray) -> Optional[np.ndarray]:
+        if Bitmap.is_bitset(a) and Bitmap.is_bitset(b):
+            return Bitmap.optimize(a & b)
+        if Bitmap.is_bitset(a) or Bitmap.is_bitset(b):
+            bitset, array = (a, b) if Bitmap.is_bitset(a) else (b, a)
+            return Bitmap.optimize(array[Bitmap.contains_many(bitset, array)])
+        return Bitmap.optimize(np.intersect1d(a, b, assume_unique=True))
+
+    def __or__(self, other: 'Bitmap') -> 'Bitmap':
+        containers = dict(self.containers)
+        for high, container in other.containers.items():
+            containers[high] = Bitmap.union_containers(containers[high], container) if high in containers else container
+        return Bitmap(containers)
+
+    def __ior__(self, other: 'Bitmap') -> 'Bitmap':
+        for high, container in other.containers.items():
+            self.containers[high] = Bitmap.union_containers(self.containers[high], container) if high in self.containers else container
+        return self
+
+    def __sub__(self, other: 'Bitmap') -> 'Bitmap':
+        containers = {}
+        for high, container in self.containers.items():
+            if high in other.containers:
+                container = Bitmap.difference_containers(container, other.containers[high])
+            if container is not None:
+                containers[high] = container
+        return Bitmap(containers)
+
+    def __and__(self, other: 'Bitmap') -> 'Bitmap':
+        containers = {}
+        for high in self.containers.keys() & other.containers.keys():
+            container = Bitmap.intersection_containers(self.containers[high], other.containers[high])
+            if container is not None:
+                containers[high] = container
+        return Bitmap(containers)
+
+    def __len__(self) -> int:
+        return sum(Bitmap.get_cardinality(container) for container in self.containers.values())
+
+    def __contains__(self, id: int) -> bool:
+        container = self.containers.get(id >> 16)
+        if container is None:
+            return False
+        low = id & 0xFFFF
+        if Bitmap.is_bitset(container):
+            return bool((int(container[low >> 6]) >> (low & 63)) & 1)
+        index = np.searchsorted(container, low)
+        return index < container.size and container[index] == low
+
+    def __eq__(self, obj: Any) -> bool:
+        return isinstance(obj, Bitmap) and np.array_equal(self.to_ids(), obj.to_ids())
+
+    def to_ids(self) -> np.ndarray:
+        """Get the sorted integers of the bitmap."""
+        parts = [(high << 16) + Bitmap.to_array(self.containers[high]).astype(np.int64) for high in sorted(self.containers)]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.to_ids().tolist())
+
+    def copy(self) -> 'Bitmap':
+        return Bitmap(dict(self.containers))
+
+    @property
+    def nbytes(self) -> int:
+        return sum(container.nbytes for container in self.containers.values())
+
+    def __repr__(self) -> str:
+        return f"Bitmap({self.to_ids().tolist()})"
+
+
+class InternedSet(Set):
+    """This class implements a set of items stored as a `Bitmap` of their ids in an `Interner`, items being decoded only when iterated.
+
+    Unions and differences with sets sharing the same interner are bitmap operations. Items of sets using another interner, or of other iterables,
+    are interned first.
+
+    Attributes:
+        bitmap (Bitmap): Ids of the items.
+        interner (Interner): Interner the ids refer to.
+        generation (int): Generation of `interner` the ids refer to. Once the interner is cleared, using the set raises a `ValueError`.
+    """
+
+    def __init__(self, bitmap: Bitmap, interner: Interner):
+        self.bitmap = bitmap
+        self.interner = interner
+        self.generation = interner.generation
+
+    @staticmethod
+    def from_items(items: Iterable[Any], interner: Interner) -> 'InternedSet':
+        return InternedSet(Bitmap.from_ids(interner.intern_many(items)), interner)
+
+    @staticmethod
+    def from_reference(items: List[Any], reference: str) -> 'InternedSet':
+        return InternedSet.from_items(items, Interner.from_reference(reference))
+
+    def __reduce__(self):
+        # Ids of a module-level interner differ between processes, so items are sent to be interned again in the one of the receiving process
+        if self.get_interner().reference is not None:
+            return (InternedSet.from_reference, (list(self), self.interner.reference))
+        return (InternedSet, (self.bitmap, self.interner))
+
+    def get_interner(self) -> Interner:
+        """Get the interner of the set, checking that it was not cleared since the set was built."""
+        if self.generation != self.interner.generation:
+            raise ValueError("The interner of this set was cleared since it was built, its ids do not refer to its items anymore")
+        return self.interner
+
+    def get_bitmap(self, other: Iterable[Any]) -> Bitmap:
+        """Get the bitmap of `other` in the interner of this set."""
+        if isinstance(other, InternedSet) and other.get_interner() is self.get_interner():
+            return other.bitmap
+        return Bitmap.from_ids(self.get_interner().intern_many(list(other)))
+
+    def __len__(self) -> int:
+        return len(self.bitmap)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.get_interner().decode(self.bitmap.to_ids()))
+
+    def __contains__(self, item: Any) -> bool:
+        id = self.get_interner().ids.get(item)
+        return id is not None and id in self.bitmap
+
+    def __eq__(self, obj: Any) -> bool:
+        if isinstance(obj, InternedSet) and obj.get_interner() is self.get_interner():
+            return self.bitmap == obj.bitmap
+        return super().__eq__(obj)
+
+    def union(self, *others: Iterable[Any]) -> 'InternedSet':
+        bitmap = self.bitmap.copy()
+        for other in others:
+            bitmap |= self.get_bitmap(other)
+        return InternedSet(bitmap, self.get_interner())
+
+    def update(self, *others: Iterable[Any]):
+        for other in others:
+            self.bitmap |= self.get_bitmap(other)
+
+    def difference(self, *others: Iterable[Any]) -> 'InternedSet':
+        bitmap = self.bitmap
+        for other in others:
+            bitmap = bitmap - self.get_bitmap(other)
+        return InternedSet(bitmap, self.get_interner())
+
+    def copy(self) -> 'InternedSet':
+        return InternedSet(self.bitmap.copy(), self.get_interner())
+
+    def to_set(self) -> set:
+        return set(self)
+
+    def __repr__(self) -> str:
+        return repr(self.to_set())
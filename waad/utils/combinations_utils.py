@@ -2,8 +2,9 @@
 
 
 from collections import Iterable
+from functools import lru_cache
 from itertools import combinations
-from typing import List, Tuple, Union
+from typing import Any, Dict, Iterator, List, Tuple, Union
 
 
 def flatten(lst: Union[List, Tuple]) -> List:
@@ -14,49 +15,62 @@ def flatten(lst: Union[List, Tuple]) -> List:
         return [lst]
 
 
+def get_exclusion_masks(lst: List, excluded: List) -> Tuple[List[int], List[int]]:
+    """Encode each element of `lst` and each subsequence of `excluded` as a bitmask over the flattened values they contain, so that
+    checking if a combination contains an excluded subsequence is a single bitwise operation."""
+    bits: Dict[Any, int] = {}
+
+    def get_mask(values: List) -> int:
+        mask = 0
+        for value in values:
+            mask |= 1 << bits.setdefault(value, len(bits))
+        return mask
+
+    elements_masks = [get_mask(flatten(e)) for e in lst]
+    excluded_masks = [get_mask(list(e) if (isinstance(e, Iterable) and not isinstance(e, (str, bytes))) else [e]) for e in excluded]
+    return elements_masks, excluded_masks
+
+
+def iter_custom_combinations(lst: List, length: int, excluded: List = []) -> Iterator[Tuple]:
+    """Lazily generates combinations of elements from `lst` of size `length` without those containing subsequences in `excluded`."""
+    elements_masks, excluded_masks = get_exclusion_masks(lst, excluded)
+    for indices in combinations(range(len(lst)), length):
+        mask = 0
+        for i in indices:
+            mask |= elements_masks[i]
+        if not any(mask & excluded_mask == excluded_mask for excluded_mask in excluded_masks):
+            yield tuple([lst[i] for i in indices])
+
+
 def custom_combinations_generator(lst: List, length: int, excluded: List = []):
     """Generates combinations of elements from `lst` of size `length` without those containing subsequences in `excluded`."""
-    return [
-        comb
-        for comb in combinations(lst, length)
-        if not any(
-            set(e).issubset(flatten(comb))
-            if (isinstance(e, Iterable) and not isinstance(e, (str, bytes)))
-            else set([e]).issubset(flatten(comb))
-            for e in excluded
-        )
-    ]
+    return list(iter_custom_combinations(lst, length, excluded))
 
 
 def custom_combinations_generator_up_to(lst: List, length: int, excluded: List = []):
     """Generates combinations of elements from `lst` up to size `length` without those containing subsequences in `excluded`."""
-    return [
-        comb
-        for size in range(1, length + 1)
-        for comb in combinations(lst, size)
-        if not any(
-            set(e).issubset(flatten(comb))
-            if (isinstance(e, Iterable) and not isinstance(e, (str, bytes)))
-            else set([e]).issubset(flatten(comb))
-            for e in excluded
-        )
-    ]
+    return [comb for size in range(1, length + 1) for comb in iter_custom_combinations(lst, size, excluded)]
+
+
+@lru_cache(maxsize=None)
+def get_splits_indices(n: int) -> Tuple[Tuple[Tuple[int, ...], Tuple[int, ...]], ...]:
+    """Get all pairs of subsets of indices that constitute a list of size `n`, index 0 being always in the first subset.
+
+    The table only depends on `n` so it is computed once per size, in the same order as `get_all_pairs_of_subsets_indices`.
+    """
+    res = []
+    for mask in range(1, 2 ** (n - 1)):
+        first_part = (0,) + tuple([index for index in range(1, n) if not (mask >> (n - 1 - index)) & 1])
+        second_part = tuple([index for index in range(1, n) if (mask >> (n - 1 - index)) & 1])
+        res.append((first_part, second_part))
+    return tuple(res)
 
 
 def get_all_pairs_of_subsets_indices(original_list: List):
     """Based on a binary approach to get all pairs of subset indices that constitute `original_list`."""
-    res = []
-    n = len(original_list)
-    for i in range(2 ** (n - 1)):
-        binary = [int(x) for x in format(i, f"0{n-1}b")]
-        first_part = set([0] + [index + 1 for index, value in enumerate(binary) if value == 0])
-        second_part = set([index + 1 for index, value in enumerate(binary) if value == 1])
-        if len(first_part) > 0 and len(second_part) > 0:
-            res.append([first_part, second_part])
-    return res
+    return [[set(first_part), set(second_part)] for first_part, second_part in get_splits_indices(len(original_list))]
 
 
 def get_all_pairs_of_subsets(original_list: List):
     """Based on a binary approach to get all pairs of subsets that constitute `original_list`."""
-    temp = get_all_pairs_of_subsets_indices(original_list)
-    return [[[original_list[i] for i in indices_pair[0]], [original_list[i] for i in indices_pair[1]]] for indices_pair in temp]
+    return [[[original_list[i] for i in first_part], [original_list[i] for i in second_part]] for first_part, second_part in get_splits_indices(len(original_list))]
@@ -3,6 +3,7 @@ ANOMALIES_SCORES = {
     "nb_computers_reached": {"score": 0.1, "indicator_bound": 10},
     "nb_new_computers_reached": {"score": 0.3, "indicator_bound": 7},
     "nb_assets_reached": {"score": 0.1, "indicator_bound": 10},
+    "nb_assets_reached_sketch": {"score": 0.1, "indicator_bound": 10, "exact_threshold": 64},
     "nb_new_assets_reached": {"score": 0.3, "indicator_bound": 7, "legitimate_model_duration": 25},
     "nb_privileges_granted": {"score": 0.2, "legitimate_model_duration": 40},
     "corresponding_anomalies_on_all_indicators": {"score": 0.3},
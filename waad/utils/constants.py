@@ -49,12 +49,25 @@ DATABASE_FIELDS = {
     "FailureReason": "TEXT",
     "VirtualAccount": "TEXT",  #
     "LmPackageName": "TEXT",
+    "SystemTimeEpoch": "BIGINT",
 }
 
 
 """Dictionary containing all database field values and type."""
 
 
+SYSTEMTIME_FIELD = "SystemTime"
+
+
+"""Field of `DATABASE_FIELDS` holding the times of the authentications, as written by Windows."""
+
+
+EPOCH_FIELD = "systemtimeepoch"
+
+
+"""Column of the times of the authentications in microseconds since epoch, UTC, filled at ingestion from `SystemTime` (see `Data.to_epoch`)."""
+
+
 class Fields(Enum):
     SubjectUser = ("subjectusersid", "subjectusername", "subjectdomainname")
     TargetUser = ("targetusersid", "targetusername", "targetdomainname")
@@ -8,6 +8,9 @@ import pandas as pd
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 
+from waad.utils.constants import EPOCH_FIELD
+
+
 class Data:
     """This class implements a DataFrame wrapper containing facilities. It is mostly a tool box full of static methods.
 
@@ -60,6 +63,111 @@ class Data:
         else:
             return Data(temp, converter)
 
+    @staticmethod
+    def get_inverse_converter(converter: Dict) -> Dict:
+        """Invert `converter` to get, for each meta-field, the conversion material from category to code."""
+        return {meta_field: {category: code for code, category in categories.items()} for meta_field, categories in converter.items()}
+
+    @staticmethod
+    def get_meta_field_column(data: pd.DataFrame, meta_field: Union[str, Tuple[str, ...]]) -> pd.Series:
+        """Get the column of `meta_field`, built on the fly from the single columns if `build_meta_fields` has not been applied on `data`."""
+        if meta_field in data.columns:
+            return data[meta_field]
+        return pd.Series(list(zip(*[data[f] for f in meta_field])), index=data.index)
+
+    @staticmethod
+    def encode_with_converter(data: pd.DataFrame, meta_fields: List, inverse_converter: Dict, unknown_code: int = -1, extend: bool = False) -> np.ndarray:
+        """Encode `data` column by column with an existing converter, inverted with `get_inverse_converter`.
+
+        Args:
+            data: Dataframe, slice of the total dataset, with or without its meta-fields built.
+            meta_fields: Meta-fields to encode, in the order of the returned columns.
+            inverse_converter: Dict containing the conversion material from category to code.
+            unknown_code: Code given to categories that are not in `inverse_converter`.
+            extend: If ``True``, categories that are not in `inverse_converter` are added to it with the next available code instead
+                of being encoded as `unknown_code`. This allows to encode a dataset chunk after chunk against a global dictionary.
+
+        Returns:
+            A `(number of rows, number of meta-fields)` array of codes.
+        """
+        codes = np.empty((data.shape[0], len(meta_fields)), dtype=np.int64)
+        for index, meta_field in enumerate(meta_fields):
+            column = Data.get_meta_field_column(data, meta_field)
+            if not isinstance(meta_field, tuple):
+                column = column.replace({np.nan: "?"})
+            categories = inverse_converter[meta_field]
+            if extend:
+                for value in column.unique():
+                    if value not in categories:
+                        categories[value] = len(categories)
+            codes[:, index] = np.fromiter((categories.get(value, unknown_code) for value in column), dtype=np.int64, count=column.size)
+        return codes
+
+    @staticmethod
+    def parse_times(times: pd.Series, errors: str = "raise") -> pd.Series:
+        """Parse a column of ISO8601 times (strings or datetimes) as UTC datetimes, naive times being considered as UTC. With `errors='coerce'`,
+        times that cannot be parsed, such as the '?' replacing missing values, are `NaT`."""
+        try:
+            return pd.to_datetime(times, utc=True, format="ISO8601", errors=errors)
+        except (TypeError, ValueError):
+            # Older versions of pandas do not know the 'ISO8601' format but infer it
+            return pd.to_datetime(times, utc=True, errors=errors)
+
+    @staticmethod
+    def to_epoch(times: pd.Series) -> np.ndarray:
+        """Convert a column of ISO8601 times (strings or datetimes) to an array of int64 microseconds since epoch, UTC. Naive times are
+        considered as UTC."""
+        times = Data.parse_times(times)
+        return np.asarray((times - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(microseconds=1), dtype=np.int64)
+
+    @staticmethod
+    def to_nullable_epoch(times: pd.Series) -> pd.Series:
+        """Same as `to_epoch`, as a nullable `Int64` series, times that cannot be parsed being `pd.NA` instead of raising."""
+        times = pd.Series(Data.parse_times(times, errors="coerce"))
+        return ((times - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(microseconds=1)).astype("Int64")
+
+    @staticmethod
+    def get_epochs(data: pd.DataFrame) -> np.ndarray:
+        """Get the times of the authentications of `data` in microseconds since epoch, from the column `systemtimeepoch` filled at ingestion if it
+        is there, else parsed from 'systemtime'. Missing epochs, of rows inserted before the column existed, are parsed as well."""
+        if EPOCH_FIELD not in data.columns:
+            return Data.to_epoch(data["systemtime"])
+        epochs = data[EPOCH_FIELD]
+        missing = epochs.isna().to_numpy()
+        if not missing.any():
+            return epochs.to_numpy(dtype=np.int64)
+        res = np.zeros(data.shape[0], dtype=np.int64)
+        res[~missing] = epochs[~missing].to_numpy(dtype=np.int64)
+        res[missing] = Data.to_epoch(data["systemtime"][missing])
+        return res
+
+    @staticmethod
+    def sort_by_time(data: pd.DataFrame, kind: str = "quicksort") -> pd.DataFrame:
+        """Sort `data` by time, on the column `systemtimeepoch` if it is there and complete, else on 'systemtime' compared as strings."""
+        if EPOCH_FIELD in data.columns and not data[EPOCH_FIELD].isna().any():
+            return data.sort_values(EPOCH_FIELD, kind=kind)
+        return data.sort_values("systemtime", kind=kind)
+
+    @staticmethod
+    def epoch_to_iso(epoch: int) -> str:
+        """Convert microseconds since epoch to an ISO8601 time 'YYYY-MM-DD HH:MM:SS[.ffffff]+00:00', inverse of `to_epoch`."""
+        return pd.Timestamp(int(epoch), unit="us", tz="UTC").isoformat(sep=" ")
+
+    @staticmethod
+    def stratified_sample(data: pd.DataFrame, by: List[Union[str, pd.Series]], frac: float, random_state: Optional[int] = None) -> pd.DataFrame:
+        """Sample the same fraction `frac` of each stratum of `data`, so that small strata are not missed by the sample.
+
+        Args:
+            data: Dataframe, slice of the total dataset.
+            by: Columns or series defining the strata, for instance `['host', data['systemtime'].str[:10]]` to stratify by host and day.
+            frac: Fraction of each stratum to sample. At least one row is sampled per stratum.
+            random_state: Seed of the sampling.
+        """
+        rng = np.random.RandomState(random_state)
+        strata = data.groupby(by, sort=False, dropna=False).indices.values()
+        positions = [rng.choice(indices, size=max(1, int(round(frac * len(indices)))), replace=False) for indices in strata]
+        return data.iloc[np.sort(np.concatenate(positions))] if positions else data.iloc[:0]
+
     @staticmethod
     def filter_dataframe_fields_on_values(data: pd.DataFrame, filter_values: Dict[str, List], to_keep: bool = True):
         """Filter `data` by matching targets for multiple columns.
@@ -114,7 +222,12 @@ class Data:
         # ISO8601 is not handled yet by datetime so as a fix we replace 'Z' by '+00:00'
 
         is_empty = data.shape[0] == 0
-        if not is_empty:
+        if not is_empty and EPOCH_FIELD in data.columns:
+            # Times parsed at ingestion, only the bounds are converted
+            time = Data.get_epochs(data)
+            min_time, max_time = (pd.Timestamp(int(epoch), unit="us", tz="UTC").to_pydatetime() for epoch in (time.min(), time.max()))
+            delta = max_time - min_time
+        elif not is_empty:
             time = data['systemtime'].apply(lambda x: datetime.fromisoformat(str(x).replace("Z", "+00:00")))
             min_time, max_time = min(time), max(time)
             delta = max_time - min_time
@@ -148,10 +148,10 @@ class ComputeFaitNotablesFromIndicators(ComputeFaitsNotables):
 
     def run(self):
         super().run()
+        self.compute_anomalies()
 
         for asset, indicators_dict in tqdm(list(self.indicators.items())):
             for indicator, series in indicators_dict.items():
-                series.compute_anomalies(anomalies_detector=indicator.anomalies_detector, config=self.config)
                 if series.anomalies != []:
                     self.faits_notables.append(
                         FaitNotable(
@@ -173,6 +173,24 @@ class ComputeFaitNotablesFromIndicators(ComputeFaitsNotables):
                     )
 
 
+    def compute_anomalies(self):
+        """Compute the anomalies of all series. Series of an indicator without a specific `anomalies_detector` are stacked in a matrix and all
+        processed at once by `StatSeries.batch_custom_outlier_detection`, others are processed one by one."""
+        batches: Dict[str, List[StatSeries]] = {}
+        for indicators_dict in self.indicators.values():
+            for indicator, series in indicators_dict.items():
+                if indicator.anomalies_detector is not None:
+                    series.compute_anomalies(anomalies_detector=indicator.anomalies_detector, config=self.config)
+                else:
+                    batches.setdefault(series.name, []).append(series)
+
+        for name, batch in batches.items():
+            indicator_bound = self.config[name]["indicator_bound"] if self.config is not None else None
+            anomalies = StatSeries.batch_custom_outlier_detection(StatSeries.get_padded_matrix([series.series for series in batch]), indicator_bound=indicator_bound)
+            for series, series_anomalies in zip(batch, anomalies):
+                series.anomalies = series_anomalies
+
+
 class ComputeFaitNotablesFromIsolatedMachines(ComputeFaitsNotables):
     """This class implements the computation of `FaitNotable` for isolated machines in H2.
 
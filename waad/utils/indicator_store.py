@@ -0,0 +1,244 @@
+"""This module implements a store of indicators of many assets on a global time grid, as one matrix per indicator."""
+
+
+import json
+import os
+import pickle
+import numpy as np
+from scipy import sparse as sp
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+from waad.utils.data import Data
+from waad.utils.time_series_utils import TimeSeries
+
+
+Matrix = Union[np.ndarray, sp.csr_matrix]
+
+
+class IndicatorStore:
+    """This class stores the indicators of all assets on a global grid of time steps, as an `(n_assets, n_buckets)` matrix per indicator.
+
+    Row `i` of a matrix holds the series of `assets[i]` on the grid, between the columns `spans[i, 0]` (included) and `spans[i, 1]` (excluded).
+    Outside of its span, a dense row is padded with NaN, so that cross-asset vectorised analyses (`np.nanmean(matrix, axis=1)`...) only see the
+    actual time steps of each asset, while a sparse row is implicitly 0 and only its non-zero values are stored. `TimeSeries` of an asset are
+    handed out on demand as views on the rows, see `get_time_series`. Intermediary contents are not kept. Stores are built by `from_indicators`, or
+    asset by asset by `ComputeIndicators` with a `store_format`, see `IndicatorStoreBuilder`.
+
+    Matrices can be saved as .npy files and loaded back memory-mapped, so that results of `ComputeIndicators` are reloaded instantly and only
+    the rows read are paged in.
+
+    Attributes:
+        assets (List[Any]): Assets of the rows of the matrices.
+        time_step (int): Time step in seconds of the grid.
+        origin (int): Start of the first time step of the grid, in microseconds since epoch.
+        spans (np.ndarray): `(n_assets, 2)` first and last + 1 time steps of the series of each asset on the grid.
+        matrices (Dict[str, Matrix]): Matrix of each indicator by name, dense `np.ndarray` or sparse `scipy.sparse.csr_matrix`.
+    """
+
+    def __init__(self, assets: List[Any], time_step: int, origin: int, spans: np.ndarray, matrices: Dict[str, Matrix]):
+        self.assets = assets
+        self.time_step = time_step
+        self.origin = origin
+        self.spans = spans
+        self.matrices = matrices
+        self.assets_index = {asset: index for index, asset in enumerate(assets)}
+
+    @property
+    def n_buckets(self) -> int:
+        return int(self.spans[:, 1].max()) if len(self.assets) > 0 else 0
+
+    @property
+    def is_sparse(self) -> bool:
+        return any(sp.issparse(matrix) for matrix in self.matrices.values())
+
+    @staticmethod
+    def from_indicators(indicators: Dict[Any, Dict[Any, TimeSeries]], time_step: int, sparse: bool = False) -> 'IndicatorStore':
+        """Build a store from the output of `ComputeIndicators`, `{asset: {indicator: TimeSeries}}`. To avoid holding all the series at once, let
+        `ComputeIndicators` build the store with its `store_format` instead.
+
+        Series must be aligned on a common grid, i.e. computed with a common `origin` (see `ComputeIndicators.compute_indicators_over_time`).
+        The grid of the store starts at the earliest series.
+
+        Args:
+            indicators: Dict containing, for each asset, its `TimeSeries` by indicator (an `Indicator` or its name).
+            time_step: Time step in seconds of the series.
+            sparse: If ``True``, matrices are `scipy.sparse.csr_matrix`, which is far lighter when most assets are inactive most of the time.
+
+        Raises:
+            ValueError: If a series does not have the time step `time_step`, has no start time or does not start on the grid.
+        """
+        builder = IndicatorStoreBuilder(time_step, sparse)
+        for asset, asset_indicators in indicators.items():
+            builder.add(asset, asset_indicators)
+        return builder.build()
+
+    @staticmethod
+    def get_name(indicator: Any) -> str:
+        return indicator if isinstance(indicator, str) else indicator.name
+
+    @staticmethod
+    def build_sparse_matrix(rows: List[Tuple[np.ndarray, np.ndarray]], offsets: np.ndarray, n_buckets: int) -> sp.csr_matrix:
+        """Build a CSR matrix from the non-zero values of the series of each asset and their positions in the series, starting at `offsets` on the
+        grid."""
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        indptr[1:] = np.cumsum([values.size for values, _ in rows])
+        data = [values for values, _ in rows]
+        indices = [positions + offsets[index] for index, (_, positions) in enumerate(rows)]
+        return sp.csr_matrix(
+            (np.concatenate(data) if data else np.zeros(0), np.concatenate(indices) if indices else np.zeros(0, dtype=np.int64), indptr),
+            shape=(len(rows), n_buckets),
+        )
+
+    def get_row(self, asset: Any, name: str) -> np.ndarray:
+        """Get the series of indicator `name` of `asset` on its span, a view on the matrix if it is dense."""
+        index = self.assets_index[asset]
+        first, end = self.spans[index]
+        matrix = self.matrices[name]
+        if sp.issparse(matrix):
+            return matrix[index, first:end].toarray().ravel()
+        return matrix[index, first:end]
+
+    def get_time_series(self, asset: Any, name: str) -> TimeSeries:
+        """Get the `TimeSeries` of indicator `name` of `asset`, starting at the first time step of the asset as the output of `ComputeIndicators`."""
+        start_time = Data.epoch_to_iso(self.origin + int(self.spans[self.assets_index[asset], 0]) * self.time_step * 10 ** 6)
+        return TimeSeries(name=name, series=self.get_row(asset, name), time_step=self.time_step, start_time=start_time)
+
+    def get_indicators(self, asset: Any) -> Dict[str, TimeSeries]:
+        """Get the `TimeSeries` of all indicators of `asset`."""
+        return {name: self.get_time_series(asset, name) for name in self.matrices}
+
+    def save(self, directory: str):
+        """Save the store in `directory`: metadata as json, assets pickled and matrices as .npy files, to be loaded memory-mapped by `load`."""
+        os.makedirs(directory, exist_ok=True)
+        metadata = {'time_step': self.time_step, 'origin': self.origin, 'indicators': {}}
+        for position, (name, matrix) in enumerate(self.matrices.items()):
+            prefix = f'indicator_{position}'
+            if sp.issparse(matrix):
+                for attribute in ['data', 'indices', 'indptr']:
+                    np.save(os.path.join(directory, f'{prefix}_{attribute}.npy'), getattr(matrix, attribute))
+            else:
+                np.save(os.path.join(directory, f'{prefix}.npy'), matrix)
+            metadata['indicators'][name] = {'prefix': prefix, 'sparse': sp.issparse(matrix), 'shape': list(matrix.shape)}
+
+        np.save(os.path.join(directory, 'spans.npy'), self.spans)
+        with open(os.path.join(directory, 'assets.pkl'), 'wb') as f:
+            pickle.dump(self.assets, f)
+        with open(os.path.join(directory, 'metadata.json'), 'w') as f:
+            json.dump(metadata, f)
+
+    @staticmethod
+    def load(directory: str, mmap_mode: Optional[str] = 'r') -> 'IndicatorStore':
+        """Load a store saved with `save`.
+
+        Args:
+            directory: Directory the store has been saved in.
+            mmap_mode: Memory-map mode of the matrices, see `np.load`. With the default 'r', nothing is read before being accessed and the
+                matrices are read-only. If `None`, matrices are read in memory.
+        """
+        with open(os.path.join(directory, 'metadata.json')) as f:
+            metadata = json.load(f)
+        with open(os.path.join(directory, 'assets.pkl'), 'rb') as f:
+            assets = pickle.load(f)
+
+        matrices: Dict[str, Matrix] = {}
+        for name, description in metadata['indicators'].items():
+            path = os.path.join(directory, description['prefix'])
+            if description['sparse']:
+                arrays = [np.load(f'{path}_{attribute}.npy', mmap_mode=mmap_mode) for attribute in ['data', 'indices', 'indptr']]
+                matrices[name] = sp.csr_matrix(tuple(arrays), shape=tuple(description['shape']), copy=False)
+            else:
+                matrices[name] = np.load(f'{path}.npy', mmap_mode=mmap_mode)
+
+        return IndicatorStore(assets, metadata['time_step'], metadata['origin'], np.load(os.path.join(directory, 'spans.npy')), matrices)
+
+
+class IndicatorStoreBuilder:
+    """This class builds an `IndicatorStore` asset by asset: the series of each asset are reduced to their values as soon as they are added, the
+    non-zero ones only if the store is sparse, so that neither its `TimeSeries` nor their intermediary contents are kept.
+
+    Attributes:
+        time_step (int): Time step in seconds of the series.
+        sparse (bool): Whether the matrices of the store are `scipy.sparse.csr_matrix`, see `IndicatorStore.from_indicators`.
+        assets (List[Any]): Assets added, in order.
+        starts (List[int]): Start of the series of each asset, in microseconds since epoch.
+        lengths (List[int]): Length of the longest series of each asset.
+        rows (Dict[str, Dict[int, Any]]): For each indicator by name, the values of its series by asset index, or the non-zero values and their
+            positions in the series if `sparse`.
+    """
+
+    def __init__(self, time_step: int, sparse: bool = False):
+        self.time_step = time_step
+        self.sparse = sparse
+        self.assets: List[Any] = []
+        self.starts: List[int] = []
+        self.lengths: List[int] = []
+        self.rows: Dict[str, Dict[int, Any]] = {}
+        # Series of assets on a common grid mostly share a few start times
+        self.start_epochs: Dict[str, int] = {}
+
+    def add(self, asset: Any, indicators: Dict[Any, TimeSeries]):
+        """Add the series of `asset`, by indicator (an `Indicator` or its name), all starting at the same time.
+
+        Raises:
+            ValueError: If a series does not have the time step `time_step`, has no start time or does not start with the other series of `asset`.
+        """
+        index = len(self.assets)
+        start, length = None, 0
+        for indicator, time_series in indicators.items():
+            if time_series.time_step != self.time_step:
+                raise ValueError(f"Series {time_series.name} of {asset} has a time step of {time_series.time_step}s instead of {self.time_step}s")
+            if time_series.start_time is None:
+                raise ValueError(f"Series {time_series.name} of {asset} has no start time, so it cannot be placed on the grid")
+            series_start = self.get_start_epoch(time_series.start_time)
+            if start is not None and series_start != start:
+                raise ValueError(f"Series of {asset} do not all start at the same time")
+            start = series_start
+
+            values = np.asarray(time_series.series, dtype=np.float64)
+            length = max(length, values.size)
+            if self.sparse:
+                non_zero = np.flatnonzero(values)
+                self.rows.setdefault(IndicatorStore.get_name(indicator), {})[index] = (values[non_zero], non_zero)
+            else:
+                self.rows.setdefault(IndicatorStore.get_name(indicator), {})[index] = values
+
+        self.assets.append(asset)
+        self.starts.append(start if start is not None else 0)
+        self.lengths.append(length)
+
+    def get_start_epoch(self, start_time: str) -> int:
+        epoch = self.start_epochs.get(start_time)
+        if epoch is None:
+            epoch = self.start_epochs[start_time] = int(Data.to_epoch([start_time])[0])
+        return epoch
+
+    def build(self) -> IndicatorStore:
+        """Build the store on a grid starting at the earliest series. Values are released indicator by indicator as matrices are filled.
+
+        Raises:
+            ValueError: If series do not start on a common grid of `time_step` time steps.
+        """
+        step = self.time_step * 10 ** 6
+        starts = np.array(self.starts, dtype=np.int64)
+        origin = int(starts.min()) if starts.size > 0 else 0
+        offsets, remainders = np.divmod(starts - origin, step)
+        if remainders.any():
+            misaligned = self.assets[int(np.flatnonzero(remainders)[0])]
+            raise ValueError(f"Series of {misaligned} are not aligned on a common grid of {self.time_step}s time steps, compute them with a common `origin`")
+        spans = np.stack([offsets, offsets + np.array(self.lengths, dtype=np.int64)], axis=1)
+        n_buckets = int(spans[:, 1].max()) if starts.size > 0 else 0
+
+        matrices: Dict[str, Matrix] = {}
+        for name in list(self.rows):
+            rows = self.rows.pop(name)
+            if self.sparse:
+                empty = (np.zeros(0), np.zeros(0, dtype=np.int64))
+                matrices[name] = IndicatorStore.build_sparse_matrix([rows.get(index, empty) for index in range(len(self.assets))], offsets, n_buckets)
+            else:
+                matrix = np.full((len(self.assets), n_buckets), np.nan)
+                for index, row in rows.items():
+                    matrix[index, offsets[index]:offsets[index] + row.size] = row
+                matrices[name] = matrix
+
+        return IndicatorStore(list(self.assets), self.time_step, origin, spans, matrices)
@@ -1,21 +1,85 @@
 """This module implements the computation of some indicators on assets."""
 
 
-import bisect
-from datetime import datetime, timedelta
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 from enum import Enum
 from functools import partial
+import multiprocessing
 import numpy as np
+import os
 import pandas as pd
+import pickle
 from tqdm import tqdm
-from typing import Any, Callable, Dict, List, Optional
+from typing import AbstractSet, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 
-from waad.utils.asset import Asset
+from waad.utils.asset import ASSET_POOL, Asset
+from waad.utils.bitmaps import Bitmap, InternedSet, Interner
 from waad.utils.config import ANOMALIES_SCORES
+from waad.utils.constants import EPOCH_FIELD
+from waad.utils.data import Data
+from waad.utils.indicator_store import IndicatorStore, IndicatorStoreBuilder
 from waad.utils.postgreSQL_utils import Table
 from waad.utils.rule import Rule
-from waad.utils.time_series_utils import StatSeries, TimeSeries
+from waad.utils.sketches import DistinctCounter, HyperLogLog
+from waad.utils.time_series_utils import OnlineStatSeries, StatSeries, TimeSeries
+
+
+class Intermediate:
+    """Defines a named intermediate product computed once per time step and shared by all the indicators needing it, for instance the distinct
+    asset_2 reached on each time step. Intermediates can be derived from other ones, forming a DAG resolved by `sort_intermediates`.
+
+    Attributes:
+        name (str): Name of the intermediate product, identifying it.
+        additional_columns (List[str]): Columns needed to compute it, see `Indicator`.
+        step_by_step_computation (Optional[Callable]): Function computing the product on a window of authentications, see `Indicator`.
+        bucket_computation (Optional[Callable]): Vectorised equivalent of `step_by_step_computation` computing all time steps at once, see `Indicator`.
+        dependencies (List[Intermediate]): Intermediates it is derived from.
+        derive_function (Optional[Callable]): Function computing the product on a time step from the products of its `dependencies` on the same time
+            step, given in the same order, used instead of `step_by_step_computation` if there are `dependencies`.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        additional_columns: List[str] = [],
+        step_by_step_computation: Optional[Callable] = None,
+        bucket_computation: Optional[Callable] = None,
+        dependencies: List['Intermediate'] = [],
+        derive_function: Optional[Callable] = None,
+    ):
+        self.name = name
+        self.additional_columns = additional_columns
+        self.step_by_step_computation = step_by_step_computation
+        self.bucket_computation = bucket_computation
+        self.dependencies = dependencies
+        self.derive_function = derive_function
+
+    def __repr__(self):
+        return self.name
+
+    @staticmethod
+    def sort_intermediates(intermediates: List['Intermediate']) -> List['Intermediate']:
+        """Get `intermediates` and all their dependencies, once each, each one after its dependencies (topological order)."""
+        res: List[Intermediate] = []
+        visiting, visited = set(), set()
+
+        def visit(intermediate: Intermediate):
+            if intermediate.name in visited:
+                return
+            if intermediate.name in visiting:
+                raise ValueError(f"Intermediate {intermediate.name} depends on itself")
+            visiting.add(intermediate.name)
+            for dependency in intermediate.dependencies:
+                visit(dependency)
+            visiting.remove(intermediate.name)
+            visited.add(intermediate.name)
+            res.append(intermediate)
+
+        for intermediate in intermediates:
+            visit(intermediate)
+        return res
 
 
 class Indicator:    
@@ -42,6 +106,29 @@ class Indicator:
         anomalies_detector (Optional[Callable]): This function defines how to compute possible anomalies on the `StatSeries` corresponding to the indicator. If 
             `None`, the StatSeries.custom_outlier_detection wil be used with parameters correponding to the indicator written in config.py. Else, `anomalies_detector`
             must be a function taking as an input the StatSeries.series and returning the possible anomalies detected in a list of indices.
+        bucket_computation (Optional[Callable]): Vectorised equivalent of `step_by_step_computation` computing all time steps at once, way faster on
+            sparse assets with many empty windows. It must be a function taking as input the authentications dataframe, the array of the time step
+            index (bucket) of each authentication and the number of buckets, and returning the list of the results of `step_by_step_computation` for
+            each bucket, empty ones included. If `None`, `step_by_step_computation` is applied on every window.
+        aggregation (Optional[str]): Name of the per-bucket aggregate `step_by_step_computation` is equivalent to, for the computation of the
+            indicator by PostgreSQL (see `ComputeIndicators.aggregate`): 'nb_authentications' for the number of authentications, 'asset_2' for the
+            set of distinct asset_2, 'asset_2_counter' for the `DistinctCounter` of distinct asset_2 and 'privileges' for the set of distinct
+            privileges. If `None`, the indicator needs the raw authentications.
+        stateful_function (Optional[Callable]): Equivalent of `intermediary_content_function` and `time_series_function` for indicators whose values
+            depend on previous time steps, used by `ComputeIncrementalIndicators` to compute only new time steps. It must be a function taking as input
+            its state (`None` the first time) and the results of `step_by_step_computation` on the new time steps, and returning its new state, the
+            intermediary content and the series of the new time steps. States must be picklable. If `None`, `intermediary_content_function` and
+            `time_series_function` are applied on the new time steps only.
+        rollup_function (Optional[Callable]): Function merging the results of `step_by_step_computation` on consecutive time steps into the result on
+            a time step `ratio` times longer, used to derive coarser resolutions from the finest one (see `ComputeIndicators.rollup_time_steps`). It
+            must be a function taking as input the list of the results of a multiple of `ratio` time steps and `ratio`, and returning the list of the
+            results of the coarser time steps, for instance `ComputeIndicators.sum_rollup` for counts and `ComputeIndicators.union_rollup` for sets.
+        intermediate (Optional[Intermediate]): If not `None`, the results of the indicator on each time step are the ones of this intermediate
+            product, computed once and shared with the other indicators needing it, instead of `step_by_step_computation` and `bucket_computation`.
+        baseline_function (Optional[Callable]): Equivalent of `intermediary_content_function` and `time_series_function` used when a baseline time
+            range is given (see `ComputeIndicators.baseline`), for indicators comparing each time step to a legitimate model. It must be a function
+            taking as input the results of `step_by_step_computation` and the number of time steps of the baseline at their start, and returning the
+            intermediary content and the series. If `None`, `intermediary_content_function` and `time_series_function` are applied.
     """
 
     def __init__(self, 
@@ -50,7 +137,13 @@ class Indicator:
         step_by_step_computation: Callable = lambda window: window.shape[0], 
         intermediary_content_function: Optional[Callable] = None,
         time_series_function: Optional[Callable] = None,
-        anomalies_detector: Optional[Callable] = None
+        anomalies_detector: Optional[Callable] = None,
+        bucket_computation: Optional[Callable] = None,
+        aggregation: Optional[str] = None,
+        stateful_function: Optional[Callable] = None,
+        rollup_function: Optional[Callable] = None,
+        intermediate: Optional[Intermediate] = None,
+        baseline_function: Optional[Callable] = None,
     ):
 
         self.name = name
@@ -59,11 +152,136 @@ class Indicator:
         self.intermediary_content_function = intermediary_content_function
         self.time_series_function = time_series_function
         self.anomalies_detector = anomalies_detector
+        self.bucket_computation = bucket_computation
+        self.aggregation = aggregation
+        self.stateful_function = stateful_function
+        self.rollup_function = rollup_function
+        self.intermediate = intermediate
+        self.baseline_function = baseline_function
     
     def __repr__(self):
         return self.name
 
 
+class NewItemsModel:
+    """This class implements the legitimate model of items reached used by `ComputeIndicators.compute_new_items`, that can be updated with new
+    time steps.
+
+    The number of time steps of the legitimate model is fixed by the first update, as a percentage of its number of time steps, so that
+    the new items of a time step never change once computed.
+
+    Attributes:
+        legitimate_model_duration (int): Percentage of the time steps of the first update used to build the legitimate model.
+        enrich_model (bool): If ``True``, new items after the legitimate model are used to enrich it.
+        legitimate_model (Optional[Set]): Items considered as legitimate, a set or an `InternedSet` like the items reached, `None` before the
+            first update.
+        model_buckets (Optional[int]): Index of the last time step of the legitimate model, `None` before the first update unless it is given,
+            for instance from the time steps of a baseline.
+        n_buckets (int): Number of time steps seen.
+    """
+
+    def __init__(self, legitimate_model_duration: int = 25, enrich_model: bool = True, model_buckets: Optional[int] = None):
+        self.legitimate_model_duration = legitimate_model_duration
+        self.enrich_model = enrich_model
+        self.legitimate_model: Optional[AbstractSet] = None
+        self.model_buckets = model_buckets
+        self.n_buckets = 0
+
+    def update(self, items_sets: List[set]) -> List[set]:
+        """Update the model with the items reached on new time steps and return the new items of each one."""
+        if self.model_buckets is None and len(items_sets) > 0:
+            self.model_buckets = int(self.legitimate_model_duration / 100 * len(items_sets))
+
+        new_items: List[AbstractSet] = []
+        for items in items_sets:
+            if isinstance(items, InternedSet) and isinstance(self.legitimate_model, InternedSet) and items.interner is not self.legitimate_model.interner:
+                # Items interned by another run are converted once to the interner of the model
+                items = InternedSet(self.legitimate_model.get_bitmap(items), self.legitimate_model.interner)
+
+            if self.legitimate_model is None:
+                new_items.append(set())
+                self.legitimate_model = items.copy()
+            elif self.n_buckets <= self.model_buckets:
+                new_items.append(set())
+                self.legitimate_model.update(items)
+            else:
+                new_items.append(items.difference(self.legitimate_model))
+                if self.enrich_model:
+                    self.legitimate_model.update(items)
+            self.n_buckets += 1
+
+        return new_items
+
+
+class PrivilegesVocabulary:
+    """This class implements a vocabulary of the privileges of the privilege lists (e.g. 'SeBackupPrivilege:SeDebugPrivilege'), each privilege
+    being given a bit so that a privilege list is a bitmask and the privileges granted by many authentications are the bitwise OR of theirs.
+
+    Each distinct privilege list is split once for all, its bitmask being kept in memory. The unknown privilege '?' is given no bit.
+
+    Attributes:
+        privileges (List[str]): Privilege of each bit.
+        bits (Dict[str, int]): Bit of each privilege.
+        masks (Dict[str, int]): Bitmask of each privilege list already seen.
+        decoded (Dict[int, frozenset]): Privileges of each bitmask already decoded.
+    """
+
+    def __init__(self):
+        self.privileges: List[str] = []
+        self.bits: Dict[str, int] = {}
+        self.masks: Dict[str, int] = {}
+        self.decoded: Dict[int, frozenset] = {}
+
+    def get_mask(self, privilege_list: str) -> int:
+        mask = self.masks.get(privilege_list)
+        if mask is None:
+            mask = 0
+            for privilege in privilege_list.split(':'):
+                if privilege == '?':
+                    continue
+                if privilege not in self.bits:
+                    self.bits[privilege] = len(self.privileges)
+                    self.privileges.append(privilege)
+                mask |= 1 << self.bits[privilege]
+            self.masks[privilege_list] = mask
+        return mask
+
+    def get_masks(self, privilege_lists: pd.Series) -> np.ndarray:
+        """Get the bitmask of each privilege list of a column, each distinct one being looked up once. Missing lists grant no privilege.
+
+        Masks are `uint64` while the vocabulary holds at most 64 privileges, Python integers (`object`) beyond.
+        """
+        codes, uniques = pd.factorize(privilege_lists, sort=False)
+        masks = [self.get_mask(privilege_list) for privilege_list in uniques]
+        dtype = np.uint64 if len(self.privileges) <= 64 else object
+        return np.append(np.array(masks, dtype=dtype), np.array([0], dtype=dtype))[codes]
+
+    def decode(self, mask: int) -> set:
+        privileges = self.decoded.get(mask)
+        if privileges is None:
+            privileges = self.decoded[mask] = frozenset(privilege for bit, privilege in enumerate(self.privileges) if (mask >> bit) & 1)
+        return set(privileges)
+
+    def get_privileges(self, privilege_lists: pd.Series) -> set:
+        """Get the distinct privileges granted by a column of privilege lists."""
+        masks = self.get_masks(privilege_lists)
+        return self.decode(int(np.bitwise_or.reduce(masks)) if masks.size > 0 else 0)
+
+    def get_privileges_per_bucket(self, privilege_lists: pd.Series, buckets: np.ndarray, n_buckets: int) -> List[set]:
+        """Get the distinct privileges granted on each bucket, `buckets` being sorted, with one bitwise OR reduction per non-empty bucket."""
+        res: List[set] = [set() for _ in range(n_buckets)]
+        bounds = np.searchsorted(buckets, np.arange(n_buckets + 1))
+        non_empty = np.flatnonzero(np.diff(bounds))
+        if non_empty.size > 0:
+            masks = np.bitwise_or.reduceat(self.get_masks(privilege_lists), bounds[non_empty])
+            for bucket, mask in zip(non_empty.tolist(), masks.tolist()):
+                res[bucket] = self.decode(int(mask))
+        return res
+
+
+PRIVILEGES_VOCABULARY = PrivilegesVocabulary()
+
+
 class ComputeIndicators:
     """This class defines a framework to compute timeseries indicators from a dataset.
 
@@ -72,52 +290,499 @@ class ComputeIndicators:
         rule (Rule): `Rule` object defining how to filter dataset rows based on analysts' requirements.
         time_step (int): Time step in between each time series tick.
         indicator_objects (List[Indicator]): List of all types of indicators we want to compute for each asset_1 object.
+        chunk_size (int): Number of rows fetched and processed at once. Conditions of `rule` providing vectorised forms (see `Rule`) are evaluated
+            on the whole chunk, the other ones row by row.
+        aggregate (bool): If `True`, authentications are aggregated per asset and time step by PostgreSQL, with `GROUP BY` requests giving counts and
+            distinct sets, so that only one row per asset and time step crosses the wire. All conditions of `rule` must be declarative with the same
+            asset keys, the same keys always giving the same assets, and all indicators must have an ``aggregation``.
+        n_jobs (int): Number of worker processes computing the indicators of the assets once authentications are gathered. If greater than 1, assets
+            are partitioned across a process pool and their authentications are sent as arrays of columns.
+        start_method (str): Start method of the worker processes. With 'fork', indicators are inherited by the workers and can be any callables,
+            else they are pickled by name and must be ones of `Indicators`.
+        origin (Optional[str]): If not `None`, ISO time of the start of a global grid of time steps shared by all assets, instead of time steps
+            starting at the first authentication of each asset. Time series of different assets are then aligned, see `compute_indicators_over_time`.
+        rollup_time_steps (List[int]): Coarser time steps, multiples of `time_step`, whose indicators are rolled up from the ones on `time_step`
+            in the same run, see `compute_indicators_over_time_multi_resolution`. All indicators must have a ``rollup_function``.
+        rollups (Dict[int, Dict[Asset, Dict[Indicator, TimeSeries]]]): Indicators of each of `rollup_time_steps`.
+        baseline (Optional[Tuple[str, str]]): ISO start (included) and end (excluded) times of the baseline, the time range on which legitimate
+            models are built (see `Indicator.baseline_function`) instead of a percentage of the time steps of each asset.
+        analysis (Optional[Tuple[str, str]]): ISO start (included) and end (excluded) times of the time range to investigate, after `baseline`.
+            If `baseline` or `analysis` is given, only the authentications of their time range are requested, with filters on times pushed to
+            PostgreSQL (see `get_time_filters`, and `Table.add_epoch_column` to give older tables an indexed epoch column), and the series of all
+            assets span the whole range on a grid starting at its start, unless `origin` is given.
+        epoch_column (Optional[bool]): Whether the table has the column `systemtimeepoch` filled at ingestion (see `Table.add_to_table`), which
+            is then requested and used instead of parsing 'systemtime'. `None` until checked.
+        store_format (Optional[str]): If 'dense' or 'sparse', the indicators on `time_step` are gathered in `store` as soon as the ones of each
+            asset are computed, instead of `indicators` which stays empty, see `IndicatorStore.from_indicators`. Assets need a common grid, given by
+            `origin`, `baseline` or `analysis`.
+        store (Optional[IndicatorStore]): Indicators on `time_step` of all assets if `store_format` is given, once computed.
     """
 
-    def __init__(self, table: Table, rule: Rule, indicator_objects: List[Indicator], time_step: int = 86400):
+    def __init__(
+        self,
+        table: Table,
+        rule: Rule,
+        indicator_objects: List[Indicator],
+        time_step: int = 86400,
+        chunk_size: int = 1000000,
+        aggregate: bool = False,
+        n_jobs: int = 1,
+        start_method: str = 'fork',
+        origin: Optional[str] = None,
+        rollup_time_steps: List[int] = [],
+        baseline: Optional[Tuple[str, str]] = None,
+        analysis: Optional[Tuple[str, str]] = None,
+        store_format: Optional[str] = None,
+    ):
+        ComputeIndicators.check_time_ranges(baseline, analysis)
+        if store_format not in (None, 'dense', 'sparse'):
+            raise ValueError(f"Unknown store format {store_format}, expected 'dense' or 'sparse'")
+        if any(rollup_time_step <= time_step or rollup_time_step % time_step != 0 for rollup_time_step in rollup_time_steps):
+            raise ValueError(f"Rollup time steps must be multiples of the time step {time_step}s")
+        if rollup_time_steps and any(indicator.rollup_function is None for indicator in indicator_objects):
+            raise ValueError("Rollups need indicators that all have a rollup function")
+
         self.table = table
         self.rule = rule
         self.indicator_objects = indicator_objects
         self.time_step = time_step
+        self.chunk_size = chunk_size
+        self.aggregate = aggregate
+        self.n_jobs = n_jobs
+        self.start_method = start_method
+        self.rollup_time_steps = sorted(set(rollup_time_steps))
+        self.baseline = baseline
+        self.analysis = analysis
+        time_range = ComputeIndicators.get_time_range(baseline, analysis)
+        self.origin = origin if origin is not None or time_range is None else Data.epoch_to_iso(time_range[0])
+        if store_format is not None and self.origin is None:
+            raise ValueError("An indicator store needs the series of all assets on a common grid, give an origin or a time range")
+        self.store_format = store_format
 
         self.indicators: Dict[Asset, Dict[Indicator, TimeSeries]] = {}
+        self.rollups: Dict[int, Dict[Asset, Dict[Indicator, TimeSeries]]] = {time_step: {} for time_step in self.rollup_time_steps}
+        self.epoch_column: Optional[bool] = None
+        self.store: Optional[IndicatorStore] = None
+        self.store_builder: Optional[IndicatorStoreBuilder] = None
+
+    @property
+    def time_steps(self) -> List[int]:
+        return [self.time_step] + self.rollup_time_steps
+
+    @property
+    def indicators_by_resolution(self) -> Dict[int, Dict[Asset, Dict[Indicator, TimeSeries]]]:
+        """Indicators of each time step, `time_step` and `rollup_time_steps`."""
+        return {self.time_step: self.indicators, **self.rollups}
+
+    @staticmethod
+    def check_time_ranges(baseline: Optional[Tuple[str, str]], analysis: Optional[Tuple[str, str]]):
+        epochs = {
+            name: [ComputeIndicators.get_origin_epoch(time) for time in time_range]
+            for name, time_range in (('baseline', baseline), ('analysis', analysis))
+            if time_range is not None
+        }
+        for name, (start, end) in epochs.items():
+            if start >= end:
+                raise ValueError(f"The {name} time range must start before it ends")
+        if len(epochs) == 2 and epochs['baseline'][1] > epochs['analysis'][0]:
+            raise ValueError("The baseline time range must end before the analysis one starts")
+
+    @staticmethod
+    def get_time_range(baseline: Optional[Tuple[str, str]], analysis: Optional[Tuple[str, str]]) -> Optional[Tuple[int, int]]:
+        """Get the start and end, in microseconds since epoch, of the time range spanned by `baseline` and `analysis`, `None` if both are `None`."""
+        time_ranges = [time_range for time_range in (baseline, analysis) if time_range is not None]
+        if not time_ranges:
+            return None
+        return ComputeIndicators.get_origin_epoch(time_ranges[0][0]), ComputeIndicators.get_origin_epoch(time_ranges[-1][1])
+
+    @staticmethod
+    def get_series_bounds(
+        first_epoch: int, last_epoch: int, origin: Optional[str], baseline: Optional[Tuple[str, str]], analysis: Optional[Tuple[str, str]]
+    ) -> Tuple[int, int, Optional[str]]:
+        """Get the first and last times covered by a series and the origin of its grid: the times of the first and last authentications and
+        `origin`, or the bounds of the time range of `baseline` and `analysis` and, unless `origin` is given, its start."""
+        time_range = ComputeIndicators.get_time_range(baseline, analysis)
+        if time_range is None:
+            return first_epoch, last_epoch, origin
+        return time_range[0], time_range[1] - 1, origin if origin is not None else Data.epoch_to_iso(time_range[0])
+
+    @staticmethod
+    def select_time_range(
+        data: pd.DataFrame, epochs: np.ndarray, baseline: Optional[Tuple[str, str]], analysis: Optional[Tuple[str, str]]
+    ) -> Tuple[pd.DataFrame, np.ndarray]:
+        """Keep the authentications of `data`, at times `epochs`, in the time range of `baseline` and `analysis`, all of them if both are `None`."""
+        time_range = ComputeIndicators.get_time_range(baseline, analysis)
+        if time_range is None:
+            return data, epochs
+        in_range = (epochs >= time_range[0]) & (epochs < time_range[1])
+        if in_range.all():
+            return data, epochs
+        return data[in_range].reset_index(drop=True), epochs[in_range]
+
+    @staticmethod
+    def get_baseline_buckets(baseline: Optional[Tuple[str, str]], grid_origin: int, first_bucket: int, time_step: int) -> Optional[int]:
+        """Get the number of time steps of a series starting at time step `first_bucket` of its grid that overlap `baseline`, `None` without it."""
+        if baseline is None:
+            return None
+        step = time_step * 10 ** 6
+        return -(-(ComputeIndicators.get_origin_epoch(baseline[1]) - grid_origin) // step) - first_bucket
+
+    def build_store(self):
+        """Build `store` from the indicators added by `set_asset_indicators`, if `store_format` is given."""
+        if self.store_format is None:
+            return
+        builder = self.store_builder if self.store_builder is not None else IndicatorStoreBuilder(self.time_step, sparse=self.store_format == 'sparse')
+        self.store = builder.build()
+        self.store_builder = None
+
+    def has_epoch_column(self) -> bool:
+        if self.epoch_column is None:
+            self.epoch_column = self.table.has_column(EPOCH_FIELD)
+        return self.epoch_column
+
+    def set_asset_indicators(self, asset: Asset, indicators_by_time_step: Dict[int, Dict[Indicator, TimeSeries]]):
+        if self.store_format is None:
+            self.indicators[asset] = indicators_by_time_step[self.time_step]
+        else:
+            if self.store_builder is None:
+                self.store_builder = IndicatorStoreBuilder(self.time_step, sparse=self.store_format == 'sparse')
+            self.store_builder.add(asset, indicators_by_time_step[self.time_step])
+        for time_step in self.rollup_time_steps:
+            self.rollups[time_step][asset] = indicators_by_time_step[time_step]
 
     def run(self):
-        cache = {}
-        additional_columns = [e for indicator in self.indicator_objects for e in indicator.additional_columns]
-
-        def update_cache(row: List, dataset_columns: List[str], condition: Dict):
-            row = {col: value for col, value in zip(dataset_columns, row)}
-            
-            if condition['filter_function'](row):
-                asset_1 = condition['asset_1'](row)
-                asset_2 = condition['asset_2'](row)
-                
-                line_summary = {'systemtime': row['systemtime'], 'asset_2': asset_2}
-                line_summary.update({col: row[col] for col in additional_columns})
-
-                try:
-                    cache[asset_1].append(line_summary)
-                except Exception:
-                    cache[asset_1] = [line_summary]
-
-        for condition in self.rule.conditions:
-            sql_command = self.table.custom_psql_request({'fields_to_request': '*', 'filters': [condition['pre_filters']]})
-            cursor = self.table.database.get_iterator_from_command(sql_command, chunk_size=1000000)
-            row_0 = next(cursor)
-            columns = [desc[0] for desc in cursor.description]
+        if self.aggregate:
+            self.run_aggregated()
+            return
 
-            update_cache(row_0, columns, condition)
+        cache: Dict[Asset, List[pd.DataFrame]] = {}
 
-            for row in cursor:
-                update_cache(row, columns, condition)
+        for condition_index, condition in enumerate(self.rule.conditions):
+            sql_command = self.get_condition_request(condition)
+            if Rule.is_declarative(condition):
+                condition = Rule.compile_condition(condition)
+            cursor = self.table.database.get_iterator_from_command(sql_command, chunk_size=self.chunk_size)
+            # Assets are built once per distinct value of their columns, for the whole condition
+            assets_memo: Dict[str, Dict] = {'asset_1': {}, 'asset_2': {}}
+
+            rows = cursor.fetchmany(self.chunk_size)
+            columns = [desc[0] for desc in cursor.description]
+            while rows:
+                chunk = self.select_new_rows(pd.DataFrame.from_records(rows, columns=columns), condition_index)
+                self.consume_chunk(chunk, condition, cache, assets_memo)
+                rows = cursor.fetchmany(self.chunk_size)
             cursor.close()
         self.table.database.disconnect()
 
+        self.finalize(cache)
+
+    def select_new_rows(self, chunk: pd.DataFrame, condition_index: int) -> pd.DataFrame:
+        """Select the rows of a chunk requested for the condition of index `condition_index` that were not consumed yet, all of them here. See
+        `ComputeIncrementalIndicators.select_new_rows`."""
+        return chunk
+
+    def get_additional_columns(self) -> List[str]:
+        intermediates = Intermediate.sort_intermediates([indicator.intermediate for indicator in self.indicator_objects if indicator.intermediate is not None])
+        columns = [e for indicator in self.indicator_objects for e in indicator.additional_columns] + [e for intermediate in intermediates for e in intermediate.additional_columns]
+        return list(dict.fromkeys(columns))
+
+    def get_aggregated_request(self) -> str:
+        """Build the request aggregating the authentications of all conditions per asset_1 and time step.
+
+        Time steps of each asset_1 start at its first authentication, whatever the condition, as in `compute_indicators_over_time`, or at `origin` if
+        it is given. The first and last times of the asset_1 are given along with each of its time steps.
+        """
+        projections = [Rule.get_projection(condition) for condition in self.rule.conditions]
+        if not all(Rule.is_declarative(condition) for condition in self.rule.conditions) or any(list(p) != list(projections[0]) for p in projections):
+            raise ValueError("Aggregation needs declarative conditions, all with the same asset keys")
+        aggregations = {indicator.aggregation for indicator in self.indicator_objects}
+        if None in aggregations:
+            raise ValueError("Aggregation needs indicators that all have an aggregation")
+
+        selects = []
+        for index, (condition, projection) in enumerate(zip(self.rule.conditions, projections)):
+            fields = [f'{index} AS condition_index', f'{ComputeIndicators.get_epoch_expression(self.has_epoch_column())} AS epoch']
+            fields += [f'{expression.to_sql()} AS {alias}' for alias, expression in projection.items()]
+            if 'privileges' in aggregations:
+                fields.append('privilegelist')
+            filters = [Table.and_join(condition['pre_filters'])] if condition.get('pre_filters') else []
+            where_clause = Rule.get_where_clause(condition)
+            if where_clause is not None:
+                filters.append(where_clause)
+            filters += self.get_time_filters()
+            selects.append(f"SELECT {', '.join(fields)} FROM {self.table.table_name}{' WHERE ' + ' AND '.join(filters) if filters else ''}")
+
+        asset_1_columns = ', '.join([alias for alias in projections[0] if alias.startswith('asset_1_')])
+        asset_2_columns = ', '.join([alias for alias in projections[0] if alias.startswith('asset_2_')])
+        aggregates = ['COUNT(*) AS nb_authentications']
+        if aggregations & {'asset_2', 'asset_2_counter'}:
+            aggregates.append(f'jsonb_agg(DISTINCT jsonb_build_array({asset_2_columns})) AS asset_2_keys')
+        if 'privileges' in aggregations:
+            aggregates.append('array_agg(DISTINCT privilegelist) AS privilege_lists')
+
+        step = self.time_step * 10 ** 6
+        if self.origin is None:
+            bucket = f'(epoch - origin) / {step}'
+        else:
+            # Integer division truncates towards 0, so the floor of the exact numeric division is used for times before the origin
+            bucket = f'floor((epoch - {ComputeIndicators.get_origin_epoch(self.origin)})::numeric / {step})::bigint'
+
+        return f"""
+            WITH events AS ({' UNION ALL '.join(selects)}),
+            bucketed AS (
+                SELECT *, MIN(epoch) OVER asset AS origin, MAX(epoch) OVER asset AS last_epoch
+                FROM events
+                WINDOW asset AS (PARTITION BY {asset_1_columns})
+            )
+            SELECT condition_index, {asset_1_columns}, origin, last_epoch, {bucket} AS bucket, {', '.join(aggregates)}
+            FROM bucketed
+            GROUP BY condition_index, {asset_1_columns}, origin, last_epoch, bucket;
+        """
+
+    @staticmethod
+    def get_origin_epoch(origin: str) -> int:
+        return int(Data.to_epoch(pd.Series([origin]))[0])
+
+    @staticmethod
+    def get_epoch_expression(epoch_column: bool = False) -> str:
+        """SQL expression of the time of an authentication in microseconds since epoch, see `Data.to_epoch`. If `epoch_column`, the column
+        `systemtimeepoch` filled at ingestion is used as is, without parsing 'systemtime'. Else times without time zone are read in the time zone
+        of the session, UTC for connections of `Database`."""
+        if epoch_column:
+            return EPOCH_FIELD
+        return "(EXTRACT(EPOCH FROM systemtime::timestamptz) * 1000000)::bigint"
+
+    def run_aggregated(self):
+        cursor = self.table.database.get_iterator_from_command(self.get_aggregated_request(), chunk_size=self.chunk_size)
+        rows = cursor.fetchmany(self.chunk_size)
+        columns = [desc[0] for desc in cursor.description]
+        aggregates: Dict[Asset, Dict] = {}
+        assets_memos: List[Dict[str, Dict]] = [{'asset_1': {}, 'asset_2': {}} for _ in self.rule.conditions]
+        while rows:
+            self.consume_aggregated_chunk(pd.DataFrame.from_records(rows, columns=columns), aggregates, assets_memos)
+            rows = cursor.fetchmany(self.chunk_size)
+        cursor.close()
+        self.table.database.disconnect()
+
+        self.finalize_aggregated(aggregates)
+
+    def consume_aggregated_chunk(self, chunk: pd.DataFrame, aggregates: Dict[Asset, Dict], assets_memos: List[Dict[str, Dict]]):
+        """Gather the per time step aggregates of a chunk of the result of `get_aggregated_request` by asset_1."""
+        asset_1_names = list(self.rule.conditions[0]['asset_1_keys'])
+        asset_2_names = list(self.rule.conditions[0]['asset_2_keys'])
+
+        for row in chunk.to_dict('records'):
+            condition = self.rule.conditions[row['condition_index']]
+            memos = assets_memos[row['condition_index']]
+
+            key_1 = tuple([row[f'asset_1_{name}'] for name in asset_1_names])
+            if key_1 not in memos['asset_1']:
+                memos['asset_1'][key_1] = ASSET_POOL.get_canonical(condition['asset_1'](dict(zip(asset_1_names, key_1))))
+            asset_aggregates = aggregates.setdefault(memos['asset_1'][key_1], {'origin': row['origin'], 'last_epoch': row['last_epoch'], 'buckets': {}})
+
+            bucket = asset_aggregates['buckets'].setdefault(int(row['bucket']), {'nb_authentications': 0, 'asset_2': set(), 'privileges': 0})
+            bucket['nb_authentications'] += int(row['nb_authentications'])
+            for key_2 in row.get('asset_2_keys') or []:
+                key_2 = tuple(key_2)
+                if key_2 not in memos['asset_2']:
+                    memos['asset_2'][key_2] = ASSET_POOL.get_canonical(condition['asset_2'](dict(zip(asset_2_names, key_2))))
+                bucket['asset_2'].add(memos['asset_2'][key_2])
+            for privilege_list in row.get('privilege_lists') or []:
+                if privilege_list is not None:
+                    bucket['privileges'] |= PRIVILEGES_VOCABULARY.get_mask(privilege_list)
+
+    def finalize_aggregated(self, aggregates: Dict[Asset, Dict]):
+        """Compute the indicators of each asset_1 from its aggregates gathered by `consume_aggregated_chunk`."""
+        for asset, asset_aggregates in aggregates.items():
+            # Same time steps as `compute_indicators_over_time_multi_resolution`
+            first_epoch, last_epoch, grid_origin = ComputeIndicators.get_series_bounds(
+                int(asset_aggregates['origin']), int(asset_aggregates['last_epoch']), self.origin, self.baseline, self.analysis
+            )
+            origin, first_bucket, end_bucket, grids = ComputeIndicators.get_rollup_grids(first_epoch, last_epoch, self.time_steps, grid_origin)
+            step_by_step_results: Dict[Indicator, List] = {indicator: [] for indicator in self.indicator_objects}
+            for index in range(first_bucket, end_bucket):
+                bucket = asset_aggregates['buckets'].get(index)
+                for indicator in self.indicator_objects:
+                    if indicator.aggregation == 'nb_authentications':
+                        step_by_step_results[indicator].append(bucket['nb_authentications'] if bucket is not None else 0)
+                    elif indicator.aggregation == 'asset_2':
+                        step_by_step_results[indicator].append(set(bucket['asset_2']) if bucket is not None else set())
+                    elif indicator.aggregation == 'asset_2_counter':
+                        threshold = ANOMALIES_SCORES['nb_assets_reached_sketch']['exact_threshold']
+                        step_by_step_results[indicator].append(DistinctCounter.from_items(bucket['asset_2'] if bucket is not None else [], threshold))
+                    else:
+                        step_by_step_results[indicator].append(PRIVILEGES_VOCABULARY.decode(bucket['privileges']) if bucket is not None else set())
+
+            self.set_asset_indicators(
+                asset, ComputeIndicators.rollup_time_series(step_by_step_results, first_bucket, origin, grids, self.indicator_objects, baseline=self.baseline)
+            )
+        self.build_store()
+
+    def get_condition_request(self, condition: Dict) -> str:
+        """Build the request of the rows of `condition`. For a declarative condition (see `Rule`), filters are applied and asset keys computed by
+        PostgreSQL, and only the needed columns are requested."""
+        time_filters = self.get_time_filters()
+        if not Rule.is_declarative(condition):
+            if not time_filters:
+                return self.table.custom_psql_request({'fields_to_request': '*', 'filters': [condition['pre_filters']]})
+            return f"SELECT * FROM {self.table.table_name} WHERE {Table.and_join(condition['pre_filters'], list(time_filters))};"
+
+        fields = ['systemtime'] + [col for col in self.get_additional_columns() if col != 'systemtime']
+        if self.has_epoch_column():
+            fields.append(EPOCH_FIELD)
+        fields += [f'{expression.to_sql()} AS {alias}' for alias, expression in Rule.get_projection(condition).items()]
+        filters = [Table.and_join(condition['pre_filters'])] if condition.get('pre_filters') else []
+        where_clause = Rule.get_where_clause(condition)
+        if where_clause is not None:
+            filters.append(where_clause)
+        filters += time_filters
+        return f"SELECT {', '.join(fields)} FROM {self.table.table_name}{' WHERE ' + ' AND '.join(filters) if filters else ''};"
+
+    def get_time_filters(self) -> List[str]:
+        """Get the filters on times of the requested authentications, the ones of the time range of `baseline` and `analysis` if any.
+
+        With the column `systemtimeepoch`, the filters compare it to the bounds, so that its index is used. Else the epoch expression parsing
+        'systemtime' cannot use an index nor prune partitions, so it is preceded by a range on the raw 'systemtime' strings, widened to whole days
+        and by a day on each side so that it holds whatever the ISO8601 format and time zone of the times, which only narrows the scan.
+        """
+        time_range = ComputeIndicators.get_time_range(self.baseline, self.analysis)
+        if time_range is None:
+            return []
+        return self.get_epoch_range_filters(time_range[0], time_range[1])
+
+    def get_epoch_range_filters(self, start: int, end: Optional[int] = None) -> List[str]:
+        """Get the filters keeping the authentications from `start` (included) to `end` (excluded, no bound if `None`), in microseconds since
+        epoch, see `get_time_filters`."""
+        epoch = ComputeIndicators.get_epoch_expression(self.has_epoch_column())
+        filters = [f"{epoch} >= {start}"] + ([f"{epoch} < {end}"] if end is not None else [])
+        if not self.has_epoch_column():
+            first_day = pd.Timestamp(start, unit='us', tz='UTC').floor('D') - pd.Timedelta(days=1)
+            days_filters = [f"systemtime >= '{first_day:%Y-%m-%d}'"]
+            if end is not None:
+                end_day = pd.Timestamp(end, unit='us', tz='UTC').floor('D') + pd.Timedelta(days=2)
+                days_filters.append(f"systemtime < '{end_day:%Y-%m-%d}'")
+            filters = days_filters + filters
+        return filters
+
+    def consume_chunk(self, chunk: pd.DataFrame, condition: Dict, cache: Dict[Asset, List[pd.DataFrame]], assets_memo: Dict[str, Dict]):
+        """Filter a chunk of rows on `condition` and add its authentications to the ones of their asset_1 in `cache`."""
+        additional_columns = self.get_additional_columns()
+
+        chunk = chunk[ComputeIndicators.get_condition_mask(chunk, condition)]
+        if chunk.shape[0] == 0:
+            return
+
+        codes_1, assets_1 = ComputeIndicators.get_assets(chunk, condition, 'asset_1', assets_memo['asset_1'])
+        codes_2, assets_2 = ComputeIndicators.get_assets(chunk, condition, 'asset_2', assets_memo['asset_2'])
+
+        summary = pd.DataFrame({'systemtime': chunk['systemtime'].to_numpy(), 'asset_2': assets_2[codes_2]})
+        if EPOCH_FIELD in chunk.columns:
+            summary[EPOCH_FIELD] = chunk[EPOCH_FIELD].to_numpy()
+        for col in additional_columns:
+            summary[col] = chunk[col].to_numpy()
+
+        # Stable sort so that authentications of each asset stay in the order of the request
+        order = np.argsort(codes_1, kind='stable')
+        bounds = np.searchsorted(codes_1[order], np.arange(len(assets_1) + 1))
+        for code, asset_1 in enumerate(assets_1):
+            cache.setdefault(asset_1, []).append(summary.iloc[order[bounds[code]:bounds[code + 1]]])
+
+    def finalize(self, cache: Dict[Asset, List[pd.DataFrame]]):
+        """Compute the indicators of each asset_1 from all its authentications gathered in `cache`."""
+        if self.n_jobs > 1:
+            self.finalize_in_parallel(cache)
+            self.build_store()
+            return
+
         for asset, asset_authentications in cache.items():
-            self.indicators[asset] = ComputeIndicators.compute_indicators_over_time(
-                pd.DataFrame(asset_authentications), indicators=self.indicator_objects, time_step=self.time_step
-            )  
+            if not self.rollup_time_steps:
+                indicators = ComputeIndicators.compute_indicators_over_time(
+                    pd.concat(asset_authentications, ignore_index=True),
+                    indicators=self.indicator_objects,
+                    time_step=self.time_step,
+                    origin=self.origin,
+                    baseline=self.baseline,
+                    analysis=self.analysis,
+                )
+                self.set_asset_indicators(asset, {self.time_step: indicators})
+                continue
+            self.set_asset_indicators(
+                asset,
+                ComputeIndicators.compute_indicators_over_time_multi_resolution(
+                    pd.concat(asset_authentications, ignore_index=True),
+                    indicators=self.indicator_objects,
+                    time_steps=self.time_steps,
+                    origin=self.origin,
+                    baseline=self.baseline,
+                    analysis=self.analysis,
+                ),
+            )
+        self.build_store()
+
+    def finalize_in_parallel(self, cache: Dict[Asset, List[pd.DataFrame]]):
+        """Same as `finalize`, assets being partitioned across `n_jobs` worker processes. Results are sent back keyed by the indices of the assets and
+        of the indicators, so that they are gathered in the same order as `finalize`."""
+        if self.start_method == 'fork':
+            initargs = (self.indicator_objects,)
+        else:
+            initargs = ([indicator.name for indicator in self.indicator_objects],)
+
+        assets = list(cache)
+        if not assets:
+            return
+        # Assets are dealt round-robin to a few shards per worker, to balance big and small assets
+        n_shards = min(4 * self.n_jobs, len(assets))
+        context = multiprocessing.get_context(self.start_method)
+        results: Dict[int, Dict[int, Dict[int, TimeSeries]]] = {}
+        with ProcessPoolExecutor(max_workers=self.n_jobs, mp_context=context, initializer=_attach_indicators, initargs=initargs) as executor:
+            futures = []
+            for shard in range(n_shards):
+                payload = [(index, ComputeIndicators.to_columns(pd.concat(cache[assets[index]], ignore_index=True))) for index in range(shard, len(assets), n_shards)]
+                futures.append(executor.submit(_compute_assets_indicators, payload, self.time_steps, self.origin, self.baseline, self.analysis))
+            for future in futures:
+                results.update(future.result())
+
+        for index, asset in enumerate(assets):
+            self.set_asset_indicators(
+                asset, {time_step: {self.indicator_objects[i]: ts for i, ts in indicators.items()} for time_step, indicators in results.pop(index).items()}
+            )
+
+    @staticmethod
+    def to_columns(data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """Convert authentications to a compact dict of column arrays, cheaper to pickle than a ``DataFrame``."""
+        return {col: data[col].to_numpy() for col in data.columns}
+
+    @staticmethod
+    def get_condition_mask(chunk: pd.DataFrame, condition: Dict) -> np.ndarray:
+        """Evaluate `condition` on each row of `chunk`, with its 'mask_function' if it has one, else with its 'filter_function' row by row."""
+        if 'mask_function' in condition:
+            return np.asarray(condition['mask_function'](chunk), dtype=bool)
+        return np.fromiter((bool(condition['filter_function'](row)) for row in chunk.to_dict('records')), dtype=bool, count=chunk.shape[0])
+
+    @staticmethod
+    def get_assets(chunk: pd.DataFrame, condition: Dict, asset_key: str, memo: Dict) -> Tuple[np.ndarray, np.ndarray]:
+        """Build the assets `asset_key` ('asset_1' or 'asset_2') of `condition` for each row of `chunk`.
+
+        If the condition gives the columns the asset depends on (see `Rule`), the asset function is only called once per distinct value of these
+        columns, and memoized in `memo`. Else it is called on each row. Assets are replaced by their canonical instance in `ASSET_POOL`, so that
+        the same asset is a single object whatever the condition or the chunk.
+
+        Returns:
+            The code of the asset of each row and the array of distinct assets indexed by code.
+        """
+        columns = condition.get(f'{asset_key}_columns')
+        if columns is None:
+            assets = [condition[asset_key](row) for row in chunk.to_dict('records')]
+            codes, uniques = pd.factorize(pd.Series(assets, dtype=object))
+            return codes, np.asarray([ASSET_POOL.get_canonical(asset) for asset in uniques], dtype=object)
+
+        codes, keys = pd.factorize(pd.Series(list(zip(*[chunk[col] for col in columns])), dtype=object))
+        uniques = np.empty(len(keys), dtype=object)
+        for code, key in enumerate(keys):
+            if key not in memo:
+                memo[key] = ASSET_POOL.get_canonical(condition[asset_key](dict(zip(columns, key))))
+            uniques[code] = memo[key]
+        return codes, uniques
 
     @staticmethod
     def compute_new_items(items_sets: List[set], legitimate_model_duration: int = 25, enrich_model=True):
@@ -132,20 +797,27 @@ class ComputeIndicators:
         Returns:
             The new items reached ``time_step`` after ``time_step``.
         """
+        return NewItemsModel(legitimate_model_duration, enrich_model).update(items_sets)
 
-        new_items: List[set] = []
-        legitimate_model = set()
+    @staticmethod
+    def get_new_items_stateful_function(legitimate_model_duration: int = 25, enrich_model=True) -> Callable:
+        """Get the `Indicator.stateful_function` of the number of new items reached, its state being a `NewItemsModel`."""
+        def new_items_stateful_function(model: Optional[NewItemsModel], items_sets: List[set]) -> Tuple[NewItemsModel, List[set], List[int]]:
+            model = model if model is not None else NewItemsModel(legitimate_model_duration, enrich_model)
+            new_items = model.update(items_sets)
+            return model, new_items, [len(e) for e in new_items]
 
-        for index, items in enumerate(items_sets):
-            if index <= int(legitimate_model_duration / 100 * len(items_sets)):
-                new_items.append(set())
-                legitimate_model.update(items)
-            else:
-                new_items.append(items.difference(legitimate_model))
-                if enrich_model:
-                    legitimate_model.update(items)
+        return new_items_stateful_function
 
-        return new_items
+    @staticmethod
+    def get_new_items_baseline_function(enrich_model=True) -> Callable:
+        """Get the `Indicator.baseline_function` of the number of new items reached, the legitimate model being built on the time steps of the
+        baseline instead of a percentage of the time steps."""
+        def new_items_baseline_function(items_sets: List[set], baseline_buckets: int) -> Tuple[List[set], List[int]]:
+            new_items = NewItemsModel(enrich_model=enrich_model, model_buckets=baseline_buckets - 1).update(items_sets)
+            return new_items, [len(e) for e in new_items]
+
+        return new_items_baseline_function
 
     @staticmethod
     def compute_nb_new_items(items_sets: List[set], legitimate_model_duration: int = 25, enrich_model=True):
@@ -164,13 +836,67 @@ class ComputeIndicators:
 
     @staticmethod
     def get_privileges(window: pd.DataFrame):
-        res = set()
-        window['privilegelist'].apply(lambda x: res.update(set(x.split(':'))))
-        try:
-            res.remove('?')
-        except Exception:
-            pass
-        return res
+        return PRIVILEGES_VOCABULARY.get_privileges(window['privilegelist'])
+
+    @staticmethod
+    def count_per_bucket(data: pd.DataFrame, buckets: np.ndarray, n_buckets: int) -> List[int]:
+        """Vectorised equivalent of `lambda window: window.shape[0]`, see `Indicator.bucket_computation`."""
+        return np.bincount(buckets, minlength=n_buckets).tolist()
+
+    @staticmethod
+    def get_distinct_per_bucket(column: str) -> Callable:
+        """Get the vectorised equivalent of `lambda window: set(window[column].unique())`, see `Indicator.bucket_computation`."""
+        def distinct_per_bucket(data: pd.DataFrame, buckets: np.ndarray, n_buckets: int) -> List[set]:
+            res: List[set] = [set() for _ in range(n_buckets)]
+            for bucket, values in data[column].groupby(buckets, sort=False).unique().items():
+                res[bucket] = set(values)
+            return res
+
+        return distinct_per_bucket
+
+    @staticmethod
+    def get_interned_per_bucket(column: str, interner: Optional[Interner] = None) -> Callable:
+        """Get the equivalent of `get_distinct_per_bucket` giving `InternedSet`, the values of `column` being interned once for all buckets, so
+        that set operations on buckets, as in `compute_new_items`, are bitmap operations. Values are interned in `interner` if it is given, for
+        instance `ASSET_POOL` for assets, else in a new interner for each computation."""
+        def interned_per_bucket(data: pd.DataFrame, buckets: np.ndarray, n_buckets: int) -> List[InternedSet]:
+            values_interner = interner if interner is not None else Interner()
+            ids = values_interner.intern_many(data[column])
+            bounds = np.searchsorted(buckets, np.arange(n_buckets + 1))
+            return [InternedSet(Bitmap.from_ids(ids[bounds[i]:bounds[i + 1]]), values_interner) for i in range(n_buckets)]
+
+        return interned_per_bucket
+
+    @staticmethod
+    def get_distinct_counters_per_bucket(column: str, threshold: int, interner: Optional[Interner] = None) -> Callable:
+        """Get the vectorised equivalent of `lambda window: DistinctCounter.from_items(window[column].unique(), threshold)`, see
+        `Indicator.bucket_computation`. Values of `column` are interned once for all buckets, in `interner` if it is given, and each bucket only
+        decodes its distinct ids if there are at most `threshold` of them, else feeds their hashes, computed once per value, to a `HyperLogLog`.
+        No set of more than `threshold` items is built."""
+        def distinct_counters_per_bucket(data: pd.DataFrame, buckets: np.ndarray, n_buckets: int) -> List[DistinctCounter]:
+            values_interner = interner if interner is not None else Interner()
+            ids = values_interner.intern_many(data[column])
+            bounds = np.searchsorted(buckets, np.arange(n_buckets + 1))
+            hashes: Dict[int, int] = {}
+            res = []
+            for i in range(n_buckets):
+                bucket_ids = np.unique(ids[bounds[i]:bounds[i + 1]])
+                if bucket_ids.size <= threshold:
+                    res.append(DistinctCounter.from_items(values_interner.decode(bucket_ids), threshold))
+                else:
+                    for id in bucket_ids.tolist():
+                        if id not in hashes:
+                            hashes[id] = HyperLogLog.get_hash(values_interner.items[id])
+                    res.append(DistinctCounter.from_hashes(np.fromiter((hashes[id] for id in bucket_ids.tolist()), dtype=np.uint64), threshold))
+            return res
+
+        return distinct_counters_per_bucket
+
+    @staticmethod
+    def get_privileges_per_bucket(data: pd.DataFrame, buckets: np.ndarray, n_buckets: int) -> List[set]:
+        """Vectorised equivalent of `get_privileges`, see `Indicator.bucket_computation`. Privilege lists are turned into bitmasks of the privileges
+        of `PRIVILEGES_VOCABULARY`, OR-reduced per bucket."""
+        return PRIVILEGES_VOCABULARY.get_privileges_per_bucket(data['privilegelist'], buckets, n_buckets)
 
     @staticmethod
     def compute_indicators(window: pd.DataFrame, indicators: List[Indicator]) -> Dict:
@@ -183,91 +909,730 @@ class ComputeIndicators:
         Returns:
             A dictionnary containing the indicators computed on ``window``.
         """
-        return {indicator: indicator.step_by_step_computation(window) for indicator in indicators}
+        products: Dict[str, Any] = {}
+        for intermediate in Intermediate.sort_intermediates([indicator.intermediate for indicator in indicators if indicator.intermediate is not None]):
+            if intermediate.dependencies:
+                products[intermediate.name] = intermediate.derive_function(*[products[dependency.name] for dependency in intermediate.dependencies])
+            else:
+                products[intermediate.name] = intermediate.step_by_step_computation(window)
+
+        return {
+            indicator: products[indicator.intermediate.name] if indicator.intermediate is not None else indicator.step_by_step_computation(window) for indicator in indicators
+        }
+
+    @staticmethod
+    def compute_bucketed_indicators(
+        data: pd.DataFrame, epochs: np.ndarray, indicators: List[Indicator], time_step: int, origin: int, n_buckets: int, first_bucket: int = 0
+    ) -> Dict[Indicator, List]:
+        """Compute some indicators on each time step of a grid of buckets.
+
+        Authentications are assigned to their bucket with an integer division of their time, then intermediate products needed by the indicators
+        are computed once each, in the order of their dependencies. Intermediates and indicators having a `bucket_computation` are computed on all
+        buckets at once, the other ones on each window sliced from the buckets.
+
+        Args:
+            data: Pandas ``Dataframe``, part of the dataset sorted by time.
+            epochs: Times of the authentications of ``data`` in microseconds since epoch, see ``Data.to_epoch``.
+            indicators: List containing the ``Indicator`` objects.
+            time_step: Time step in seconds between each bucket.
+            origin: Start of the bucket 0 of the grid, in microseconds since epoch.
+            n_buckets: Number of buckets to compute, authentications out of them being ignored.
+            first_bucket: Index on the grid of the first bucket to compute.
+
+        Returns:
+            A dictionnary containing the results of each indicator on each bucket, before ``intermediary_content_function`` and ``time_series_function``.
+        """
+        buckets = (epochs - origin) // (time_step * 10 ** 6) - first_bucket
+        in_grid = (buckets >= 0) & (buckets < n_buckets)
+        if not in_grid.all():
+            data, buckets = data[in_grid], buckets[in_grid]
+
+        bounds = None
+
+        def get_windows() -> Iterator[pd.DataFrame]:
+            nonlocal bounds
+            if bounds is None:
+                bounds = np.searchsorted(buckets, np.arange(n_buckets + 1))
+            return (data.iloc[bounds[i]:bounds[i + 1]] for i in range(n_buckets))
+
+        products: Dict[str, List] = {}
+        for intermediate in Intermediate.sort_intermediates([indicator.intermediate for indicator in indicators if indicator.intermediate is not None]):
+            if intermediate.dependencies:
+                dependencies_products = [products[dependency.name] for dependency in intermediate.dependencies]
+                products[intermediate.name] = [intermediate.derive_function(*values) for values in zip(*dependencies_products)]
+            elif intermediate.bucket_computation is not None:
+                products[intermediate.name] = intermediate.bucket_computation(data, buckets, n_buckets)
+            else:
+                products[intermediate.name] = [intermediate.step_by_step_computation(window) for window in get_windows()]
+
+        res = {}
+        for indicator in indicators:
+            if indicator.intermediate is not None:
+                res[indicator] = products[indicator.intermediate.name]
+            elif indicator.bucket_computation is not None:
+                res[indicator] = indicator.bucket_computation(data, buckets, n_buckets)
+            else:
+                res[indicator] = [indicator.step_by_step_computation(window) for window in get_windows()]
+        return res
 
     @staticmethod
-    def compute_indicators_over_time(data: pd.DataFrame, indicators: List[Indicator], time_step: int = 86400):
-        """Compute some indicators over time, should be way faster because it uses `bisect` search.
+    def compute_indicators_over_time(
+        data: pd.DataFrame,
+        indicators: List[Indicator],
+        time_step: int = 86400,
+        origin: Optional[str] = None,
+        baseline: Optional[Tuple[str, str]] = None,
+        analysis: Optional[Tuple[str, str]] = None,
+    ):
+        """Compute some indicators over time. Times are converted to integers once and assigned to time steps with integer divisions, see
+        `compute_bucketed_indicators`.
 
         Args:
             data: Pandas ``Dataframe``, part of the dataset.
             indicators_name: List containing the names of indicators needed.
             time_step: Time step in seconds desired between each loop of indicators computation.
+            origin: If `None`, time steps start at the first authentication of ``data``. Else, ISO time of the start of a global grid of time steps:
+                the time series spans the time steps of the grid from the first to the last authentication, both included, and starts at the
+                start of the first one.
+            baseline: ISO start (included) and end (excluded) times of the baseline, on which the legitimate models of the indicators having a
+                ``baseline_function`` are built. See `ComputeIndicators.baseline`.
+            analysis: ISO start (included) and end (excluded) times of the time range to investigate. If `baseline` or `analysis` is given, the
+                time series spans their time range, authentications out of it being ignored, on a grid starting at its start unless `origin`
+                is given.
 
         Returns:
             A dictionnary containing the indicators computed on each time ``window``.
         """
-        step_by_step_results = {indicator: [] for indicator in indicators}
-
         # TODO: Implement better inclusion of a posteriori indicators
         if data.shape[0] == 0:
             return [TimeSeries(name=indicator.name, series=[], time_step=time_step) for indicator in indicators]
 
-        # ISO8601 is not handled yet by datetime so as a fix we replace 'Z' by '+00:00'
-        data = data.sort_values("systemtime")
+        data = Data.sort_by_time(data)
         data.reset_index(drop=True, inplace=True)
+        ComputeIndicators.normalize_systemtime(data)
 
-        is_iso8601 = "Z" in data["systemtime"][0]
+        epochs = Data.get_epochs(data)
+        data, epochs = ComputeIndicators.select_time_range(data, epochs, baseline, analysis)
+        if data.shape[0] == 0:
+            return [TimeSeries(name=indicator.name, series=[], time_step=time_step) for indicator in indicators]
+
+        first_epoch, last_epoch, origin = ComputeIndicators.get_series_bounds(int(epochs[0]), int(epochs[-1]), origin, baseline, analysis)
+        grid_origin, first_bucket, n_buckets = ComputeIndicators.get_time_steps(first_epoch, last_epoch, time_step, origin)
+        start_time = data.systemtime.iloc[0] if origin is None else Data.epoch_to_iso(grid_origin + first_bucket * time_step * 10 ** 6)
+
+        step_by_step_results = ComputeIndicators.compute_bucketed_indicators(
+            data, epochs, indicators, time_step, origin=grid_origin, n_buckets=n_buckets, first_bucket=first_bucket
+        )
+        baseline_buckets = ComputeIndicators.get_baseline_buckets(baseline, grid_origin, first_bucket, time_step)
+        return ComputeIndicators.build_time_series(step_by_step_results, indicators, time_step, start_time, baseline_buckets)
+
+    @staticmethod
+    def normalize_systemtime(data: pd.DataFrame):
+        """Convert in place times 'YYYY-MM-DDTHH:MM:SSZ' to the former 'YYYY-MM-DD HH:MM:SS+00:00' format kept in windows for custom indicators."""
+        is_iso8601 = data.shape[0] > 0 and "Z" in data["systemtime"].iloc[0]
         if is_iso8601:
-            data["systemtime"] = data["systemtime"].apply(lambda x: str(x).replace("Z", "+00:00").replace("T", " "))
+            data["systemtime"] = data["systemtime"].astype(str).str.replace("Z", "+00:00", regex=False).str.replace("T", " ", regex=False)
+
+    @staticmethod
+    def get_time_steps(first_epoch: int, last_epoch: int, time_step: int, origin: Optional[str] = None) -> Tuple[int, int, int]:
+        """Get the time steps covering authentications from `first_epoch` to `last_epoch`, in microseconds since epoch.
+
+        Returns:
+            The origin of the grid of time steps, the index of the first time step on the grid and the number of time steps.
+        """
+        step = time_step * 10 ** 6
+        if origin is None:
+            # Time steps cover [start, end[, so that authentications at the exact end of the last time step are left out
+            return first_epoch, 0, -(-(last_epoch - first_epoch) // step)
+
+        grid_origin = ComputeIndicators.get_origin_epoch(origin)
+        first_bucket = (first_epoch - grid_origin) // step
+        return grid_origin, first_bucket, (last_epoch - grid_origin) // step - first_bucket + 1
+
+    @staticmethod
+    def compute_indicators_over_time_multi_resolution(
+        data: pd.DataFrame,
+        indicators: List[Indicator],
+        time_steps: List[int],
+        origin: Optional[str] = None,
+        baseline: Optional[Tuple[str, str]] = None,
+        analysis: Optional[Tuple[str, str]] = None,
+    ) -> Dict[int, Dict[Indicator, TimeSeries]]:
+        """Compute some indicators over time at several resolutions in a single pass: indicators are computed on the finest time step only, and
+        their results are rolled up to coarser ones with their ``rollup_function``. Results are the same as `compute_indicators_over_time` on each
+        time step.
+
+        Args:
+            data: Pandas ``Dataframe``, part of the dataset.
+            indicators: List containing the ``Indicator`` objects, all having a ``rollup_function``.
+            time_steps: Time steps in seconds, the first one being the finest and the other ones its multiples.
+            origin: See `compute_indicators_over_time`.
+            baseline: See `compute_indicators_over_time`.
+            analysis: See `compute_indicators_over_time`.
+
+        Returns:
+            A dictionnary containing, for each time step, the indicators computed on each time ``window``.
+        """
+        if data.shape[0] == 0:
+            return {time_step: ComputeIndicators.compute_indicators_over_time(data, indicators, time_step) for time_step in time_steps}
+
+        data = Data.sort_by_time(data)
+        data.reset_index(drop=True, inplace=True)
+        ComputeIndicators.normalize_systemtime(data)
 
-        start_time = data.systemtime.iloc[0]
-        end_time = data.systemtime.iloc[-1]
+        epochs = Data.get_epochs(data)
+        data, epochs = ComputeIndicators.select_time_range(data, epochs, baseline, analysis)
+        if data.shape[0] == 0:
+            return {time_step: ComputeIndicators.compute_indicators_over_time(data, indicators, time_step) for time_step in time_steps}
+
+        first_epoch, last_epoch, origin = ComputeIndicators.get_series_bounds(int(epochs[0]), int(epochs[-1]), origin, baseline, analysis)
+        grid_origin, first_bucket, end_bucket, grids = ComputeIndicators.get_rollup_grids(first_epoch, last_epoch, time_steps, origin)
+        step_by_step_results = ComputeIndicators.compute_bucketed_indicators(
+            data, epochs, indicators, time_steps[0], origin=grid_origin, n_buckets=end_bucket - first_bucket, first_bucket=first_bucket
+        )
+        start_time = data.systemtime.iloc[0] if origin is None else None
+        return ComputeIndicators.rollup_time_series(step_by_step_results, first_bucket, grid_origin, grids, indicators, start_time, baseline)
+
+    @staticmethod
+    def get_rollup_grids(first_epoch: int, last_epoch: int, time_steps: List[int], origin: Optional[str] = None) -> Tuple[int, int, int, Dict[int, Tuple[int, int]]]:
+        """Get the time steps of each resolution covering authentications from `first_epoch` to `last_epoch`, as `get_time_steps`, and the time steps
+        of the finest resolution, the first of `time_steps`, they are rolled up from.
 
-        current_time = start_time
-        current_index = 0
+        Returns:
+            The origin of the grids, the first and last + 1 time steps to compute on the finest grid, and for each resolution the index of its first
+            time step on its own grid and its number of time steps.
+        """
+        grids = {}
+        for time_step in time_steps:
+            grid_origin, first_bucket, n_buckets = ComputeIndicators.get_time_steps(first_epoch, last_epoch, time_step, origin)
+            grids[time_step] = (first_bucket, n_buckets)
 
-        while current_time < end_time:
+        ratios = [time_step // time_steps[0] for time_step in time_steps]
+        first_bucket = min(grids[time_step][0] * ratio for time_step, ratio in zip(time_steps, ratios))
+        end_bucket = max((grids[time_step][0] + grids[time_step][1]) * ratio for time_step, ratio in zip(time_steps, ratios))
+        return grid_origin, first_bucket, end_bucket, grids
 
-            to_insert = (datetime.fromisoformat(current_time) + timedelta(seconds=time_step)).isoformat().replace("T", " ")
-            index = bisect.bisect_left(data.systemtime, to_insert, lo=current_index)
+    @staticmethod
+    def rollup_time_series(
+        step_by_step_results: Dict[Indicator, List],
+        first_bucket: int,
+        grid_origin: int,
+        grids: Dict[int, Tuple[int, int]],
+        indicators: List[Indicator],
+        start_time: Optional[str] = None,
+        baseline: Optional[Tuple[str, str]] = None,
+    ) -> Dict[int, Dict[Indicator, TimeSeries]]:
+        """Build the `TimeSeries` of each resolution of `grids` (see `get_rollup_grids`) from the results on the time steps of the finest one,
+        starting at its time step `first_bucket`. If `start_time` is `None`, series start at the start of their first time step. Legitimate models
+        are built on the time steps of each resolution overlapping `baseline`, if it is given."""
+        finest = next(iter(grids))
+        res = {}
+        for time_step, (first, n_buckets) in grids.items():
+            ratio = time_step // finest
+            start = first * ratio - first_bucket
+            results = {}
+            for indicator in indicators:
+                fine_results = step_by_step_results[indicator][start:start + n_buckets * ratio]
+                results[indicator] = fine_results if ratio == 1 else indicator.rollup_function(fine_results, ratio)
+            series_start_time = start_time if start_time is not None else Data.epoch_to_iso(grid_origin + first * time_step * 10 ** 6)
+            baseline_buckets = ComputeIndicators.get_baseline_buckets(baseline, grid_origin, first, time_step)
+            res[time_step] = ComputeIndicators.build_time_series(results, indicators, time_step, series_start_time, baseline_buckets)
+        return res
 
-            window = data.iloc[current_index:index]
+    @staticmethod
+    def sum_rollup(results: List[int], ratio: int) -> List[int]:
+        """Roll up counts by summing them, see `Indicator.rollup_function`."""
+        return np.asarray(results, dtype=np.int64).reshape(-1, ratio).sum(axis=1).tolist()
 
-            window_indicators = ComputeIndicators.compute_indicators(window, indicators=indicators)
-            for indicator, v in window_indicators.items():
-                step_by_step_results[indicator].append(v)
+    @staticmethod
+    def union_rollup(results: List[AbstractSet], ratio: int) -> List[AbstractSet]:
+        """Roll up sets, or `InternedSet`, by uniting them, see `Indicator.rollup_function`."""
+        return [results[index].union(*results[index + 1:index + ratio]) for index in range(0, len(results), ratio)]
 
-            current_index = index
-            current_time = to_insert
+    @staticmethod
+    def counter_rollup(results: List[DistinctCounter], ratio: int) -> List[DistinctCounter]:
+        """Roll up `DistinctCounter` by merging them, see `Indicator.rollup_function`."""
+        return [
+            DistinctCounter.union(results[index:index + ratio], results[index].threshold, results[index].p) for index in range(0, len(results), ratio)
+        ]
 
+    @staticmethod
+    def build_time_series(
+        step_by_step_results: Dict[Indicator, List], indicators: List[Indicator], time_step: int, start_time: Optional[str], baseline_buckets: Optional[int] = None
+    ) -> Dict[Indicator, TimeSeries]:
+        """Build the `TimeSeries` of each indicator from its results on each time step, applying its ``intermediary_content_function`` and
+        ``time_series_function``, or its ``baseline_function`` if `baseline_buckets`, the number of time steps of the baseline, is given."""
         res = {}
         for indicator in indicators:
             intermediary_content = None
             series = step_by_step_results[indicator]
-            if indicator.intermediary_content_function is not None:
-                intermediary_content = indicator.intermediary_content_function(series)
-            if indicator.time_series_function is not None:
-                series = indicator.time_series_function(intermediary_content)
+            if baseline_buckets is not None and indicator.baseline_function is not None:
+                intermediary_content, series = indicator.baseline_function(series, baseline_buckets)
+            else:
+                if indicator.intermediary_content_function is not None:
+                    intermediary_content = indicator.intermediary_content_function(series)
+                if indicator.time_series_function is not None:
+                    series = indicator.time_series_function(intermediary_content)
 
             res[indicator] = TimeSeries(name=indicator.name, series=series, time_step=time_step, start_time=start_time, intermediary_content=intermediary_content)
         return res
 
 
+_SHARED_INDICATORS: List[Indicator] = []
+
+
+def _attach_indicators(indicators: List):
+    """Initializer of the worker processes of `ComputeIndicators`, given either the indicators themselves (inherited with 'fork') or the names of
+    indicators of `Indicators`."""
+    global _SHARED_INDICATORS
+    registry = {e.value.name: e.value for e in Indicators}
+    _SHARED_INDICATORS = [registry[indicator] if isinstance(indicator, str) else indicator for indicator in indicators]
+
+
+def _compute_assets_indicators(
+    payload: List[Tuple[int, Dict[str, np.ndarray]]],
+    time_steps: List[int],
+    origin: Optional[str],
+    baseline: Optional[Tuple[str, str]] = None,
+    analysis: Optional[Tuple[str, str]] = None,
+) -> Dict[int, Dict[int, Dict[int, TimeSeries]]]:
+    res = {}
+    for index, columns in payload:
+        data = pd.DataFrame(columns)
+        if len(time_steps) == 1:
+            indicators = {
+                time_steps[0]: ComputeIndicators.compute_indicators_over_time(
+                    data, indicators=_SHARED_INDICATORS, time_step=time_steps[0], origin=origin, baseline=baseline, analysis=analysis
+                )
+            }
+        else:
+            indicators = ComputeIndicators.compute_indicators_over_time_multi_resolution(
+                data, indicators=_SHARED_INDICATORS, time_steps=time_steps, origin=origin, baseline=baseline, analysis=analysis
+            )
+        res[index] = {time_step: {i: time_series[indicator] for i, indicator in enumerate(_SHARED_INDICATORS)} for time_step, time_series in indicators.items()}
+    return res
+
+
+class ComputeMultipleIndicators:
+    """This class computes the indicators of several jobs, each one being a rule with its indicators and time step, in a single scan of the table.
+
+    The request gathers the pre-filters of all conditions of all rules with `OR`, and each chunk is dispatched to every condition, which re-checks
+    its own pre-filters with pandas. If all conditions are declarative (see `Rule`), only the columns they need are requested, filters and asset keys
+    being evaluated with pandas, else all columns are requested.
+
+    Attributes:
+        table (Table): `Table` object pointing to the postgreSQL dataset.
+        jobs (List[Tuple[Rule, List[Indicator], int]]): Rules, with the indicators to compute for each of their asset_1 and the time step.
+        chunk_size (int): Number of rows fetched and processed at once.
+        n_jobs (int): Number of worker processes computing the indicators of the assets of each job, see `ComputeIndicators`.
+        origin (Optional[str]): ISO time of the start of a global grid of time steps shared by all jobs, see `ComputeIndicators`.
+        computers (List[ComputeIndicators]): One `ComputeIndicators` per job, holding its results in its `indicators` attribute.
+    """
+
+    def __init__(self, table: Table, jobs: List[Tuple[Rule, List[Indicator], int]], chunk_size: int = 1000000, n_jobs: int = 1, origin: Optional[str] = None):
+        self.table = table
+        self.jobs = jobs
+        self.chunk_size = chunk_size
+        self.n_jobs = n_jobs
+        self.origin = origin
+
+        self.computers = [
+            ComputeIndicators(table, rule, indicator_objects, time_step, chunk_size, n_jobs=n_jobs, origin=origin) for rule, indicator_objects, time_step in jobs
+        ]
+
+    @property
+    def indicators(self) -> List[Dict[Asset, Dict[Indicator, TimeSeries]]]:
+        """Indicators computed for each job, in the order of `jobs`."""
+        return [computer.indicators for computer in self.computers]
+
+    def get_request(self) -> str:
+        conditions = [condition for computer in self.computers for condition in computer.rule.conditions]
+
+        if all(Rule.is_declarative(condition) for condition in conditions):
+            additional_columns = [col for computer in self.computers for col in computer.get_additional_columns()]
+            epoch_columns = [EPOCH_FIELD] if self.computers[0].has_epoch_column() else []
+            fields = ', '.join(dict.fromkeys(['systemtime'] + epoch_columns + additional_columns + [col for condition in conditions for col in Rule.get_columns(condition)]))
+        else:
+            fields = '*'
+
+        filters = []
+        for condition in conditions:
+            ands = [Table.and_join(condition['pre_filters'])] if condition.get('pre_filters') else []
+            where_clause = Rule.get_where_clause(condition) if Rule.is_declarative(condition) else None
+            if where_clause is not None:
+                ands.append(where_clause)
+            if not ands:
+                # A condition on all rows, no filter can be pushed
+                filters = []
+                break
+            filters.append(f"({' AND '.join(ands)})")
+
+        return f"SELECT {fields} FROM {self.table.table_name}{' WHERE ' + ' OR '.join(dict.fromkeys(filters)) if filters else ''};"
+
+    def run(self):
+        caches: List[Dict[Asset, List[pd.DataFrame]]] = [{} for _ in self.computers]
+        assets_memos = [[{'asset_1': {}, 'asset_2': {}} for _ in computer.rule.conditions] for computer in self.computers]
+        compiled_conditions = [
+            [Rule.compile_condition(condition) if Rule.is_declarative(condition) else condition for condition in computer.rule.conditions] for computer in self.computers
+        ]
+
+        cursor = self.table.database.get_iterator_from_command(self.get_request(), chunk_size=self.chunk_size)
+        rows = cursor.fetchmany(self.chunk_size)
+        columns = [desc[0] for desc in cursor.description]
+        while rows:
+            chunk = pd.DataFrame.from_records(rows, columns=columns)
+            for job_index, computer in enumerate(self.computers):
+                for condition_index, condition in enumerate(computer.rule.conditions):
+                    if Rule.is_declarative(condition):
+                        condition_chunk = Rule.evaluate_condition(chunk, condition)
+                    else:
+                        condition_chunk = chunk[Rule.get_pre_filters_mask(chunk, condition['pre_filters'])]
+                    computer.consume_chunk(condition_chunk, compiled_conditions[job_index][condition_index], caches[job_index], assets_memos[job_index][condition_index])
+            rows = cursor.fetchmany(self.chunk_size)
+        cursor.close()
+        self.table.database.disconnect()
+
+        for computer, cache in zip(self.computers, caches):
+            computer.finalize(cache)
+
+
+class IndicatorsState:
+    """This class defines the state of the indicators of an asset_1 kept between runs of `ComputeIncrementalIndicators`.
+
+    Only what is needed to extend the series is saved. The series of the time steps closed by the current run are kept in `time_series`, which is
+    not saved with the state, and are appended to the series log of `ComputeIncrementalIndicators` instead. The first series of an asset start at
+    `start_time` if it is given, formatted as in `ComputeIndicators.compute_indicators_over_time`, else at the start of the time step
+    `first_bucket`, and the next ones at the start of their first time step.
+
+    Attributes:
+        origin (int): Start of the time step 0 of the asset, in microseconds since epoch.
+        time_step (int): Time step in seconds.
+        next_bucket (int): Index of the first time step not computed yet, all previous ones being closed.
+        pending (pd.DataFrame): Authentications of the time steps not computed yet, waiting for them to be closed.
+        run_first_bucket (int): Index of the first time step of `time_series`.
+        time_series (Dict[str, TimeSeries]): Series of each indicator by name, over the time steps closed by the current run.
+        indicators_states (Dict[str, Any]): State of each indicator having an `Indicator.stateful_function`, by name.
+        online_series (Dict[str, OnlineStatSeries]): Online statistics of the series of each indicator, by name, deciding whether each new time
+            step is an outlier of the series up to it with the ``indicator_bound`` of `ANOMALIES_SCORES`.
+    """
+
+    def __init__(self, origin: int, first_bucket: int, time_step: int, indicators: List[Indicator], start_time: Optional[str] = None):
+        self.origin = origin
+        self.time_step = time_step
+        self.next_bucket = first_bucket
+        self.pending = pd.DataFrame()
+
+        self.start_series(indicators, start_time)
+        self.indicators_states: Dict[str, Any] = {}
+        self.online_series = {indicator.name: OnlineStatSeries(indicator.name) for indicator in indicators}
+
+    def __getstate__(self):
+        # Series of the past runs are in the series log, so they are not saved with the state
+        state = self.__dict__.copy()
+        del state['time_series']
+        return state
+
+    def start_series(self, indicators: List[Indicator], start_time: Optional[str] = None):
+        """Start empty series at the time step `next_bucket`, for the time steps closed by a new run."""
+        self.run_first_bucket = self.next_bucket
+        start_time = start_time if start_time is not None else Data.epoch_to_iso(self.origin + self.next_bucket * self.time_step * 10 ** 6)
+        self.time_series = {
+            indicator.name: TimeSeries(name=indicator.name, series=[], time_step=self.time_step, start_time=start_time) for indicator in indicators
+        }
+
+    def append(self, step_by_step_results: Dict[Indicator, List], indicators: List[Indicator]):
+        """Append the results of new time steps to the series, as `ComputeIndicators.build_time_series` would do on the whole series."""
+        for indicator in indicators:
+            results = step_by_step_results[indicator]
+            if indicator.stateful_function is not None:
+                self.indicators_states[indicator.name], intermediary_content, series = indicator.stateful_function(self.indicators_states.get(indicator.name), results)
+            else:
+                intermediary_content = indicator.intermediary_content_function(results) if indicator.intermediary_content_function is not None else None
+                series = indicator.time_series_function(intermediary_content) if indicator.time_series_function is not None else results
+
+            time_series = self.time_series[indicator.name]
+            time_series.series = list(time_series.series) + list(series)
+            if intermediary_content is not None:
+                time_series.intermediary_content = (time_series.intermediary_content or []) + list(intermediary_content)
+            indicator_bound = ANOMALIES_SCORES.get(indicator.name, {}).get('indicator_bound')
+            for value in series:
+                self.online_series[indicator.name].update(value, indicator_bound=indicator_bound)
+
+
+class ComputeIncrementalIndicators(ComputeIndicators):
+    """This class computes indicators incrementally: the state of each asset_1 is saved at the end of each run, and the next run only requests the
+    authentications arrived since and appends the new time steps to the series.
+
+    A time step of an asset is closed, and computed, once an authentication of the asset is in a later time step, or once it ends before `until`.
+    Authentications of the last time step are kept in the state until it is closed. Indicators whose values depend on previous time steps must have
+    an `Indicator.stateful_function`, for instance the legitimate model of the number of new assets reached is built on the time steps of the first
+    run. Authentications arriving after their time step is closed are ignored.
+
+    Authentications are requested from the latest time seen, included, compared as epochs (see `get_epoch_range_filters`), so that the ones
+    arriving later with that same time are not missed. The rows already seen at that time are remembered and skipped. Aggregation by PostgreSQL
+    and worker processes are not supported.
+
+    Each run only saves the state needed to extend the series, and appends the time steps it closes to a series log, so that its cost does not
+    grow with the history. `indicators` holds the time steps closed by the run, and `load_time_series` gives the whole series.
+
+    Attributes:
+        state_path (str): Path of the pickled state, created by the first run.
+        series_path (str): Path of the series log, to which each run appends the time steps it closes.
+        until (Optional[str]): ISO time up to which authentications are known to be complete, so that all time steps ending before it are closed,
+            even for assets without later authentications.
+        states (Dict[Asset, IndicatorsState]): State of each asset_1.
+        last_epoch (Optional[int]): Latest time of the authentications seen, in microseconds since epoch.
+        boundary_rows (Dict[int, Counter]): Rows requested at `last_epoch` for each condition index, with their number of occurrences.
+    """
+
+    def __init__(
+        self,
+        table: Table,
+        rule: Rule,
+        indicator_objects: List[Indicator],
+        state_path: str,
+        time_step: int = 86400,
+        chunk_size: int = 1000000,
+        origin: Optional[str] = None,
+        until: Optional[str] = None,
+        series_path: Optional[str] = None,
+    ):
+        super().__init__(table, rule, indicator_objects, time_step, chunk_size, origin=origin)
+        self.state_path = state_path
+        self.series_path = series_path if series_path is not None else f'{state_path}.series'
+        self.until = until
+
+        self.states: Dict[Asset, IndicatorsState] = {}
+        self.last_epoch: Optional[int] = None
+        self.boundary_rows: Dict[int, Counter] = {}
+
+        # Rows at `last_epoch` not met again yet by the current run, and latest time and rows at that time among the rows requested by it
+        self.unseen_boundary_rows: Dict[int, Counter] = {}
+        self.run_last_epoch: Optional[int] = None
+        self.run_boundary_rows: Dict[int, Counter] = {}
+
+    def run(self):
+        if os.path.exists(self.state_path):
+            self.load_state()
+        self.unseen_boundary_rows = {condition_index: Counter(rows) for condition_index, rows in self.boundary_rows.items()}
+        self.run_last_epoch, self.run_boundary_rows = None, {}
+        super().run()
+        if self.run_last_epoch is not None:
+            self.last_epoch, self.boundary_rows = self.run_last_epoch, self.run_boundary_rows
+        self.append_series()
+        self.save_state()
+
+    def get_time_filters(self) -> List[str]:
+        if self.last_epoch is None:
+            return []
+        return self.get_epoch_range_filters(self.last_epoch)
+
+    def select_new_rows(self, chunk: pd.DataFrame, condition_index: int) -> pd.DataFrame:
+        """Skip the rows at `last_epoch` already seen by the previous runs, and keep track of the rows at the latest time of the current run."""
+        epochs = Data.get_epochs(chunk)
+        if epochs.size == 0:
+            return chunk
+
+        chunk_last_epoch = int(epochs.max())
+        if self.run_last_epoch is None or chunk_last_epoch > self.run_last_epoch:
+            self.run_last_epoch, self.run_boundary_rows = chunk_last_epoch, {}
+        if chunk_last_epoch == self.run_last_epoch:
+            boundary_rows = self.run_boundary_rows.setdefault(condition_index, Counter())
+            boundary_rows.update(chunk.iloc[np.flatnonzero(epochs == chunk_last_epoch)].itertuples(index=False, name=None))
+
+        if self.last_epoch is None:
+            return chunk
+        to_keep = epochs > self.last_epoch
+        unseen_rows = self.unseen_boundary_rows.setdefault(condition_index, Counter())
+        boundary_positions = np.flatnonzero(epochs == self.last_epoch)
+        for position, row in zip(boundary_positions, chunk.iloc[boundary_positions].itertuples(index=False, name=None)):
+            if unseen_rows[row] > 0:
+                unseen_rows[row] -= 1
+            else:
+                to_keep[position] = True
+        return chunk[to_keep]
+
+    def finalize(self, cache: Dict[Asset, List[pd.DataFrame]]):
+        """Append the closed time steps of each asset_1 to its series, from its pending authentications and the new ones gathered in `cache`."""
+        until = ComputeIndicators.get_origin_epoch(self.until) if self.until is not None else None
+        for asset in list(dict.fromkeys(list(self.states) + list(cache))):
+            new_authentications = None
+            if asset in cache:
+                new_authentications = Data.sort_by_time(pd.concat(cache[asset], ignore_index=True)).reset_index(drop=True)
+                ComputeIndicators.normalize_systemtime(new_authentications)
+            self.update_asset_state(asset, new_authentications, until)
+
+        self.indicators = {
+            asset: {indicator: state.time_series[indicator.name] for indicator in self.indicator_objects} for asset, state in self.states.items()
+        }
+
+    def update_asset_state(self, asset: Asset, new_authentications: Optional[pd.DataFrame], until: Optional[int]):
+        """Compute the time steps of `asset` closed by its new authentications, sorted by time, or by `until`, in microseconds since epoch."""
+        state = self.states.get(asset)
+        if state is None:
+            data = new_authentications
+        elif new_authentications is None:
+            data = state.pending
+        else:
+            data = Data.sort_by_time(pd.concat([state.pending, new_authentications], ignore_index=True), kind='stable').reset_index(drop=True)
+        epochs = Data.get_epochs(data)
+
+        if state is None:
+            origin, first_bucket, _ = ComputeIndicators.get_time_steps(int(epochs[0]), int(epochs[-1]), self.time_step, self.origin)
+            # Without origin, series start at the first authentication, as in `compute_indicators_over_time`
+            start_time = data.systemtime.iloc[0] if self.origin is None else None
+            state = self.states[asset] = IndicatorsState(origin, first_bucket, self.time_step, self.indicator_objects, start_time)
+
+        step = self.time_step * 10 ** 6
+        buckets = (epochs - state.origin) // step
+        # Time steps before the one of the last authentication are closed, as well as the ones ending before `until`
+        end_bucket = max(int(buckets[-1]), state.next_bucket) if buckets.size > 0 else state.next_bucket
+        if until is not None:
+            end_bucket = max(end_bucket, (until - state.origin) // step)
+
+        if end_bucket > state.next_bucket:
+            step_by_step_results = ComputeIndicators.compute_bucketed_indicators(
+                data, epochs, self.indicator_objects, self.time_step, origin=state.origin, n_buckets=end_bucket - state.next_bucket, first_bucket=state.next_bucket
+            )
+            state.append(step_by_step_results, self.indicator_objects)
+            state.next_bucket = end_bucket
+        state.pending = data[buckets >= end_bucket].reset_index(drop=True)
+
+    def append_series(self):
+        """Append the time steps closed by the run to the series log, with the index of their first time step for each asset."""
+        closed = {asset: (state.run_first_bucket, state.time_series) for asset, state in self.states.items() if state.next_bucket > state.run_first_bucket}
+        if closed:
+            with open(self.series_path, 'ab') as f:
+                pickle.dump(closed, f)
+
+    def load_time_series(self) -> Dict[Asset, Dict[Indicator, TimeSeries]]:
+        """Load the whole series of each asset_1 from the series log. Time steps logged twice, by a run whose state could not be saved and by the
+        next one, are only kept once."""
+        series: Dict[Asset, Tuple[int, Dict[str, TimeSeries]]] = {}
+        if os.path.exists(self.series_path):
+            with open(self.series_path, 'rb') as f:
+                while True:
+                    try:
+                        closed = pickle.load(f)
+                    except EOFError:
+                        break
+                    for asset, (first_bucket, time_series) in closed.items():
+                        if asset not in series:
+                            series[asset] = (first_bucket + len(next(iter(time_series.values())).series), time_series)
+                            continue
+                        end_bucket, asset_series = series[asset]
+                        skipped = end_bucket - first_bucket
+                        for name, run_series in time_series.items():
+                            asset_series[name].series = list(asset_series[name].series) + list(run_series.series)[skipped:]
+                            if run_series.intermediary_content is not None:
+                                asset_series[name].intermediary_content = (asset_series[name].intermediary_content or []) + list(run_series.intermediary_content)[skipped:]
+                        series[asset] = (max(end_bucket, first_bucket + len(next(iter(time_series.values())).series)), asset_series)
+        return {asset: {indicator: time_series[indicator.name] for indicator in self.indicator_objects} for asset, (_, time_series) in series.items()}
+
+    def save_state(self):
+        with open(self.state_path, 'wb') as f:
+            pickle.dump(
+                {'time_step': self.time_step, 'origin': self.origin, 'last_epoch': self.last_epoch, 'boundary_rows': self.boundary_rows, 'states': self.states}, f
+            )
+
+    def load_state(self):
+        with open(self.state_path, 'rb') as f:
+            saved = pickle.load(f)
+        if saved['time_step'] != self.time_step or saved['origin'] != self.origin:
+            raise ValueError(f"State {self.state_path} has been computed with another time step or origin")
+        self.last_epoch = saved['last_epoch']
+        self.boundary_rows = saved['boundary_rows']
+        self.states = saved['states']
+        for state in self.states.values():
+            state.start_series(self.indicator_objects)
+
+
+class Intermediates(Enum):
+    """Enum of the intermediate products shared by the indicators of `Indicators`."""
+
+    NB_AUTHENTICATIONS = Intermediate(
+        name='nb_authentications',
+        step_by_step_computation=lambda window: window.shape[0],
+        bucket_computation=ComputeIndicators.count_per_bucket
+    )
+
+    DISTINCT_ASSETS_2 = Intermediate(
+        name='distinct_assets_2',
+        step_by_step_computation=lambda window: set(window['asset_2'].unique()),
+        bucket_computation=ComputeIndicators.get_interned_per_bucket('asset_2', ASSET_POOL)
+    )
+
+    DISTINCT_ASSETS_2_COUNTERS = Intermediate(
+        name='distinct_assets_2_counters',
+        step_by_step_computation=lambda window: DistinctCounter.from_items(
+            window['asset_2'].unique(), threshold=ANOMALIES_SCORES['nb_assets_reached_sketch']['exact_threshold']
+        ),
+        bucket_computation=ComputeIndicators.get_distinct_counters_per_bucket(
+            'asset_2', ANOMALIES_SCORES['nb_assets_reached_sketch']['exact_threshold'], ASSET_POOL
+        )
+    )
+
+    DISTINCT_PRIVILEGE_LISTS = Intermediate(
+        name='distinct_privilege_lists',
+        additional_columns=['privilegelist'],
+        step_by_step_computation=lambda window: set(window['privilegelist'].unique()),
+        bucket_computation=ComputeIndicators.get_distinct_per_bucket('privilegelist')
+    )
+
+    PRIVILEGES = Intermediate(
+        name='privileges',
+        additional_columns=['privilegelist'],
+        step_by_step_computation=ComputeIndicators.get_privileges,
+        bucket_computation=ComputeIndicators.get_privileges_per_bucket
+    )
+
+
 class Indicators(Enum):
     """Enum to associate an indicator to its corresponding function."""
 
-    NB_AUTHENTICATIONS = Indicator(name='nb_authentications', step_by_step_computation=lambda window: window.shape[0])
+    NB_AUTHENTICATIONS = Indicator(
+        name='nb_authentications', 
+        intermediate=Intermediates.NB_AUTHENTICATIONS.value, 
+        aggregation='nb_authentications',
+        rollup_function=ComputeIndicators.sum_rollup
+    )
 
     NB_ASSETS_REACHED = Indicator(
         name='nb_assets_reached', 
-        step_by_step_computation=lambda window: set(window['asset_2'].unique()), 
+        intermediate=Intermediates.DISTINCT_ASSETS_2.value, 
+        intermediary_content_function=lambda x: x, 
+        time_series_function=lambda x: [len(e) for e in x], 
+        aggregation='asset_2',
+        rollup_function=ComputeIndicators.union_rollup
+    )
+
+    NB_ASSETS_REACHED_SKETCH = Indicator(
+        name='nb_assets_reached_sketch', 
+        intermediate=Intermediates.DISTINCT_ASSETS_2_COUNTERS.value, 
         intermediary_content_function=lambda x: x, 
-        time_series_function=lambda x: [len(e) for e in x]
+        time_series_function=lambda x: [e.count() for e in x], 
+        aggregation='asset_2_counter',
+        rollup_function=ComputeIndicators.counter_rollup
     )
 
     NB_NEW_ASSETS_REACHED = Indicator(
         name='nb_new_assets_reached', 
-        step_by_step_computation=lambda window: set(window['asset_2'].unique()), 
+        intermediate=Intermediates.DISTINCT_ASSETS_2.value, 
         intermediary_content_function=lambda x: ComputeIndicators.compute_new_items(x, ANOMALIES_SCORES['nb_new_assets_reached']['legitimate_model_duration']), 
-        time_series_function=lambda x: ComputeIndicators.compute_nb_new_items(x, ANOMALIES_SCORES['nb_new_assets_reached']['legitimate_model_duration'])
+        time_series_function=lambda x: ComputeIndicators.compute_nb_new_items(x, ANOMALIES_SCORES['nb_new_assets_reached']['legitimate_model_duration']), 
+        aggregation='asset_2',
+        stateful_function=ComputeIndicators.get_new_items_stateful_function(ANOMALIES_SCORES['nb_new_assets_reached']['legitimate_model_duration']),
+        rollup_function=ComputeIndicators.union_rollup,
+        baseline_function=ComputeIndicators.get_new_items_baseline_function()
     )
 
     NB_PRIVILEGES_GRANTED = Indicator(
         name='nb_privileges_granted', 
         additional_columns=['privilegelist'],
-        step_by_step_computation=ComputeIndicators.get_privileges, 
+        intermediate=Intermediates.PRIVILEGES.value, 
         intermediary_content_function=lambda x: x, 
         time_series_function=lambda x: [len(e) for e in x], 
-        anomalies_detector=lambda series: StatSeries.detect_abnormal_outbreak_static(series, ANOMALIES_SCORES['nb_privileges_granted']['legitimate_model_duration'])
+        anomalies_detector=lambda series: StatSeries.detect_abnormal_outbreak_static(series, ANOMALIES_SCORES['nb_privileges_granted']['legitimate_model_duration']), 
+        aggregation='privileges',
+        rollup_function=ComputeIndicators.union_rollup
     )
@@ -13,7 +13,8 @@ from tqdm import tqdm
 from typing import Dict, List, Optional
 
 
-from waad.utils.constants import DATABASE_FIELDS
+from waad.utils.constants import DATABASE_FIELDS, EPOCH_FIELD, SYSTEMTIME_FIELD
+from waad.utils.data import Data
 
 
 class Database:
@@ -38,7 +39,10 @@ class Database:
         self.connection: psycopg2.connection
 
     def connect(self):
-        self.connection = psycopg2.connect(user=self.user, password=self.password, host=self.host, port=self.port, database=self.db_name)
+        # Sessions are in UTC, so that times without time zone are read as UTC by PostgreSQL, as by `Data.to_epoch`
+        self.connection = psycopg2.connect(
+            user=self.user, password=self.password, host=self.host, port=self.port, database=self.db_name, options="-c timezone=UTC"
+        )
 
     def disconnect(self):
         self.connection.close()
@@ -71,6 +75,9 @@ class Database:
     def create_table(self, table_name: str, fields=DATABASE_FIELDS):
         s = ", ".join([k + " " + v for k, v in fields.items()])
         sql_command = f"""CREATE TABLE {table_name} ({s});"""
+        if EPOCH_FIELD in [field.lower() for field in fields]:
+            # Same index as the one of `Table.add_epoch_column`, used by range queries on times
+            sql_command += f"""CREATE INDEX {table_name}_idx_{EPOCH_FIELD} ON {table_name} USING btree ({EPOCH_FIELD});"""
         self.execute_command(sql_command)
 
     def drop_table(self, table_name: str):
@@ -90,13 +97,21 @@ class Table:
         self.table_name = table_name
 
     def add_to_table(self, dataframe: pd.DataFrame):
-        """Fastest way to insert a large amount of data in the table we found."""
+        """Fastest way to insert a large amount of data in the table we found.
+
+        The column `systemtimeepoch` is filled with the times of `SystemTime` parsed once here, so that nothing has to parse them afterwards. It is
+        NULL for times that cannot be parsed, such as missing ones replaced by '?'.
+        """
+
+        if SYSTEMTIME_FIELD not in dataframe.columns:
+            raise ValueError(f"The authentications to insert have no column {SYSTEMTIME_FIELD}")
+        epochs = Data.to_nullable_epoch(dataframe[SYSTEMTIME_FIELD])
 
         self.database.connect()
         cursor = self.database.connection.cursor()
 
         cpy = StringIO()
-        for row in dataframe.values:
+        for row, epoch in zip(dataframe.values, epochs):
             # Insert repr() for `int` data    # Not really generic
             cpy.write(
                 "\t".join(
@@ -144,6 +159,7 @@ class Table:
                         row[40],
                         row[41],
                         row[42],
+                        "\\N" if epoch is pd.NA else repr(int(epoch)),
                     ]
                 )
                 + "\n"
@@ -266,6 +282,27 @@ class Table:
         """
         return self.get_command(self.custom_psql_request(input_dict=input_dict, distinct=distinct))
 
+    def has_column(self, column_name: str) -> bool:
+        return not self.get_command(
+            f"SELECT 1 FROM information_schema.columns WHERE table_name = '{self.table_name.lower()}' AND column_name = '{column_name.lower()}';"
+        ).empty
+
+    def add_epoch_column(self):
+        """Add and fill the column `systemtimeepoch` of a table created before it existed, and index it for range queries on times.
+
+        Times without time zone are considered as UTC, as in `Data.to_epoch`. `EXTRACT` is rounded as it gives a double precision number before
+        PostgreSQL 14. Missing times, replaced by '?' at ingestion, are left NULL.
+        """
+        self.execute_command(
+            f"""
+            SET TIME ZONE 'UTC';
+            ALTER TABLE {self.table_name} ADD COLUMN IF NOT EXISTS {EPOCH_FIELD} BIGINT;
+            UPDATE {self.table_name} SET {EPOCH_FIELD} = round(EXTRACT(EPOCH FROM systemtime::timestamptz) * 1000000)::bigint
+                WHERE {EPOCH_FIELD} IS NULL AND systemtime <> '?';
+            CREATE INDEX IF NOT EXISTS {self.table_name}_idx_{EPOCH_FIELD} ON {self.table_name} USING btree ({EPOCH_FIELD});
+        """
+        )
+
     def delete_postgre_data(self):
         self.database.execute_command(f"DELETE FROM {self.table_name};")
 
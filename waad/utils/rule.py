@@ -1,7 +1,10 @@
 """This module implements the `Rule` object."""
 
 
+from abc import ABC, abstractmethod
 from enum import auto, Enum
+import numpy as np
+import pandas as pd
 from typing import Any, Callable, Dict, List, Optional
 
 
@@ -32,6 +35,123 @@ class Relation:
         self.probability = probability
 
 
+def to_sql_literal(value: Any) -> str:
+    """Convert a python value to a SQL literal, escaping quotes of strings."""
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return str(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class Expression(ABC):
+    """This class defines an expression on the columns of the dataset, that can either be compiled to SQL to be computed by PostgreSQL, or
+    evaluated on a chunk of the dataset with pandas. It is abstract."""
+
+    @abstractmethod
+    def to_sql(self) -> str:
+        pass
+
+    @abstractmethod
+    def evaluate(self, data: pd.DataFrame) -> pd.Series:
+        pass
+
+    @abstractmethod
+    def get_columns(self) -> List[str]:
+        """Get the columns of the dataset the expression depends on."""
+        pass
+
+
+class Column(Expression):
+    """This class defines the projection of a column of the dataset, child of `Expression`."""
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def to_sql(self) -> str:
+        return self.name
+
+    def evaluate(self, data: pd.DataFrame) -> pd.Series:
+        return data[self.name]
+
+    def get_columns(self) -> List[str]:
+        return [self.name]
+
+
+class SplitPart(Expression):
+    """This class defines the `index`-th part (starting at 1) of `expression` split on `delimiter`, as the `split_part` function of PostgreSQL.
+    Like it, an empty string is returned if there are less than `index` parts."""
+
+    def __init__(self, expression: Expression, delimiter: str, index: int):
+        self.expression = expression
+        self.delimiter = delimiter
+        self.index = index
+
+    def to_sql(self) -> str:
+        return f"split_part({self.expression.to_sql()}, {to_sql_literal(self.delimiter)}, {self.index})"
+
+    def evaluate(self, data: pd.DataFrame) -> pd.Series:
+        values = self.expression.evaluate(data)
+        parts = values.str.split(self.delimiter, regex=False).str.get(self.index - 1)
+        return parts.where(values.isna() | parts.notna(), '')
+
+    def get_columns(self) -> List[str]:
+        return self.expression.get_columns()
+
+
+class Equal(Expression):
+    """This class defines the condition `expression = value`, child of `Expression`. As in SQL, NULL values never match."""
+
+    def __init__(self, expression: Expression, value: Any):
+        self.expression = expression
+        self.value = value
+
+    def to_sql(self) -> str:
+        return f"{self.expression.to_sql()} = {to_sql_literal(self.value)}"
+
+    def evaluate(self, data: pd.DataFrame) -> pd.Series:
+        return self.expression.evaluate(data) == self.value
+
+    def get_columns(self) -> List[str]:
+        return self.expression.get_columns()
+
+
+class NotEqual(Expression):
+    """This class defines the condition `expression <> value`, child of `Expression`. As in SQL, NULL values never match."""
+
+    def __init__(self, expression: Expression, value: Any):
+        self.expression = expression
+        self.value = value
+
+    def to_sql(self) -> str:
+        return f"{self.expression.to_sql()} <> {to_sql_literal(self.value)}"
+
+    def evaluate(self, data: pd.DataFrame) -> pd.Series:
+        values = self.expression.evaluate(data)
+        return values.notna() & (values != self.value)
+
+    def get_columns(self) -> List[str]:
+        return self.expression.get_columns()
+
+
+class StartsWith(Expression):
+    """This class defines the condition `expression LIKE 'prefix%'`, child of `Expression`. Wildcards of `prefix` are escaped."""
+
+    def __init__(self, expression: Expression, prefix: str):
+        self.expression = expression
+        self.prefix = prefix
+
+    def to_sql(self) -> str:
+        pattern = self.prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+        return f"{self.expression.to_sql()} LIKE {to_sql_literal(pattern)}"
+
+    def evaluate(self, data: pd.DataFrame) -> pd.Series:
+        return self.expression.evaluate(data).str.startswith(self.prefix, na=False)
+
+    def get_columns(self) -> List[str]:
+        return self.expression.get_columns()
+
+
 class Rule:
     """Defines a `Relation` between 2 assets and the conditions for which it applies.
 
@@ -48,8 +168,92 @@ class Rule:
             'filter_function': <function(row) -> bool>,
         }
 
+    A condition can optionally provide vectorised forms, used by `ComputeIndicators` on whole chunks of rows instead of row by row:
+
+    .. code-block:: python
+
+        {
+            'mask_function': <function(chunk: pd.DataFrame) -> boolean array>,  # Vectorised equivalent of 'filter_function'
+            'asset_1_columns': <list of columns>,  # Columns 'asset_1' depends on, so that it is only called once per distinct value
+            'asset_2_columns': <list of columns>,  # Columns 'asset_2' depends on, so that it is only called once per distinct value
+        }
+
+    With 'asset_1_columns' (resp. 'asset_2_columns'), 'asset_1' (resp. 'asset_2') is called on rows only containing these columns.
+
+    A condition can also be declarative, with `Expression` objects instead of 'filter_function' and of the columns assets depend on. Filters and
+    asset keys are then computed by PostgreSQL, and only the asset keys cross the wire. The asset functions are called once per distinct key,
+    on rows containing the keys by name:
+
+    .. code-block:: python
+
+        {
+            'pre_filters': {'eventid': 4624},
+            'filters': [StartsWith(Column('targetusersid'), 'S-1-5-21-'), NotEqual(Column('host'), '?')],
+            'asset_1_keys': {'sid': Column('targetusersid')},
+            'asset_2_keys': {'name': SplitPart(Column('host'), '.', 1), 'domain': SplitPart(Column('host'), '.', 2)},
+            'asset_1': lambda keys: Account(sid=keys['sid']),
+            'asset_2': lambda keys: Machine(name=keys['name'], domain=keys['domain']),
+        }
     """
 
     def __init__(self, relation: Relation, conditions: List[Dict]):
         self.relation = relation
         self.conditions = conditions
+
+    @staticmethod
+    def is_declarative(condition: Dict) -> bool:
+        return 'asset_1_keys' in condition and 'asset_2_keys' in condition
+
+    @staticmethod
+    def get_projection(condition: Dict) -> Dict[str, Expression]:
+        """Get the asset keys expressions of a declarative `condition`, by the alias of their column in the request."""
+        return {f'{asset_key}_{name}': expression for asset_key in ('asset_1', 'asset_2') for name, expression in condition[f'{asset_key}_keys'].items()}
+
+    @staticmethod
+    def get_where_clause(condition: Dict) -> Optional[str]:
+        """Compile the 'filters' of a declarative `condition` to a SQL condition, `None` if there is none."""
+        filters = condition.get('filters', [])
+        return ' AND '.join([f'({f.to_sql()})' for f in filters]) if filters else None
+
+    @staticmethod
+    def get_mask_function(condition: Dict) -> Callable:
+        """Get the vectorised equivalent of the 'filters' of a declarative `condition`, to evaluate them with pandas."""
+        filters = condition.get('filters', [])
+        return lambda chunk: np.logical_and.reduce([np.asarray(f.evaluate(chunk), dtype=bool) for f in filters] + [np.ones(chunk.shape[0], dtype=bool)])
+
+    @staticmethod
+    def get_pre_filters_mask(chunk: pd.DataFrame, pre_filters: Dict) -> np.ndarray:
+        """Evaluate 'pre_filters' on `chunk` with pandas. Values are compared as strings, as PostgreSQL does for quoted values."""
+        mask = np.ones(chunk.shape[0], dtype=bool)
+        for field, values in pre_filters.items():
+            values = values if isinstance(values, (list, tuple)) else [values]
+            mask &= chunk[field].astype(str).isin([str(value) for value in values]).to_numpy()
+        return mask
+
+    @staticmethod
+    def get_columns(condition: Dict) -> List[str]:
+        """Get the columns of the dataset a declarative `condition` depends on."""
+        expressions = condition.get('filters', []) + list(Rule.get_projection(condition).values())
+        return list(dict.fromkeys(list(condition.get('pre_filters', {})) + [col for expression in expressions for col in expression.get_columns()]))
+
+    @staticmethod
+    def evaluate_condition(chunk: pd.DataFrame, condition: Dict) -> pd.DataFrame:
+        """Evaluate a declarative `condition` on `chunk` with pandas, as PostgreSQL would with the request built on `get_projection` and
+        `get_where_clause`: rows are filtered and asset keys are added in their aliased columns, so that `compile_condition` applies."""
+        chunk = chunk[Rule.get_pre_filters_mask(chunk, condition.get('pre_filters', {})) & Rule.get_mask_function(condition)(chunk)]
+        return chunk.assign(**{alias: expression.evaluate(chunk) for alias, expression in Rule.get_projection(condition).items()})
+
+    @staticmethod
+    def compile_condition(condition: Dict) -> Dict:
+        """Compile a declarative `condition` to a vectorised one (see above) applying to the rows of the request built on `get_projection` and
+        `get_where_clause`: filters are already applied and asset keys are in their aliased columns."""
+        compiled = {'pre_filters': condition.get('pre_filters', {}), 'mask_function': lambda chunk: np.ones(chunk.shape[0], dtype=bool)}
+        for asset_key in ('asset_1', 'asset_2'):
+            names = list(condition[f'{asset_key}_keys'])
+            compiled[f'{asset_key}_columns'] = [f'{asset_key}_{name}' for name in names]
+            compiled[asset_key] = Rule.rename_keys(condition[asset_key], asset_key, names)
+        return compiled
+
+    @staticmethod
+    def rename_keys(asset_function: Callable, asset_key: str, names: List[str]) -> Callable:
+        return lambda row: asset_function({name: row[f'{asset_key}_{name}'] for name in names})
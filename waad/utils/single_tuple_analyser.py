@@ -1,13 +1,14 @@
 """This module implements a `Dataframe` grouping class on columns."""
 
 
-from datetime import datetime
+from datetime import datetime, timedelta
 from IPython.display import display
 import pandas as pd
 from typing import Dict, List, Union, Tuple
 
 
-from waad.utils.constants import Fields
+from waad.utils.constants import EPOCH_FIELD, Fields
+from waad.utils.data import Data
 
 
 class SingleTupleAnalyser:
@@ -32,14 +33,19 @@ class SingleTupleAnalyser:
         """Get a summary of the corresponding grouping as a `pd.Dataframe` with duration added as an indication."""
         try:
             summary = []
+            has_epochs = EPOCH_FIELD in self.data.columns
             for k, v in self.groups.items():
-                times = [datetime.fromisoformat(str(x).replace("Z", "+00:00")) for x in self.data.loc[v]["systemtime"]]
-                max_time = max(times)
-                min_time = min(times)
+                if has_epochs:
+                    # Times parsed at ingestion, in microseconds since epoch, or parsed here for rows inserted before the column existed
+                    epochs = Data.get_epochs(self.data.loc[v])
+                    duration = timedelta(microseconds=int(epochs.max() - epochs.min()))
+                else:
+                    times = [datetime.fromisoformat(str(x).replace("Z", "+00:00")) for x in self.data.loc[v]["systemtime"]]
+                    duration = max(times) - min(times)
                 field = k
                 if len(self.fields) == 1:
                     field = [field]
-                summary.append(list(field) + [len(v), max_time - min_time])
+                summary.append(list(field) + [len(v), duration])
             multi_index = SingleTupleAnalyser.get_multi_index_from_fields(self.fields).append(
                 pd.MultiIndex.from_arrays([["data", "data"], ["cardinality", "duration"]])
             )
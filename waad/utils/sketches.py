@@ -0,0 +1,389 @@
+"""This module implements some probabilistic data structures (sketches) used to bound memory on very large datasets."""
+
+
+import hashlib
+import math
+import numpy as np
+import random
+from typing import Any, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+
+MASK_64 = (1 << 64) - 1
+FINGERPRINT_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+class CountMinSketch:
+    """This class implements a Count-Min sketch counting rows of integer codes (for instance tuples of modalities).
+
+    Counts are never under-estimated and, with probability `1 - exp(-depth)`, over-estimated by at most `error_bound`. Hashing is
+    multiply-shift hashing on a 64 bits fingerprint of the rows, so `width` must be a power of 2.
+
+    Attributes:
+        width (int): Number of counters per row of the sketch.
+        depth (int): Number of rows, i.e. of independent hash functions, of the sketch.
+        seed (int): Seed of the hash functions, sketches can only be merged if they share it.
+        table (np.ndarray): The `(depth, width)` counters.
+        total (int): Total count added to the sketch.
+    """
+
+    def __init__(self, width: int = 2 ** 16, depth: int = 4, seed: int = 0):
+        if width & (width - 1) != 0:
+            raise ValueError(f"width must be a power of 2, got {width}")
+
+        self.width = width
+        self.depth = depth
+        self.seed = seed
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+        rng = np.random.RandomState(seed)
+        # Odd multipliers for multiply-shift hashing, kept as python ints for the scalar path
+        self.multipliers = [(int(high) << 32 | int(low)) | 1 for high, low in rng.randint(0, 2 ** 32, size=(depth, 2), dtype=np.int64)]
+        self.shift = 64 - int(math.log2(width))
+
+    @property
+    def epsilon(self) -> float:
+        return math.e / self.width
+
+    @property
+    def error_bound(self) -> float:
+        """Maximum over-estimation of a count, holding with probability `1 - exp(-depth)`."""
+        return self.epsilon * self.total
+
+    @staticmethod
+    def get_fingerprints(keys: np.ndarray) -> np.ndarray:
+        """Hash each row of the 2D array `keys` to a 64 bits fingerprint."""
+        fingerprints = np.zeros(keys.shape[0], dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for column in keys.T:
+                fingerprints = fingerprints * np.uint64(FINGERPRINT_MULTIPLIER) + (column.astype(np.int64) + 1).astype(np.uint64)
+        return fingerprints
+
+    @staticmethod
+    def get_fingerprint(key: Sequence[int]) -> int:
+        """Scalar version of `get_fingerprints`, way faster for a single key."""
+        fingerprint = 0
+        for e in key:
+            fingerprint = (fingerprint * FINGERPRINT_MULTIPLIER + e + 1) & MASK_64
+        return fingerprint
+
+    def get_indices(self, keys: np.ndarray) -> np.ndarray:
+        fingerprints = CountMinSketch.get_fingerprints(keys)
+        with np.errstate(over="ignore"):
+            return np.array([(np.uint64(multiplier) * fingerprints) >> np.uint64(self.shift) for multiplier in self.multipliers], dtype=np.int64)
+
+    def add(self, keys: np.ndarray, counts: Optional[np.ndarray] = None):
+        """Add the rows of the 2D array `keys`, each one with a count of 1 or of `counts` if given."""
+        counts = np.ones(keys.shape[0], dtype=np.int64) if counts is None else counts
+        for row, indices in enumerate(self.get_indices(keys)):
+            self.table[row] += np.bincount(indices, weights=counts, minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+
+    def query(self, keys: np.ndarray) -> np.ndarray:
+        """Estimate the counts of the rows of the 2D array `keys`."""
+        indices = self.get_indices(keys)
+        return self.table[np.arange(self.depth)[:, None], indices].min(axis=0)
+
+    def get(self, key: Sequence[int]) -> int:
+        """Estimate the count of a single `key`."""
+        fingerprint = CountMinSketch.get_fingerprint(key)
+        return int(min(self.table[row, ((multiplier * fingerprint) & MASK_64) >> self.shift] for row, multiplier in enumerate(self.multipliers)))
+
+    def merge(self, other: "CountMinSketch"):
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("Only sketches sharing width, depth and seed can be merged")
+        self.table += other.table
+        self.total += other.total
+
+
+class CountMinTable:
+    """This class implements a contingency table whose counts are stored in a `CountMinSketch`, with a dict-like interface.
+
+    Any modality can be looked up, but only the `max_modalities` most frequent ones, the heavy hitters, are kept to be iterated on, so memory is
+    bounded by the sketch and `max_modalities` codes whatever the number of modalities. Rarer modalities are skipped when iterating on the table.
+
+    The table is built from the `counts` of the distinct `modalities`, as given by `np.unique(..., axis=0, return_counts=True)`. Its sketch is not
+    made wider than the number of modalities, which would take more memory than an exact table.
+
+    Attributes:
+        sketch (CountMinSketch): Sketch containing the counts.
+        modalities (np.ndarray): `(at most max_modalities, number of columns)` array of the most frequent modalities, in increasing order.
+    """
+
+    def __init__(self, modalities: np.ndarray, counts: np.ndarray, width: int = 2 ** 16, depth: int = 4, seed: int = 0, max_modalities: int = 2 ** 16):
+        width = min(width, max(2, 1 << int(modalities.shape[0] - 1).bit_length()))
+        self.sketch = CountMinSketch(width=width, depth=depth, seed=seed)
+        self.sketch.add(modalities, counts)
+        heavy_hitters = np.sort(np.argsort(-counts, kind='stable')[:max_modalities])
+        self.modalities = modalities[heavy_hitters]
+
+    @property
+    def error_bound(self) -> float:
+        return self.sketch.error_bound
+
+    def __getitem__(self, key: Sequence[int]) -> int:
+        return self.sketch.get(key)
+
+    def get(self, key: Sequence[int], default: Any = 0) -> Any:
+        count = self.sketch.get(key)
+        return count if count > 0 else default
+
+    def keys(self) -> Iterator[Tuple[int, ...]]:
+        for key in self.modalities.tolist():
+            yield tuple(key)
+
+    def items(self) -> Iterator[Tuple[Tuple[int, ...], int]]:
+        for key, count in zip(self.modalities.tolist(), self.sketch.query(self.modalities).tolist()):
+            yield tuple(key), count
+
+    def __len__(self) -> int:
+        return self.modalities.shape[0]
+
+
+class KLLSketch:
+    """This class implements a KLL sketch estimating the quantiles of a stream of values in bounded memory.
+
+    Values are kept in a hierarchy of compactors, a full compactor being sorted and one value out of two (odd or even ones at random) being
+    promoted to the next level with a doubled weight. Compactors capacities decrease geometrically from the top one, of capacity `k`, so that
+    memory is `O(k)` whatever the number of values, with a rank error of about 1.65% for `k = 200`. Sketches sharing `k` can be merged, which
+    allows to sketch shards independently.
+
+    As long as no compaction happened, quantiles are exact and linearly interpolated, as with `pd.Series.quantile`.
+
+    Attributes:
+        k (int): Capacity of the top compactor.
+        seed (int): Seed of the random choices of the compactions.
+        compactors (List[List[float]]): Values kept at each level, a value of level `h` having a weight of `2 ** h`.
+        count (int): Number of values added to the sketch.
+    """
+
+    def __init__(self, k: int = 200, seed: int = 0):
+        self.k = k
+        self.seed = seed
+        self.compactors: List[List[float]] = [[]]
+        self.count = 0
+        self.rng = random.Random(seed)
+        self.sorted_values: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def get_capacity(self, level: int) -> int:
+        return max(2, int(math.ceil(self.k * (2 / 3) ** (len(self.compactors) - level - 1))))
+
+    @property
+    def size(self) -> int:
+        return sum(len(compactor) for compactor in self.compactors)
+
+    @property
+    def max_size(self) -> int:
+        return sum(self.get_capacity(level) for level in range(len(self.compactors)))
+
+    def update(self, value: float):
+        self.compactors[0].append(value)
+        self.count += 1
+        self.sorted_values = None
+        if len(self.compactors[0]) >= self.get_capacity(0):
+            self.compress()
+
+    def update_many(self, values: Iterable[float]):
+        for value in values:
+            self.update(value)
+
+    def compress(self):
+        """Compact full compactors, from the bottom one, until the sketch fits in its maximum size."""
+        for level in range(len(self.compactors)):
+            compactor = self.compactors[level]
+            if len(compactor) >= self.get_capacity(level):
+                if level + 1 == len(self.compactors):
+                    self.compactors.append([])
+                compactor.sort()
+                # With an odd number of values, the largest one stays at its level so that weights are preserved
+                kept = [compactor.pop()] if len(compactor) % 2 == 1 else []
+                self.compactors[level + 1].extend(compactor[self.rng.random() < 0.5::2])
+                self.compactors[level] = kept
+                if self.size < self.max_size:
+                    break
+        self.sorted_values = None
+
+    def merge(self, other: "KLLSketch"):
+        if self.k != other.k:
+            raise ValueError("Only sketches sharing k can be merged")
+        while len(self.compactors) < len(other.compactors):
+            self.compactors.append([])
+        for level, compactor in enumerate(other.compactors):
+            self.compactors[level].extend(compactor)
+        self.count += other.count
+        while self.size >= self.max_size:
+            self.compress()
+        self.sorted_values = None
+
+    def get_sorted_values(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Get the values kept, sorted, with their cumulated weights."""
+        if self.sorted_values is None:
+            values = np.array([value for compactor in self.compactors for value in compactor], dtype=np.float64)
+            weights = np.concatenate([np.full(len(compactor), 2 ** level, dtype=np.int64) for level, compactor in enumerate(self.compactors)])
+            order = np.argsort(values, kind="stable")
+            self.sorted_values = (values[order], np.cumsum(weights[order]))
+        return self.sorted_values
+
+    def quantile(self, q: float) -> float:
+        """Estimate the quantile `q` of the values added, NaN if there are none."""
+        if self.count == 0:
+            return np.nan
+        if len(self.compactors) == 1:
+            return float(np.quantile(self.compactors[0], q))
+        values, cumulated_weights = self.get_sorted_values()
+        index = int(np.searchsorted(cumulated_weights, q * cumulated_weights[-1], side="left"))
+        return float(values[min(index, values.size - 1)])
+
+
+class HyperLogLog:
+    """This class implements a HyperLogLog sketch estimating the number of distinct items added, with a standard error of `1.04 / sqrt(2 ** p)`
+    (1.6% for `p = 12`) in `2 ** p` bytes whatever the number of items. Sketches sharing `p` are united by merging them.
+
+    Items are hashed with blake2b on their type and representation, so that estimates are the same from one process to another.
+
+    Attributes:
+        p (int): Precision of the sketch, between 4 and 18.
+        registers (np.ndarray): The `2 ** p` registers, each one holding the maximum rank of the hashes it received.
+    """
+
+    def __init__(self, p: int = 12):
+        if not 4 <= p <= 18:
+            raise ValueError(f"p must be between 4 and 18, got {p}")
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    @staticmethod
+    def get_hash(item: Any) -> int:
+        return int.from_bytes(hashlib.blake2b(f"{type(item).__name__}:{item!r}".encode("utf-8"), digest_size=8).digest(), "little")
+
+    def add(self, item: Any):
+        fingerprint = HyperLogLog.get_hash(item)
+        index = fingerprint >> (64 - self.p)
+        # Rank of the first 1 bit of the remaining bits
+        rank = 64 - self.p - (fingerprint & ((1 << (64 - self.p)) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def update(self, items: Iterable[Any]):
+        for item in items:
+            self.add(item)
+
+    def add_hashes(self, hashes: np.ndarray):
+        """Vectorised equivalent of `add` on items whose `get_hash` is given as a `uint64` array."""
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        indices = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        remainders = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # Exact bit length of the remainders, by halving them
+        bit_lengths = np.zeros(hashes.size, dtype=np.int64)
+        for shift in (32, 16, 8, 4, 2, 1):
+            is_longer = remainders >= np.uint64(1 << shift)
+            bit_lengths[is_longer] += shift
+            remainders = np.where(is_longer, remainders >> np.uint64(shift), remainders)
+        bit_lengths += remainders > 0
+        ranks = (64 - self.p - bit_lengths + 1).astype(np.uint8)
+        np.maximum.at(self.registers, indices, ranks)
+
+    def merge(self, other: "HyperLogLog"):
+        if self.p != other.p:
+            raise ValueError("Only sketches sharing p can be merged")
+        np.maximum(self.registers, other.registers, out=self.registers)
+
+    def count(self) -> float:
+        m = self.registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m ** 2 / np.sum(np.ldexp(1.0, -self.registers.astype(np.int64)))
+        n_zeros = int(np.count_nonzero(self.registers == 0))
+        # Linear counting is more accurate for small cardinalities
+        if estimate <= 2.5 * m and n_zeros > 0:
+            return m * math.log(m / n_zeros)
+        return float(estimate)
+
+
+class DistinctCounter:
+    """This class counts distinct items exactly, keeping them in a set, up to `threshold` items, then approximately with a `HyperLogLog`, so that
+    memory is bounded for very large sets while small ones keep their items, for instance to be displayed.
+
+    Attributes:
+        threshold (int): Maximum number of items kept in the set.
+        p (int): Precision of the `HyperLogLog` beyond `threshold`.
+        items (Optional[set]): Items counted, `None` once converted to a sketch.
+        sketch (Optional[HyperLogLog]): Sketch of the items, `None` while they are counted exactly.
+    """
+
+    def __init__(self, threshold: int = 64, p: int = 12):
+        self.threshold = threshold
+        self.p = p
+        self.items: Optional[set] = set()
+        self.sketch: Optional[HyperLogLog] = None
+
+    @staticmethod
+    def from_items(items: Iterable[Any], threshold: int = 64, p: int = 12) -> "DistinctCounter":
+        counter = DistinctCounter(threshold, p)
+        counter.update(items)
+        return counter
+
+    @staticmethod
+    def from_hashes(hashes: np.ndarray, threshold: int = 64, p: int = 12) -> "DistinctCounter":
+        """Get a sketched counter of distinct items, more than `threshold`, given by their `HyperLogLog.get_hash`, without keeping them."""
+        counter = DistinctCounter(threshold, p)
+        counter.items = None
+        counter.sketch = HyperLogLog(p)
+        counter.sketch.add_hashes(hashes)
+        return counter
+
+    @property
+    def is_exact(self) -> bool:
+        return self.sketch is None
+
+    def to_sketch(self):
+        self.sketch = HyperLogLog(self.p)
+        self.sketch.update(self.items)
+        self.items = None
+
+    def add(self, item: Any):
+        if self.items is not None:
+            self.items.add(item)
+            if len(self.items) > self.threshold:
+                self.to_sketch()
+        else:
+            self.sketch.add(item)
+
+    def update(self, items: Iterable[Any]):
+        if self.items is not None:
+            self.items.update(items)
+            if len(self.items) > self.threshold:
+                self.to_sketch()
+        else:
+            self.sketch.update(items)
+
+    def merge(self, other: "DistinctCounter"):
+        if other.items is not None:
+            self.update(other.items)
+            return
+        if self.items is not None:
+            self.to_sketch()
+        self.sketch.merge(other.sketch)
+
+    @staticmethod
+    def union(counters: Iterable["DistinctCounter"], threshold: int = 64, p: int = 12) -> "DistinctCounter":
+        """Get a new counter of the items of all `counters`."""
+        res = DistinctCounter(threshold, p)
+        for counter in counters:
+            res.merge(counter)
+        return res
+
+    def count(self) -> int:
+        return len(self.items) if self.items is not None else int(round(self.sketch.count()))
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def __eq__(self, obj: Any) -> bool:
+        if not isinstance(obj, DistinctCounter):
+            return False
+        if self.items is not None or obj.items is not None:
+            return self.items == obj.items
+        return self.p == obj.p and np.array_equal(self.sketch.registers, obj.sketch.registers)
+
+    def __repr__(self) -> str:
+        return repr(self.items) if self.items is not None else f"~{self.count()} distinct items"
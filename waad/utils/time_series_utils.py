@@ -9,12 +9,14 @@ from matplotlib.figure import Figure
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from typing import Any, Callable, Dict, Iterator, List, Optional, Set, Tuple
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+import warnings
 
 
 from waad.utils.asset import Asset
 from waad.utils.config import ANOMALIES_SCORES
 from waad.utils.postgreSQL_utils import Table
+from waad.utils.sketches import KLLSketch
 
 
 class StatSeries:
@@ -104,6 +106,77 @@ class StatSeries:
 
         return outliers
 
+    @staticmethod
+    def batch_custom_outlier_detection(matrix: np.ndarray, indicator_bound: Optional[float] = None, IQR_factor: float = 2, sigma_factor: float = 3) -> List[List[int]]:
+        """Vectorised `custom_outlier_detection` on many series at once, one per row of `matrix`.
+
+        Statistics of all rows are computed along axis 1 at once and the IQR, sigma and ``indicator_bound`` criteria are combined in a single mask,
+        so that this is way faster than calling `custom_outlier_detection` on each series.
+
+        Args:
+            matrix: `(n_series, n_values)` matrix of the series, padded with NaN where a series has no value (see `get_padded_matrix`). NaN are
+                ignored by the statistics and are never outliers.
+            indicator_bound: See `custom_outlier_detection`.
+            IQR_factor: See `custom_outlier_detection`.
+            sigma_factor: See `custom_outlier_detection`.
+
+        Returns:
+            For each row, the ``List`` of the columns of the outlier values detected.
+        """
+        matrix = np.asarray(matrix, dtype=np.float64)
+        if matrix.size == 0:
+            return [[] for _ in range(matrix.shape[0])]
+
+        # Rows without any value or with a single value lead to NaN statistics, and thus to no outliers, as with pandas
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)
+            Q1, median, Q3 = StatSeries.get_rows_quantiles(matrix, [0.25, 0.5, 0.75])
+            mean = np.nanmean(matrix, axis=1, keepdims=True)
+            std = np.nanstd(matrix, axis=1, ddof=1, keepdims=True)
+        IQR = Q3 - Q1
+
+        with np.errstate(invalid="ignore"):
+            outliers = ((matrix < Q1 - IQR_factor * IQR) | (matrix > Q3 + IQR_factor * IQR)) & ((matrix < mean - sigma_factor * std) | (matrix > mean + sigma_factor * std))
+            if indicator_bound is not None and indicator_bound > 0:
+                outliers &= matrix >= median + indicator_bound
+            elif indicator_bound is not None and indicator_bound < 0:
+                outliers &= matrix <= median + indicator_bound
+
+        rows, columns = np.nonzero(outliers)
+        return [part.tolist() for part in np.split(columns, np.searchsorted(rows, np.arange(1, matrix.shape[0])))]
+
+    @staticmethod
+    def get_rows_quantiles(matrix: np.ndarray, quantiles: List[float]) -> List[np.ndarray]:
+        """Compute quantiles of each row of `matrix` ignoring NaN, with the linear interpolation of pandas and numpy. Rows are sorted once for
+        all quantiles, which is way faster than `np.nanquantile` along an axis.
+
+        Returns:
+            For each quantile, the `(n_rows, 1)` column of its values, NaN for rows without any value.
+        """
+        sorted_matrix = np.sort(matrix, axis=1)
+        counts = np.count_nonzero(~np.isnan(sorted_matrix), axis=1)
+        rows = np.arange(matrix.shape[0])
+        res = []
+        for quantile in quantiles:
+            position = quantile * (counts - 1)
+            low = np.floor(position).astype(np.int64).clip(0, None)
+            high = np.ceil(position).astype(np.int64).clip(0, None)
+            weight = position - low
+            a, b = sorted_matrix[rows, low], sorted_matrix[rows, high]
+            # Same formula as numpy to get exactly the same values
+            values = np.where(weight >= 0.5, b - (b - a) * (1 - weight), a + (b - a) * weight)
+            values[counts == 0] = np.nan
+            res.append(values[:, None])
+        return res
+
+    @staticmethod
+    def get_padded_matrix(series: List[List[float]]) -> np.ndarray:
+        """Stack series of different lengths as the rows of a matrix, padded with NaN at their end."""
+        lengths = np.fromiter((len(s) for s in series), dtype=np.int64, count=len(series))
+        matrix = np.full((len(series), int(lengths.max()) if len(series) > 0 else 0), np.nan)
+        matrix[np.arange(matrix.shape[1]) < lengths[:, None]] = np.concatenate([np.asarray(s, dtype=np.float64) for s in series]) if len(series) > 0 else []
+        return matrix
+
     def contains_isolated_values(self, percentage_null_values: int = 90) -> bool:
         """Detect if a series contains isolated values.
 
@@ -244,3 +317,102 @@ class TimeSeries(StatSeries):
             if self.intermediary_content is not None:
                 print(f"Intermediary content : {self.intermediary_content[anomaly]}")
             print()
+
+
+class RunningMoments:
+    """This class implements Welford's online algorithm computing the count, mean and variance of a series value after value, without keeping
+    the values in memory.
+
+    Attributes:
+        count (int): Number of values seen.
+        mean (float): Mean of the values seen.
+        M2 (float): Sum of the squared differences between the values seen and their mean.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.M2 = 0.0
+
+    def update(self, values: Iterable[float]):
+        for value in values:
+            self.count += 1
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.M2 += delta * (value - self.mean)
+
+    def merge(self, other: "RunningMoments"):
+        """Merge the moments of another series, for instance of another shard of the values, with Chan et al. parallel formulas."""
+        count = self.count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.M2 += other.M2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+
+    @property
+    def variance(self) -> float:
+        """Unbiased variance (ddof=1) as `pd.Series.var`, NaN with less than 2 values."""
+        return self.M2 / (self.count - 1) if self.count > 1 else np.nan
+
+    @property
+    def std(self) -> float:
+        return np.sqrt(self.variance)
+
+
+class OnlineStatSeries:
+    """This class implements an online version of `StatSeries.custom_outlier_detection`, for series growing value after value.
+
+    Mean and std are kept as `RunningMoments` and quantiles are estimated by a `KLLSketch`, so that values are not kept and deciding whether the
+    latest value is an outlier does not depend on the length of the series. Statistics of shards of a series can be merged.
+
+    Attributes:
+        name (str): Name of the series.
+        moments (RunningMoments): Running mean and variance of the values.
+        sketch (KLLSketch): Sketch of the quantiles of the values.
+        anomalies (List[int]): Indices of the values detected as outliers when they were added.
+    """
+
+    def __init__(self, name: str, k: int = 200, seed: int = 0):
+        self.name = name
+        self.moments = RunningMoments()
+        self.sketch = KLLSketch(k=k, seed=seed)
+        self.anomalies: List[int] = []
+
+    @property
+    def count(self) -> int:
+        return self.moments.count
+
+    def update(self, value: float, indicator_bound: Optional[float] = None, IQR_factor: float = 2, sigma_factor: float = 3) -> bool:
+        """Add a value and decide whether it is an outlier of the series including it, with the criteria of `custom_outlier_detection`.
+
+        Returns:
+            ``True`` if the value is an outlier, its index being then added to ``anomalies``.
+        """
+        self.moments.update([value])
+        self.sketch.update(value)
+        is_outlier = self.is_outlier(value, indicator_bound, IQR_factor, sigma_factor)
+        if is_outlier:
+            self.anomalies.append(self.count - 1)
+        return is_outlier
+
+    def is_outlier(self, value: float, indicator_bound: Optional[float] = None, IQR_factor: float = 2, sigma_factor: float = 3) -> bool:
+        """Decide whether `value` is an outlier of the series, see `custom_outlier_detection`."""
+        Q1, median, Q3 = self.sketch.quantile(0.25), self.sketch.quantile(0.5), self.sketch.quantile(0.75)
+        IQR = Q3 - Q1
+        mean, std = self.moments.mean, self.moments.std
+
+        with np.errstate(invalid="ignore"):
+            is_outlier = bool(((value < Q1 - IQR_factor * IQR) or (value > Q3 + IQR_factor * IQR)) and ((value < mean - sigma_factor * std) or (value > mean + sigma_factor * std)))
+        if is_outlier and indicator_bound is not None:
+            if (indicator_bound > 0) and (value < median + indicator_bound):
+                return False
+            elif (indicator_bound < 0) and (value > median + indicator_bound):
+                return False
+        return is_outlier
+
+    def merge(self, other: "OnlineStatSeries"):
+        """Merge the statistics of another shard of the series. Anomalies are not merged as their indices are relative to each shard."""
+        self.moments.merge(other.moments)
+        self.sketch.merge(other.sketch)
@@ -5,44 +5,92 @@ It comes from the implementation of a scientific paper: Detecting Anomalous Reco
 
 
 from collections import Iterable
+from concurrent.futures import Executor, ProcessPoolExecutor
 from IPython.display import display
 import json
 import math
 import matplotlib.pyplot as plt
+import multiprocessing
 import numpy as np
 import numpy.matlib
+import os
 import pandas as pd
+import pickle
+import pyarrow as pa
+import pyarrow.parquet as pq
 from scipy.signal import find_peaks
+from scipy.stats import norm
 import sys
 from tqdm import tqdm
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple, Union
+import warnings
 
 
+from ad_tree.array_record import ArrayRecord
 from ad_tree.sparse_ADTree import ADNode
 from ad_tree.iterated_tree_contingency_table import ContingencyTable
 
 
 from waad.utils.data import Data
-from waad.utils.combinations_utils import custom_combinations_generator, get_all_pairs_of_subsets_indices
+from waad.utils.combinations_utils import flatten, get_splits_indices, iter_custom_combinations
+from waad.utils.postgreSQL_utils import Table
+from waad.utils.sketches import CountMinTable
 
 
 class Cache:
     """This class implements a storage structure for all contingency tables.
 
     Attributes:
-        adtree (ADNode): ADTree we want to work on.
+        adtree (Optional[ADNode]): ADTree we want to work on. It is not saved with the cache, so it is `None` on a reloaded cache.
         meta_fields (List): The list of meta fields of the dataset.
         maximum_layer (int): The target maximum layer we want to reach.
+        records_length (int): Number of records counted in the cache, taken from `adtree` if not given.
+        approximate_arity (Optional[int]): If not `None`, combinations of size 2 and more involving a meta-field with more modalities than
+            `approximate_arity` are counted from the records instead of the ADTree, and approximately in a `CountMinTable` if they have more
+            than `sketch_max_modalities` modalities.
+        sketch_width (int): Width of the Count-Min sketches, a power of 2. The larger it is, the more precise approximate counts are.
+        sketch_depth (int): Depth of the Count-Min sketches. Error bounds hold with probability `1 - exp(-sketch_depth)`.
+        sketch_max_modalities (int): Maximum number of modalities of a combination counted exactly when it could be approximate. Above it,
+            the combination is counted in a `CountMinTable` keeping its `sketch_max_modalities` most frequent modalities to be iterated on.
+        population_size (Optional[int]): If not `None`, the cache is computed on a sample of a population of `population_size`
+            authentications (see `ComputeCacheFromSample`), and its counts are rescaled to the population when computing scores.
         cache (Dict[int, Dict[Tuple, Dict[Tuple, int]]]): The actual structure, layered by level (size of combinations) and meta-
             fields combinations. For instance level 2 contains all size 2 combinations of meta-fields and their modalities.
     """
 
-    def __init__(self, adtree: ADNode, meta_fields: List, maximum_layer: int):
+    def __init__(
+        self,
+        adtree: Optional[ADNode],
+        meta_fields: List,
+        maximum_layer: int,
+        records_length: Optional[int] = None,
+        approximate_arity: Optional[int] = None,
+        sketch_width: int = 2 ** 16,
+        sketch_depth: int = 4,
+        sketch_max_modalities: int = 2 ** 16,
+        population_size: Optional[int] = None,
+    ):
         self.adtree = adtree
         self.meta_fields = meta_fields
         self.maximum_layer = maximum_layer
+        if adtree is None and records_length is None:
+            raise ValueError("Either an ADTree or the number of records must be given to build a cache")
+        self.records_length = records_length if records_length is not None else adtree.array_record.records_length
+        self.approximate_arity = approximate_arity
+        self.sketch_width = sketch_width
+        self.sketch_depth = sketch_depth
+        self.sketch_max_modalities = sketch_max_modalities
+        self.population_size = population_size
         self.cache: Dict[int, Dict[Tuple, Dict[Tuple, int]]]
 
+        self.records: Optional[np.ndarray] = None
+
+    def __getstate__(self):
+        # The ADTree is only needed to build the cache and is way heavier than it, so it is never pickled.
+        state = self.__dict__.copy()
+        state["adtree"] = None
+        return state
+
     def initialize_cache(self):
         self.cache = {1: {}}
         for i in tqdm(range(len(self.meta_fields)), file=sys.stdout):
@@ -52,9 +100,50 @@ class Cache:
     def add_new_cache_layer(self):
         m = max(self.cache.keys())
         self.cache[m + 1] = {}
-        for new_combination in tqdm(custom_combinations_generator(list(range(len(self.meta_fields))), length=m + 1), file=sys.stdout):
-            contab = ContingencyTable([e + 1 for e in new_combination], self.adtree)
-            self.cache[m + 1][new_combination] = contab.get_table()
+        combinations = iter_custom_combinations(list(range(len(self.meta_fields))), length=m + 1)
+        for new_combination in tqdm(combinations, total=math.comb(len(self.meta_fields), m + 1), file=sys.stdout):
+            if self.is_approximate(new_combination):
+                self.cache[m + 1][new_combination] = self.get_approximate_table(new_combination)
+            else:
+                contab = ContingencyTable([e + 1 for e in new_combination], self.adtree)
+                self.cache[m + 1][new_combination] = contab.get_table()
+
+    def is_approximate(self, combination: Tuple[int, ...]) -> bool:
+        if self.approximate_arity is None or len(combination) < 2:
+            return False
+        return any(self.adtree.array_record.arity_list[i] > self.approximate_arity for i in combination)
+
+    def get_approximate_table(self, combination: Tuple[int, ...]) -> Union[Dict[Tuple, int], CountMinTable]:
+        """Count `combination` on the records, exactly if it has at most `sketch_max_modalities` modalities, else in a `CountMinTable`."""
+        modalities, counts = np.unique(self.get_records()[:, list(combination)], axis=0, return_counts=True)
+        if modalities.shape[0] <= self.sketch_max_modalities:
+            return {tuple(key): count for key, count in zip(modalities.tolist(), counts.tolist())}
+        return CountMinTable(modalities, counts, width=self.sketch_width, depth=self.sketch_depth, max_modalities=self.sketch_max_modalities)
+
+    def get_records(self) -> np.ndarray:
+        if self.records is None:
+            self.records = np.asarray(self.adtree.array_record.records_table, dtype=np.int32)
+        return self.records
+
+    def get_error_bound(self, combination: Tuple[int, ...]) -> float:
+        """Maximum over-estimation of the counts of `combination`, 0 if they are exact."""
+        table = self.cache[len(combination)][combination]
+        return table.error_bound if isinstance(table, CountMinTable) else 0
+
+    def get_population_counts(self, counts: np.ndarray, z: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Rescale `counts` of the sample to the population, with their Wilson confidence interval for the normal quantile `z`.
+
+        The finite population correction is applied, so that intervals are empty if the sample is the whole population.
+
+        Returns:
+            The estimated counts and the lower and upper bounds of their confidence interval.
+        """
+        n, population_size = self.records_length, self.population_size
+        p = counts / n
+        z2 = z ** 2 * (1 - n / population_size)
+        center = (p + z2 / (2 * n)) / (1 + z2 / n)
+        half_width = np.sqrt(p * (1 - p) / n + z2 / (4 * n ** 2)) * math.sqrt(z2) / (1 + z2 / n)
+        return p * population_size, np.maximum(center - half_width, 0) * population_size, np.minimum(center + half_width, 1) * population_size
 
     def run(self):
         print("Initialize cache")
@@ -63,6 +152,144 @@ class Cache:
         for k in range(2, self.maximum_layer + 1):
             print(f"Build cache layer {k}")
             self.add_new_cache_layer()
+        # The records are only needed to build the tables
+        self.records = None
+
+    def merge(self, other: "Cache") -> "Cache":
+        """Sum the counts of `other` into the cache. Both caches must be exact and computed on the same meta-fields with the same codes,
+        for instance on chunks of a dataset encoded against a global dictionary (see `ComputeCacheFromTable`)."""
+        # Both caches are checked before any count is added, so that a failed merge leaves the cache unchanged
+        for cache in (self, other):
+            if any(isinstance(table, CountMinTable) for combinations in cache.cache.values() for table in combinations.values()):
+                raise ValueError("Approximate caches cannot be merged")
+        if (self.population_size is None) != (other.population_size is None):
+            raise ValueError("A sampled cache can only be merged with another sampled cache")
+
+        for level, combinations in other.cache.items():
+            layer = self.cache.setdefault(level, {})
+            for combination, table in combinations.items():
+                merged_table = layer.setdefault(combination, {})
+                for modalities, count in table.items():
+                    merged_table[modalities] = merged_table.get(modalities, 0) + count
+
+        if self.population_size is not None:
+            self.population_size += other.population_size
+        self.records_length += other.records_length
+        self.maximum_layer = max(self.maximum_layer, other.maximum_layer)
+        # The merged cache does not correspond to a single ADTree anymore
+        self.adtree = None
+        return self
+
+    def save(self, path: str):
+        with open(path, "wb") as outfile:
+            pickle.dump(self, outfile)
+
+    @staticmethod
+    def load(path: str):
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+
+class ComputeCacheFromTable:
+    """This class implements the out-of-core computation of a `Cache` on a whole postgreSQL table.
+
+    The request is read chunk after chunk through a server-side cursor. Each chunk is encoded against a global dictionary, counted into
+    a partial `Cache` built on its own ADTree, and partial caches are merged by summation. Only one chunk is in memory at a time.
+
+    Attributes:
+        table (Table): `Table` object pointing to the postgreSQL dataset.
+        meta_fields (List): The list of meta fields of the dataset.
+        maximum_layer (int): The target maximum layer we want to reach.
+        sql_command (Optional[str]): Request giving the authentications to count. If `None`, all the columns of `meta_fields` are requested
+            on the whole table.
+        chunk_size (int): Number of authentications counted per partial `Cache`.
+        cache (Cache): The merged cache, once computed.
+        converter (Dict[Tuple[str, ...], Dict]): The global conversion material from str to code of `cache`. See above description.
+    """
+
+    def __init__(self, table: Table, meta_fields: List, maximum_layer: int, sql_command: Optional[str] = None, chunk_size: int = 1000000):
+        self.table = table
+        self.meta_fields = meta_fields
+        self.maximum_layer = maximum_layer
+        self.sql_command = sql_command if sql_command is not None else f"SELECT {', '.join(flatten(meta_fields))} FROM {table.table_name};"
+        self.chunk_size = chunk_size
+
+        self.cache: Optional[Cache] = None
+        self.converter: Dict[Tuple[str, ...], Dict] = {}
+
+    def run(self):
+        inverse_converter: Dict = {meta_field: {} for meta_field in self.meta_fields}
+
+        cursor = self.table.database.get_iterator_from_command(self.sql_command, chunk_size=self.chunk_size)
+        try:
+            rows = cursor.fetchmany(self.chunk_size)
+            columns = [desc[0] for desc in cursor.description]
+            while rows:
+                partial_cache = self.count_chunk(pd.DataFrame.from_records(rows, columns=columns), inverse_converter)
+                self.cache = partial_cache if self.cache is None else self.cache.merge(partial_cache)
+                rows = cursor.fetchmany(self.chunk_size)
+        finally:
+            # The server-side cursor and the connection are released even if counting a chunk fails
+            cursor.close()
+            self.table.database.disconnect()
+
+        self.converter = {meta_field: {code: category for category, code in categories.items()} for meta_field, categories in inverse_converter.items()}
+
+    def count_chunk(self, chunk: pd.DataFrame, inverse_converter: Dict) -> Cache:
+        records_table = Data.encode_with_converter(chunk, self.meta_fields, inverse_converter, extend=True).tolist()
+        arity_list = [len(inverse_converter[meta_field]) for meta_field in self.meta_fields]
+
+        array_record = ArrayRecord(arity_list, records_table)
+        adtree = ADNode(1, record_nums=list(range(1, array_record.records_length + 1)), array_record=array_record)
+
+        partial_cache = Cache(adtree, self.meta_fields, self.maximum_layer)
+        partial_cache.run()
+        return partial_cache
+
+
+class ComputeCacheFromSample:
+    """This class implements the computation of a `Cache` on a stratified sample of a dataset, for a quick triage of a new dataset.
+
+    The same fraction of each stratum is sampled (see `Data.stratified_sample`), the ADTree and the cache are built on the sample only,
+    and the cache keeps the size of the population so that scores are computed on counts rescaled to the population, with confidence
+    intervals (see `ComputeScoreOnGivenLevel`).
+
+    Attributes:
+        data (pd.DataFrame): The whole dataset, whose meta-fields are not built yet.
+        meta_fields (List): The list of meta fields of the dataset.
+        maximum_layer (int): The target maximum layer we want to reach.
+        by (List[Union[str, pd.Series]]): Columns or series defining the strata, for instance the host and the day.
+        frac (float): Fraction of each stratum to sample.
+        random_state (Optional[int]): Seed of the sampling.
+        sample (pd.DataFrame): The sample, with its meta-fields built and categorized, once computed.
+        cache (Cache): The cache of the sample, once computed.
+        converter (Dict[Tuple[str, ...], Dict]): Conversion material from str to code of `cache`. See above description.
+    """
+
+    def __init__(self, data: pd.DataFrame, meta_fields: List, maximum_layer: int, by: List[Union[str, pd.Series]], frac: float, random_state: Optional[int] = None):
+        self.data = data
+        self.meta_fields = meta_fields
+        self.maximum_layer = maximum_layer
+        self.by = by
+        self.frac = frac
+        self.random_state = random_state
+
+        self.sample: pd.DataFrame
+        self.cache: Cache
+        self.converter: Dict[Tuple[str, ...], Dict] = {}
+
+    def run(self):
+        self.sample = Data.stratified_sample(self.data, self.by, self.frac, self.random_state).copy()
+        Data.build_meta_fields(self.sample, self.meta_fields)
+        self.converter = Data.set_as_categorical(self.sample, self.meta_fields)
+
+        records_table = np.transpose([self.sample[meta_field].cat.codes for meta_field in self.meta_fields]).tolist()
+        arity_list = [len(self.converter[meta_field]) for meta_field in self.meta_fields]
+        array_record = ArrayRecord(arity_list, records_table)
+        adtree = ADNode(1, record_nums=list(range(1, array_record.records_length + 1)), array_record=array_record)
+
+        self.cache = Cache(adtree, self.meta_fields, self.maximum_layer, population_size=self.data.shape[0])
+        self.cache.run()
 
 
 class MetaField:
@@ -192,14 +419,24 @@ class Score:
         score (float): The actual score of the pairings `A_a` and `B_b`.
         cardinality (int): The cardinality of the joint modality defined by `A_a` and `B_b`.
         converter (Optional[Dict[Tuple[str, ...], Dict]]): Dict containing the conversion material from str to code. See above description.
+        score_interval (Optional[Tuple[float, float]]): Confidence interval of `score` if it is estimated on a sample, `None` otherwise.
     """
 
-    def __init__(self, A_a: Tuple[Modality, ...], B_b: Tuple[Modality, ...], score: float, cardinality: int, converter: Optional[Dict] = None):
+    def __init__(
+        self,
+        A_a: Tuple[Modality, ...],
+        B_b: Tuple[Modality, ...],
+        score: float,
+        cardinality: int,
+        converter: Optional[Dict] = None,
+        score_interval: Optional[Tuple[float, float]] = None,
+    ):
         self.A_a = A_a
         self.B_b = B_b
         self.score = score
         self.cardinality = cardinality
         self.converter = converter
+        self.score_interval = score_interval
 
     def __repr__(self):
         return f"""
@@ -216,7 +453,13 @@ class Score:
 
     def get_to_code(self, converter: Optional[Dict[Tuple[str, ...], Dict]] = None):
         try:
-            return Score(A_a=tuple([m.get_to_code(converter) for m in self.A_a]), B_b=tuple([m.get_to_code(converter) for m in self.B_b]), score=self.score, cardinality=self.cardinality)
+            return Score(
+                A_a=tuple([m.get_to_code(converter) for m in self.A_a]),
+                B_b=tuple([m.get_to_code(converter) for m in self.B_b]),
+                score=self.score,
+                cardinality=self.cardinality,
+                score_interval=self.score_interval,
+            )
         except Exception:
             return self
 
@@ -227,7 +470,13 @@ class Score:
 
     def get_to_categories(self, converter: Optional[Dict[Tuple[str, ...], Dict]] = None):
         try:
-            return Score(A_a=tuple([m.get_to_categories(converter) for m in self.A_a]), B_b=tuple([m.get_to_categories(converter) for m in self.B_b]), score=self.score, cardinality=self.cardinality)
+            return Score(
+                A_a=tuple([m.get_to_categories(converter) for m in self.A_a]),
+                B_b=tuple([m.get_to_categories(converter) for m in self.B_b]),
+                score=self.score,
+                cardinality=self.cardinality,
+                score_interval=self.score_interval,
+            )
         except Exception:
             return self
 
@@ -238,12 +487,15 @@ class Score:
             return False
 
     def to_dict(self):
-        return {
+        res = {
             "attributes_pair": (tuple([m.meta_field.fields for m in self.A_a]), tuple([m.meta_field.fields for m in self.B_b])),
             "modalities": (tuple([m.modality for m in self.A_a]), tuple([m.modality for m in self.B_b])),
             "score": self.score,
             "cardinality": self.cardinality,
         }
+        if self.score_interval is not None:
+            res["score_interval"] = self.score_interval
+        return res
 
     @staticmethod
     def from_dict(score: Dict, converter: Optional[Dict[Tuple[str, ...], Dict]] = None):
@@ -252,6 +504,7 @@ class Score:
             B_b=tuple([Modality(MetaField(fields=mf, converter=converter), m, converter) for mf, m in zip(score["attributes_pair"][1], score["modalities"][1])]),
             score=score["score"],
             cardinality=score["cardinality"],
+            score_interval=tuple(score["score_interval"]) if score.get("score_interval") is not None else None,
         )
 
 
@@ -285,6 +538,121 @@ class ScoreGroup:
         return ScoreGroup(score_group=[Score.from_dict(score) for score in score_group_dict["score_group"]], score=score_group_dict["score"], ranks=score_group_dict["ranks"])
 
 
+class ScoreArray:
+    """This class implements a compact storage of the scores of a level as a NumPy structured array.
+
+    Each score is stored as the id of its combination of meta-fields, the id of the split of this combination into the pairing of meta-fields,
+    the codes of its modalities in the order of the combination, the score and the cardinality. Indexing a `ScoreArray` gives scores in the
+    dict format of `Score.to_dict` (in code format), so that it can be used as the former list of dicts.
+
+    Attributes:
+        level (int): Size of the combinations of meta-fields.
+        combinations (List[Tuple[int, ...]]): Combinations of meta-fields, indexed by combination id.
+        splits (List[Tuple[Tuple[int, ...], Tuple[int, ...]]]): Positions in the combination of the start and end meta-fields, indexed by split id.
+        array (np.ndarray): The structured array of scores, see `get_dtype`. Scores estimated on a sample have 2 more fields, `score_low` and
+            `score_high`, bounding their confidence interval.
+    """
+
+    def __init__(
+        self,
+        level: int,
+        combinations: List[Tuple[int, ...]],
+        splits: List[Tuple[Tuple[int, ...], Tuple[int, ...]]],
+        array: Optional[np.ndarray] = None,
+        with_interval: bool = False,
+    ):
+        self.level = level
+        self.combinations = combinations
+        self.splits = splits
+        self.array = array if array is not None else np.empty(0, dtype=ScoreArray.get_dtype(level, with_interval))
+
+    @staticmethod
+    def get_dtype(level: int, with_interval: bool = False) -> np.dtype:
+        fields = [("combination", np.uint32), ("split", np.uint32), ("modalities", np.int32, (level,)), ("score", np.float64), ("cardinality", np.int64)]
+        if with_interval:
+            fields += [("score_low", np.float64), ("score_high", np.float64)]
+        return np.dtype(fields)
+
+    @property
+    def with_interval(self) -> bool:
+        return "score_low" in self.array.dtype.names
+
+    @staticmethod
+    def get_splits(level: int) -> List[Tuple[Tuple[int, ...], Tuple[int, ...]]]:
+        return list(get_splits_indices(level))
+
+    def __len__(self) -> int:
+        return self.array.shape[0]
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Dict, List[Dict]]:
+        if isinstance(index, slice):
+            return [self.to_dict(i) for i in range(*index.indices(len(self)))]
+        return self.to_dict(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        for i in range(len(self)):
+            yield self.to_dict(i)
+
+    def to_dict(self, index: int) -> Dict:
+        record = self.array[index]
+        combination = self.combinations[record["combination"]]
+        start_indices, end_indices = self.splits[record["split"]]
+        modalities = record["modalities"].tolist()
+        res = {
+            "attributes_pair": (tuple([combination[i] for i in start_indices]), tuple([combination[i] for i in end_indices])),
+            "modalities": (tuple([modalities[i] for i in start_indices]), tuple([modalities[i] for i in end_indices])),
+            "score": float(record["score"]),
+            "cardinality": int(record["cardinality"]),
+        }
+        if self.with_interval:
+            res["score_interval"] = (float(record["score_low"]), float(record["score_high"]))
+        return res
+
+    def to_categories(self, converter: Dict[Tuple[str, ...], Dict], firsts_n: Optional[int] = None) -> List[Dict]:
+        """Get the `firsts_n` first scores, all of them if `None`, in the dict format of `Score.to_dict` with modalities converted back to their
+        categories."""
+        return [Score.from_dict(score).get_to_categories(converter).to_dict() for score in self[:firsts_n]]
+
+    def sort(self):
+        """Sort scores by increasing score, keeping the computation order between equal scores."""
+        self.array = self.array[np.argsort(self.array["score"], kind="stable")]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        columns = {"combination": self.array["combination"], "split": self.array["split"]}
+        columns.update({f"modality_{i}": self.array["modalities"][:, i] for i in range(self.level)})
+        columns.update({"score": self.array["score"], "cardinality": self.array["cardinality"]})
+        if self.with_interval:
+            columns.update({"score_low": self.array["score_low"], "score_high": self.array["score_high"]})
+        return pd.DataFrame(columns)
+
+    def save(self, path: str):
+        """Save scores as a Parquet file, combinations and splits being stored in its metadata."""
+        table = pa.Table.from_pandas(self.to_dataframe(), preserve_index=False)
+        metadata = {"level": self.level, "combinations": self.combinations, "splits": self.splits}
+        table = table.replace_schema_metadata(dict(table.schema.metadata or {}, waad=json.dumps(metadata)))
+        pq.write_table(table, path)
+
+    @staticmethod
+    def load(path: str):
+        table = pq.read_table(path)
+        metadata = json.loads(table.schema.metadata[b"waad"])
+        level = metadata["level"]
+
+        array = np.empty(table.num_rows, dtype=ScoreArray.get_dtype(level, with_interval="score_low" in table.column_names))
+        for field in array.dtype.names:
+            if field != "modalities":
+                array[field] = table.column(field).to_numpy()
+        for i in range(level):
+            array["modalities"][:, i] = table.column(f"modality_{i}").to_numpy()
+
+        return ScoreArray(
+            level=level,
+            combinations=[tuple(combination) for combination in metadata["combinations"]],
+            splits=[(tuple(start), tuple(end)) for start, end in metadata["splits"]],
+            array=array,
+        )
+
+
 class ComputeMutualInfoOnGivenLevel:
     """This class implements the computation of mutual information on a given level.
 
@@ -292,38 +660,74 @@ class ComputeMutualInfoOnGivenLevel:
         cache (Cache): The cache object we work on.
         level (int): The given level of the cache we want to compute mutual info on.
         mutual_info_scores (Dict[Tuple, float]): Mutual info scores computed on all combinations of meta-fields of size `level`.
+        confidence (float): Confidence level of `mutual_info_intervals`.
+        mutual_info_intervals (Dict[Tuple, Tuple[float, float]]): If the cache is computed on a sample, asymptotic confidence intervals of
+            `mutual_info_scores`, based on the variance `(sum(p * log(p / (p_start * p_end)) ** 2) - MI ** 2) / n` of the estimator.
     """
 
-    def __init__(self, cache: Cache, level: int):
+    def __init__(self, cache: Cache, level: int, confidence: float = 0.95):
         self.cache = cache
         self.level = level
+        self.confidence = confidence
         self.mutual_info_scores: Dict[Tuple, float] = {}
+        self.mutual_info_intervals: Dict[Tuple, Tuple[float, float]] = {}
 
-    def run(self):
-        for k in self.cache.cache[self.level].keys():
-            for indices_pair in get_all_pairs_of_subsets_indices(k):
-                start_meta_fields = tuple([k[i] for i in indices_pair[0]])
-                end_meta_fields = tuple([k[i] for i in indices_pair[1]])
-
-                self.mutual_info_scores[(start_meta_fields, end_meta_fields)] = 0
+        # Second moments of the log-ratios, only computed on sampled caches
+        self.second_moments: Dict[Tuple, float] = {}
 
-        N = self.cache.adtree.array_record.records_length
-        for k in self.cache.cache[self.level].keys():
-            for indices_pair in get_all_pairs_of_subsets_indices(k):
-                start_meta_fields = tuple([k[i] for i in indices_pair[0]])
-                end_meta_fields = tuple([k[i] for i in indices_pair[1]])
-
-                for modalities, count in self.cache.cache[self.level][k].items():
-                    start_modalities = tuple([modalities[i] for i in indices_pair[0]])
-                    end_modalities = tuple([modalities[i] for i in indices_pair[1]])
-
-                    count_start = self.cache.cache[len(start_meta_fields)][start_meta_fields][start_modalities]
-                    count_end = self.cache.cache[len(end_meta_fields)][end_meta_fields][end_modalities]
-
-                    self.mutual_info_scores[(start_meta_fields, end_meta_fields)] += (count / N) * math.log((N * count) / (count_start * count_end))
+    def run(self, executor: Optional[Executor] = None, n_shards: int = 1):
+        """Compute mutual info scores, sharded over `executor` if given. See `ComputeMutualInfoScoreGroupings.n_jobs`."""
+        combinations = list(self.cache.cache[self.level].keys())
+        if executor is None:
+            for k in combinations:
+                self.mutual_info_scores.update(self.compute_combination_mutual_info(k))
+        else:
+            # Shards are merged in their submission order, so that ties are sorted as in the serial path
+            futures = [executor.submit(_compute_mutual_info_shard, self.level, shard) for shard in get_shards(combinations, n_shards)]
+            for future in futures:
+                mutual_info_scores, second_moments = future.result()
+                self.mutual_info_scores.update(mutual_info_scores)
+                self.second_moments.update(second_moments)
 
         self.mutual_info_scores = {k: v for k, v in sorted(self.mutual_info_scores.items(), key=lambda item: item[1])}
 
+        if self.cache.population_size is not None:
+            self.compute_mutual_info_intervals()
+
+    def compute_mutual_info_intervals(self):
+        n = self.cache.records_length
+        z = float(norm.ppf(0.5 + self.confidence / 2))
+        for pairing, mutual_info in self.mutual_info_scores.items():
+            variance = max(self.second_moments[pairing] - mutual_info ** 2, 0) / n * (1 - n / self.cache.population_size)
+            self.mutual_info_intervals[pairing] = (max(mutual_info - z * math.sqrt(variance), 0), mutual_info + z * math.sqrt(variance))
+
+    def compute_combination_mutual_info(self, k: Tuple[int, ...]) -> Dict[Tuple, float]:
+        """Compute the mutual info scores of all pairings of meta-fields split from the combination `k`."""
+        N = self.cache.records_length
+        is_sampled = self.cache.population_size is not None
+        res = {}
+        for start_indices, end_indices in get_splits_indices(self.level):
+            start_meta_fields = tuple([k[i] for i in start_indices])
+            end_meta_fields = tuple([k[i] for i in end_indices])
+            start_table = self.cache.cache[len(start_meta_fields)][start_meta_fields]
+            end_table = self.cache.cache[len(end_meta_fields)][end_meta_fields]
+
+            mutual_info = 0
+            second_moment = 0
+            for modalities, count in self.cache.cache[self.level][k].items():
+                count_start = start_table[tuple([modalities[i] for i in start_indices])]
+                count_end = end_table[tuple([modalities[i] for i in end_indices])]
+
+                log_ratio = math.log((N * count) / (count_start * count_end))
+                mutual_info += (count / N) * log_ratio
+                if is_sampled:
+                    second_moment += (count / N) * log_ratio ** 2
+
+            res[(start_meta_fields, end_meta_fields)] = mutual_info
+            if is_sampled:
+                self.second_moments[(start_meta_fields, end_meta_fields)] = second_moment
+        return res
+
     def plot_mutual_info(self, index_elbow: Optional[int] = None):
         fig, ax = plt.subplots(figsize=(15, 10))
         curve = list(self.mutual_info_scores.values())
@@ -375,40 +779,136 @@ class ComputeScoreOnGivenLevel:
         level (int): The given level of the cache we want to compute scores on.
         t_alpha (int): Minimum cardinality we want on a combination of modalities to compute the score.
         pairings_to_keep (List): All pairings of meta-fields we want to explore for score computation. 
+        score_margin (Optional[float]): If not `None`, scores computed from approximate counts (see `Cache.approximate_arity`) are skipped
+            when the width of their possible values, given the error bounds of the counts, exceeds `score_margin`.
+        confidence (float): If the cache is computed on a sample (see `Cache.population_size`), confidence level of the intervals of the scores.
+            Counts are rescaled to the population, `t_alpha` applying to rescaled counts, and their confidence intervals give the ones of
+            the scores.
+        max_score (Optional[float]): If not `None` and the cache is computed on a sample, scores whose lower bound exceeds `max_score` are
+            clearly not anomalous and are pruned.
+        scores (ScoreArray): All scores computed, sorted by increasing score.
     """
 
-    def __init__(self, cache: Cache, level: int, t_alpha: int, pairings_to_keep: List = []):
+    def __init__(
+        self,
+        cache: Cache,
+        level: int,
+        t_alpha: int,
+        pairings_to_keep: List = [],
+        score_margin: Optional[float] = None,
+        confidence: float = 0.95,
+        max_score: Optional[float] = None,
+    ):
         self.cache = cache
         self.level = level
         self.t_alpha = t_alpha
         self.pairings_to_keep = pairings_to_keep
-        self.scores: List[Dict] = []
+        self.score_margin = score_margin
+        self.confidence = confidence
+        self.max_score = max_score
+        self.scores = ScoreArray(level, combinations=[], splits=ScoreArray.get_splits(level), with_interval=cache.population_size is not None)
+
+    def run(self, executor: Optional[Executor] = None, n_shards: int = 1, top_k: Optional[int] = None):
+        """Compute scores, sharded over `executor` if given. See `ComputeMutualInfoScoreGroupings.n_jobs`.
+
+        Args:
+            executor: Executor whose workers have attached the cache with `_attach_cache`.
+            n_shards: Number of shards the combinations are split into.
+            top_k: If not `None`, only the `top_k` lowest scores are kept, whether an `executor` is used or not. With an `executor`, each
+                shard only sends back its `top_k` lowest scores, which is enough to get the `top_k` lowest scores overall.
+        """
+        self.scores = ScoreArray(
+            self.level, combinations=list(self.cache.cache[self.level].keys()), splits=ScoreArray.get_splits(self.level), with_interval=self.cache.population_size is not None
+        )
+        pairings_to_keep = set(self.pairings_to_keep)
+        if executor is None:
+            self.scores.array = np.concatenate(
+                [self.scores.array] + [self.compute_combination_scores(combination_id, k, pairings_to_keep) for combination_id, k in enumerate(self.scores.combinations)]
+            )
+        else:
+            shards = get_shards(list(enumerate(self.scores.combinations)), n_shards)
+            parameters = (self.level, self.t_alpha, pairings_to_keep, self.score_margin, self.confidence, self.max_score)
+            futures = [executor.submit(_compute_scores_shard, *parameters, shard, top_k) for shard in shards]
+            self.scores.array = np.concatenate([self.scores.array] + [future.result() for future in futures])
+        self.scores.sort()
+        if top_k is not None:
+            self.scores.array = self.scores.array[:top_k]
+
+    def compute_combination_scores(self, combination_id: int, k: Tuple[int, ...], pairings_to_keep: Set[Tuple]) -> np.ndarray:
+        """Compute the scores of all kept pairings of meta-fields split from the combination `k`, as a structured array of `ScoreArray`."""
+        N = self.cache.records_length
+        z = norm.ppf(0.5 + self.confidence / 2)
+        res = []
+        modalities = None
+
+        for split_id, (start_indices, end_indices) in enumerate(self.scores.splits):
+            start_meta_fields = tuple([k[i] for i in start_indices])
+            end_meta_fields = tuple([k[i] for i in end_indices])
+
+            if (start_meta_fields, end_meta_fields) in pairings_to_keep:
+                if modalities is None:
+                    items = list(self.cache.cache[self.level][k].items())
+                    modalities = [m for m, _ in items]
+                    count = np.fromiter((c for _, c in items), dtype=np.int64, count=len(items))
+
+                start_table = self.cache.cache[len(start_meta_fields)][start_meta_fields]
+                end_table = self.cache.cache[len(end_meta_fields)][end_meta_fields]
+                count_start = np.fromiter((start_table[tuple([m[i] for i in start_indices])] for m in modalities), dtype=np.int64, count=len(modalities))
+                count_end = np.fromiter((end_table[tuple([m[i] for i in end_indices])] for m in modalities), dtype=np.int64, count=len(modalities))
+
+                if self.cache.population_size is None:
+                    score = (count + 1) * (N + 2) / ((count_start + 1) * (count_end + 1))
+                    cardinality = count
+                    to_keep = (count_start >= self.t_alpha) & (count_end >= self.t_alpha)
+                else:
+                    score, score_low, score_high, cardinality, to_keep = self.compute_sampled_scores(count, count_start, count_end, z)
+
+                error_bounds = tuple(self.cache.get_error_bound(e) for e in (k, start_meta_fields, end_meta_fields))
+                if self.score_margin is not None and any(error_bounds):
+                    to_keep &= ComputeScoreOnGivenLevel.get_score_uncertainty(count, count_start, count_end, N, error_bounds) <= self.score_margin
+
+                split_scores = np.empty(int(to_keep.sum()), dtype=self.scores.array.dtype)
+                split_scores["combination"] = combination_id
+                split_scores["split"] = split_id
+                split_scores["modalities"] = np.array(modalities, dtype=np.int32).reshape(-1, self.level)[to_keep]
+                split_scores["score"] = score[to_keep]
+                split_scores["cardinality"] = cardinality[to_keep]
+                if self.cache.population_size is not None:
+                    split_scores["score_low"] = score_low[to_keep]
+                    split_scores["score_high"] = score_high[to_keep]
+                res.append(split_scores)
+
+        return np.concatenate(res) if res else np.empty(0, dtype=self.scores.array.dtype)
+
+    def compute_sampled_scores(self, count: np.ndarray, count_start: np.ndarray, count_end: np.ndarray, z: float) -> Tuple[np.ndarray, ...]:
+        """Compute scores on counts of a sample rescaled to the population, with their confidence intervals.
+
+        The score increases with the joint count and decreases with the counts of both sides, so its bounds are reached at the opposite
+        bounds of the counts.
+
+        Returns:
+            Scores, lower and upper bounds of the scores, rescaled cardinalities and the mask of scores to keep.
+        """
+        N = self.cache.population_size
+        count, count_low, count_high = self.cache.get_population_counts(count, z)
+        count_start, count_start_low, count_start_high = self.cache.get_population_counts(count_start, z)
+        count_end, count_end_low, count_end_high = self.cache.get_population_counts(count_end, z)
 
-    def run(self):
-        N = self.cache.adtree.array_record.records_length
-        for k in self.cache.cache[self.level].keys():
-            for indices_pair in get_all_pairs_of_subsets_indices(k):
-                start_meta_fields = tuple([k[i] for i in indices_pair[0]])
-                end_meta_fields = tuple([k[i] for i in indices_pair[1]])
-
-                if (start_meta_fields, end_meta_fields) in self.pairings_to_keep:
-                    for modalities, count in self.cache.cache[self.level][k].items():
-                        start_modalities = tuple([modalities[i] for i in indices_pair[0]])
-                        end_modalities = tuple([modalities[i] for i in indices_pair[1]])
-
-                        count_start = self.cache.cache[len(start_meta_fields)][start_meta_fields][start_modalities]
-                        count_end = self.cache.cache[len(end_meta_fields)][end_meta_fields][end_modalities]
-
-                        if count_start >= self.t_alpha and count_end >= self.t_alpha:
-                            self.scores.append(
-                                {
-                                    "attributes_pair": (start_meta_fields, end_meta_fields),
-                                    "modalities": (start_modalities, end_modalities),
-                                    "score": (count + 1) * (N + 2) / ((count_start + 1) * (count_end + 1)),
-                                    "cardinality": count,
-                                }
-                            )
-        self.scores.sort(key=lambda p: p["score"])
+        score = (count + 1) * (N + 2) / ((count_start + 1) * (count_end + 1))
+        score_low = (count_low + 1) * (N + 2) / ((count_start_high + 1) * (count_end_high + 1))
+        score_high = (count_high + 1) * (N + 2) / ((count_start_low + 1) * (count_end_low + 1))
+
+        to_keep = (count_start >= self.t_alpha) & (count_end >= self.t_alpha)
+        if self.max_score is not None:
+            to_keep &= score_low <= self.max_score
+        return score, score_low, score_high, np.rint(count).astype(np.int64), to_keep
+
+    @staticmethod
+    def get_score_uncertainty(count: np.ndarray, count_start: np.ndarray, count_end: np.ndarray, N: int, error_bounds: Tuple[float, float, float]) -> np.ndarray:
+        """Width of the possible values of scores whose counts are over-estimated by at most `error_bounds`, in the same order."""
+        lowest = (np.maximum(count - error_bounds[0], 0) + 1) * (N + 2) / ((count_start + 1) * (count_end + 1))
+        highest = (count + 1) * (N + 2) / ((np.maximum(count_start - error_bounds[1], 0) + 1) * (np.maximum(count_end - error_bounds[2], 0) + 1))
+        return highest - lowest
 
     def get_firsts_abnormal_pairings(self, firsts_n: int, converter: Optional[Dict[Tuple[str, ...], Dict]] = None, min_card: Optional[int] = None):
         if min_card is not None:
@@ -569,34 +1069,78 @@ class ComputeMutualInfoScoreGroupings:
         t_alpha (int): Minimum cardinality we want on a combination of modalities to compute the score.
         firsts_n (int): The n firsts scores to consider per level.
         converter (Optional[Dict[Tuple[str, ...], Dict]]): Dict containing the conversion material from str to code. See above description.
+        score_margin (Optional[float]): Maximum uncertainty of scores computed from approximate counts. See `ComputeScoreOnGivenLevel`.
+        n_jobs (int): Number of worker processes. If greater than 1, combinations of each level are sharded across a process pool whose
+            workers share the read-only cache of the parent process through fork, and the results are merged in shard order so that they
+            are identical to the serial path. Needs the 'fork' start method, i.e. a POSIX system.
+        top_k (Optional[int]): If not `None`, only the `top_k` lowest scores of each level are kept, with any `n_jobs`, which saves transfers
+            between processes. It must not be lower than `firsts_n`. Lookups walking past the `firsts_n` lowest scores, such as
+            `ComputeScoreOnGivenLevel.get_firsts_abnormal_pairings` with a `min_card`, only see the `top_k` kept ones.
+        confidence (float): Confidence level of mutual info scores and scores if the cache is computed on a sample. See `ComputeScoreOnGivenLevel`.
+        max_score (Optional[float]): Pruning threshold on the lower bounds of scores if the cache is computed on a sample. See `ComputeScoreOnGivenLevel`.
     """
 
-    def __init__(self, max_level: int, cache: Cache, mu: float, t_alpha: int, firsts_n: int, converter: Optional[Dict[Tuple[str, ...], Dict]]):
+    def __init__(
+        self,
+        max_level: int,
+        cache: Cache,
+        mu: float,
+        t_alpha: int,
+        firsts_n: int,
+        converter: Optional[Dict[Tuple[str, ...], Dict]],
+        score_margin: Optional[float] = None,
+        n_jobs: int = 1,
+        top_k: Optional[int] = None,
+        confidence: float = 0.95,
+        max_score: Optional[float] = None,
+    ):
+        if top_k is not None and top_k < firsts_n:
+            raise ValueError(f"top_k ({top_k}) must not be lower than firsts_n ({firsts_n})")
         self.max_level = max_level
         self.cache = cache
         self.mu = mu
         self.t_alpha = t_alpha
         self.firsts_n = firsts_n
         self.converter = converter
+        self.score_margin = score_margin
+        self.n_jobs = n_jobs
+        self.top_k = top_k
+        self.confidence = confidence
+        self.max_score = max_score
 
         self.cmiogls: Dict[int, ComputeMutualInfoOnGivenLevel] = {}
         self.csogls: Dict[int, ComputeScoreOnGivenLevel] = {}
+        self.pairings_to_keep: Dict[int, List] = {}
 
         self.sg: ScoreGroupings
 
     def run(self):
+        if self.n_jobs > 1:
+            context = multiprocessing.get_context("fork")
+            with ProcessPoolExecutor(max_workers=self.n_jobs, mp_context=context, initializer=_attach_cache, initargs=(self.cache,)) as executor:
+                self.run_levels(executor)
+        else:
+            self.run_levels()
+
+        self.sg = ScoreGroupings(self.csogls, max_level=self.max_level, firsts_n=self.firsts_n, converter=self.converter)
+        self.sg.run()
+
+    def run_levels(self, executor: Optional[Executor] = None):
+        # A few shards per worker balance the load between combinations of very different sizes
+        n_shards = 4 * self.n_jobs
         for level in range(2, self.max_level + 1):
-            cmiogl = ComputeMutualInfoOnGivenLevel(self.cache, level)
-            cmiogl.run()
+            cmiogl = ComputeMutualInfoOnGivenLevel(self.cache, level, self.confidence)
+            cmiogl.run(executor, n_shards)
             pairings_to_keep = cmiogl.get_pairings_to_keep(self.mu)
             self.cmiogls[level] = cmiogl
+            self.pairings_to_keep[level] = pairings_to_keep
 
-            csogl = ComputeScoreOnGivenLevel(self.cache, level, self.t_alpha, pairings_to_keep)
-            csogl.run()
+            csogl = ComputeScoreOnGivenLevel(self.cache, level, self.t_alpha, pairings_to_keep, self.score_margin, self.confidence, self.max_score)
+            csogl.run(executor, n_shards, self.top_k)
             self.csogls[level] = csogl
 
-        self.sg = ScoreGroupings(self.csogls, max_level=self.max_level, firsts_n=self.firsts_n, converter=self.converter)
-        self.sg.run()
+    def get_online_scorer(self):
+        return OnlineScorer(self.cache, self.converter, [pairing for level in sorted(self.pairings_to_keep) for pairing in self.pairings_to_keep[level]], self.t_alpha)
 
     def display_most_frequents_subpairings(self, score: Score, converter: Dict[Tuple[str, ...], Dict], firsts_n: int = 10):
         level = len(score.A_a) + len(score.B_b)
@@ -619,11 +1163,13 @@ class ComputeMutualInfoScoreGroupings:
         score_groups: ScoreGroupings,
         converter: Dict,
     ):
+        """Save the parameters and the score groupings of a run as JSON in `path`, and all the scores of all levels with `save_scores_static` in the
+        directory `path` + '.scores', referenced by the JSON file. See `display_from_json`."""
+        scores_directory = f"{path}.scores"
+        ComputeMutualInfoScoreGroupings.save_scores_static(directory=scores_directory, csogls=csogls, converter=converter)
 
         export_dict = {"table_name": table_name, "psql_request": psql_request, "meta_fields": meta_fields, "t_alpha": t_alpha, "firsts_n": firsts_n, "mus": mus}
-        for level, csogl in csogls.items():
-            export_dict[f"scores_level_{level}"] = [Score.from_dict(score).get_to_categories(converter).to_dict() for score in csogl.scores[:firsts_n]]
-
+        export_dict["scores_directory"] = os.path.basename(scores_directory)
         export_dict["score_groupings"] = [score_group.to_dict() for score_group in score_groups.score_groupings]
 
         with open(path, "w") as outfile:
@@ -643,8 +1189,37 @@ class ComputeMutualInfoScoreGroupings:
             converter=self.converter,
         )
 
+    @staticmethod
+    def save_scores_static(directory: str, csogls: Dict[int, ComputeScoreOnGivenLevel], converter: Dict):
+        """Save all scores of all levels, one Parquet file per level, with the converter pickled alongside."""
+        os.makedirs(directory, exist_ok=True)
+        for level, csogl in csogls.items():
+            csogl.scores.save(os.path.join(directory, f"scores_level_{level}.parquet"))
+
+        with open(os.path.join(directory, "converter.pkl"), "wb") as outfile:
+            pickle.dump(converter, outfile)
+
+    def save_scores(self, directory: str):
+        ComputeMutualInfoScoreGroupings.save_scores_static(directory=directory, csogls=self.csogls, converter=self.converter)
+
+    @staticmethod
+    def load_scores(directory: str) -> Tuple[Dict[int, ScoreArray], Dict]:
+        """Reload scores and converter saved with `save_scores`."""
+        scores = {}
+        for file_name in os.listdir(directory):
+            if file_name.startswith("scores_level_") and file_name.endswith(".parquet"):
+                score_array = ScoreArray.load(os.path.join(directory, file_name))
+                scores[score_array.level] = score_array
+
+        with open(os.path.join(directory, "converter.pkl"), "rb") as file:
+            converter = pickle.load(file)
+
+        return {level: scores[level] for level in sorted(scores)}, converter
+
     @staticmethod
     def display_from_json(json_file: str):
+        """Display a run saved with `save_static`, with the `firsts_n` first scores of each level. Files saved before scores were stored as
+        Parquet files, with the scores in the JSON file, are still displayed but deprecated."""
         with open(json_file) as file:
             data = json.load(file)
             print(f"table_name: {data['table_name']}")
@@ -658,12 +1233,183 @@ class ComputeMutualInfoScoreGroupings:
             print(f"mus: {data['mus']}")
             print()
 
-            for k, v in data.items():
-                if k.startswith("scores_level_"):
-                    print(k)
-                    display(pd.DataFrame(data[k]))
+            if "scores_directory" in data:
+                scores, converter = ComputeMutualInfoScoreGroupings.load_scores(os.path.join(os.path.dirname(json_file), data["scores_directory"]))
+                for level, score_array in scores.items():
+                    print(f"scores_level_{level}")
+                    display(pd.DataFrame(score_array.to_categories(converter, data["firsts_n"])))
+            else:
+                warnings.warn(f"{json_file} holds its scores as JSON, which is deprecated: save it again to store them as Parquet files", DeprecationWarning)
+                for k, v in data.items():
+                    if k.startswith("scores_level_"):
+                        print(k)
+                        display(pd.DataFrame(data[k]))
 
             print()
             for index, score_group in enumerate(data["score_groupings"]):
                 print(f"ScoreGroup index : {index}")
                 ScoreGroup.from_dict(score_group).display()
+
+
+_SHARED_CACHE: Optional[Cache] = None
+
+
+def _attach_cache(cache: Cache):
+    """Initializer of the worker processes of `ComputeMutualInfoScoreGroupings`. With the 'fork' start method, `cache` is the parent
+    object itself, shared copy-on-write and never pickled."""
+    global _SHARED_CACHE
+    _SHARED_CACHE = cache
+
+
+def _compute_mutual_info_shard(level: int, combinations: List[Tuple[int, ...]]) -> Tuple[Dict[Tuple, float], Dict[Tuple, float]]:
+    cmiogl = ComputeMutualInfoOnGivenLevel(_SHARED_CACHE, level)
+    for k in combinations:
+        cmiogl.mutual_info_scores.update(cmiogl.compute_combination_mutual_info(k))
+    return cmiogl.mutual_info_scores, cmiogl.second_moments
+
+
+def _compute_scores_shard(
+    level: int,
+    t_alpha: int,
+    pairings_to_keep: Set[Tuple],
+    score_margin: Optional[float],
+    confidence: float,
+    max_score: Optional[float],
+    combinations: List[Tuple[int, Tuple[int, ...]]],
+    top_k: Optional[int],
+) -> np.ndarray:
+    csogl = ComputeScoreOnGivenLevel(_SHARED_CACHE, level, t_alpha, score_margin=score_margin, confidence=confidence, max_score=max_score)
+    array = np.concatenate([csogl.scores.array] + [csogl.compute_combination_scores(combination_id, k, pairings_to_keep) for combination_id, k in combinations])
+    if top_k is not None:
+        array = array[np.argsort(array["score"], kind="stable")[:top_k]]
+    return array
+
+
+def get_shards(lst: List, n_shards: int) -> List[List]:
+    """Split `lst` in at most `n_shards` contiguous shards of balanced sizes."""
+    size, remainder = divmod(len(lst), n_shards)
+    bounds = [i * size + min(i, remainder) for i in range(n_shards + 1)]
+    return [lst[start:end] for start, end in zip(bounds[:-1], bounds[1:]) if start < end]
+
+
+class OnlineScorer:
+    """This class implements the scoring of new authentications against a frozen `Cache`, as they arrive.
+
+    Each authentication is scored on every retained pairing with the same score as `ComputeScoreOnGivenLevel`, the minimum being the most
+    abnormal pairing of the authentication. Unlike `ComputeScoreOnGivenLevel`, joint modalities never seen in the cache are scored too,
+    with a count of 0, since they are exactly the rare combinations we want to flag.
+
+    Attributes:
+        cache (Cache): The frozen cache object, for instance reloaded with `Cache.load`.
+        converter (Dict[Tuple[str, ...], Dict]): Dict containing the conversion material from str to code. See above description.
+        pairings_to_keep (List): All pairings of meta-fields to score, whatever their level.
+        t_alpha (int): Minimum cardinality we want on both sides of a pairing to compute the score.
+    """
+
+    def __init__(self, cache: Cache, converter: Dict[Tuple[str, ...], Dict], pairings_to_keep: List, t_alpha: int = 0):
+        self.cache = cache
+        self.converter = converter
+        self.pairings_to_keep = pairings_to_keep
+        self.t_alpha = t_alpha
+
+        self.inverse_converter = Data.get_inverse_converter(converter)
+
+        # Contingency tables are looked up once here so that scoring only costs hash lookups
+        self.tables: List[Tuple[Tuple, Tuple, Tuple, Dict, Dict, Dict]] = []
+        for start_meta_fields, end_meta_fields in pairings_to_keep:
+            combination = tuple(sorted(start_meta_fields + end_meta_fields))
+            self.tables.append(
+                (
+                    start_meta_fields,
+                    end_meta_fields,
+                    combination,
+                    self.cache.cache[len(combination)].get(combination, {}),
+                    self.cache.cache[len(start_meta_fields)].get(start_meta_fields, {}),
+                    self.cache.cache[len(end_meta_fields)].get(end_meta_fields, {}),
+                )
+            )
+
+    def encode_event(self, event: Dict[str, Any]) -> List[int]:
+        codes = []
+        for meta_field in self.cache.meta_fields:
+            if isinstance(meta_field, tuple):
+                value = tuple(event[f] for f in meta_field)
+            else:
+                value = event[meta_field]
+                value = "?" if value != value else value  # Same NaN replacement as `Data.set_as_categorical`
+            codes.append(self.inverse_converter[meta_field].get(value, -1))
+        return codes
+
+    def score_event(self, event: Dict[str, Any]) -> Optional[Score]:
+        """Score a single authentication given as a dict {column: value} and return its most abnormal pairing as a `Score` in code format."""
+        codes = self.encode_event(event)
+        N = self.cache.records_length
+
+        best = None
+        for start_meta_fields, end_meta_fields, combination, joint_table, start_table, end_table in self.tables:
+            start_modalities = tuple(codes[i] for i in start_meta_fields)
+            end_modalities = tuple(codes[i] for i in end_meta_fields)
+            count_start = start_table.get(start_modalities, 0)
+            count_end = end_table.get(end_modalities, 0)
+
+            if count_start >= self.t_alpha and count_end >= self.t_alpha:
+                count = joint_table.get(tuple(codes[i] for i in combination), 0)
+                score = (count + 1) * (N + 2) / ((count_start + 1) * (count_end + 1))
+                if best is None or score < best["score"]:
+                    best = {"attributes_pair": (start_meta_fields, end_meta_fields), "modalities": (start_modalities, end_modalities), "score": score, "cardinality": count}
+
+        return Score.from_dict(best, self.converter) if best is not None else None
+
+    def score(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Score a micro-batch of authentications and return, for each of them, its most abnormal pairing in code format.
+
+        Rows for which no pairing could be scored are filled with `None` and an infinite score.
+        """
+        codes = Data.encode_with_converter(data, self.cache.meta_fields, self.inverse_converter)
+        N = self.cache.records_length
+
+        best_scores = np.full(codes.shape[0], np.inf)
+        best_pairings = np.full(codes.shape[0], -1)
+        best_counts = np.zeros(codes.shape[0], dtype=np.int64)
+
+        def get_counts(table: Dict, columns: Tuple):
+            keys = zip(*codes[:, list(columns)].T.tolist())
+            return np.fromiter((table.get(key, 0) for key in keys), dtype=np.int64, count=codes.shape[0])
+
+        for index, (start_meta_fields, end_meta_fields, combination, joint_table, start_table, end_table) in enumerate(self.tables):
+            count_start = get_counts(start_table, start_meta_fields)
+            count_end = get_counts(end_table, end_meta_fields)
+            count = get_counts(joint_table, combination)
+
+            scores = (count + 1) * (N + 2) / ((count_start + 1) * (count_end + 1))
+            scores[(count_start < self.t_alpha) | (count_end < self.t_alpha)] = np.inf
+
+            is_better = scores < best_scores
+            best_scores[is_better] = scores[is_better]
+            best_pairings[is_better] = index
+            best_counts[is_better] = count[is_better]
+
+        res = []
+        for row_codes, score, pairing_index, count in zip(codes.tolist(), best_scores, best_pairings, best_counts):
+            if pairing_index == -1:
+                res.append({"attributes_pair": None, "modalities": None, "score": np.inf, "cardinality": None})
+            else:
+                start_meta_fields, end_meta_fields = self.tables[pairing_index][:2]
+                res.append(
+                    {
+                        "attributes_pair": (start_meta_fields, end_meta_fields),
+                        "modalities": (tuple(row_codes[i] for i in start_meta_fields), tuple(row_codes[i] for i in end_meta_fields)),
+                        "score": score,
+                        "cardinality": int(count),
+                    }
+                )
+        return pd.DataFrame(res, index=data.index)
+
+    def save(self, path: str):
+        with open(path, "wb") as outfile:
+            pickle.dump(self, outfile)
+
+    @staticmethod
+    def load(path: str):
+        with open(path, "rb") as file:
+            return pickle.load(file)